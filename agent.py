@@ -1,102 +1,211 @@
 # agent.py
 from __future__ import annotations
 import os
-from typing import List, Dict, Any
+import asyncio
+from typing import List, Dict, Any, Iterator, AsyncIterator, Tuple
 
-# Import the new Cerebras SDK
-from cerebras.cloud.sdk import Cerebras
-
-# The old LangGraph and other imports are no longer needed for the simplified agent
-"""
-from langchain_community.document_loaders import (
-    TextLoader, PyPDFLoader, CSVLoader, UnstructuredExcelLoader,
-    UnstructuredPowerPointLoader, UnstructuredWordDocumentLoader
-)
-
-from core.config import (
-    _llm, _embedding_fn, RAG_PERSIST_DIR, RAG_COLLECTION,
-    MAX_REFLECTIONS
-""" # End of old, unused code
+# Shared, pooled Cerebras SDK client
+from core.llm import get_cerebras_client, get_async_cerebras_client
+from core.cancel import CancelToken, TaskCancelled
+from core.request_scope import request_scope
+from core.context import ContextBuilder, describe as describe_context
+from core.response_cache import get_response_cache
 
 # --- Knowledge Base Ingestion ---
 
 # code for storing or uploading the data 
-def ingest_knowledge_base(file_path: str):
+def ingest_knowledge_base(file_path: str, progress=None):
     """
     Ingests a user-uploaded file (txt, pdf, csv, excel, ppt, docx).
+    Only chunks that changed since the last ingest of the same file are embedded.
+    `progress` is an optional callback receiving running chunk counts.
     """
-    print(f"📂 Ingesting file: {file_path}")
+    # Deferred so chat-only entry points don't import loaders, Chroma and the embedding model
+    from core.ingest import ingest_file
 
-    ext = os.path.splitext(file_path)[1].lower()
-    if ext == ".txt":
-        loader = TextLoader(file_path, encoding="utf-8")
-    elif ext == ".pdf":
-        loader = PyPDFLoader(file_path)
-    elif ext == ".csv":
-        loader = CSVLoader(file_path)
-    elif ext in [".xls", ".xlsx"]:
-        loader = UnstructuredExcelLoader(file_path)
-    elif ext in [".ppt", ".pptx"]:
-        loader = UnstructuredPowerPointLoader(file_path)
-    elif ext in [".doc", ".docx"]:
-        loader = UnstructuredWordDocumentLoader(file_path)
-    else:
-        raise ValueError(f"❌ Unsupported file type: {ext}")
-
-    documents = loader.load()
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
-    chunks = text_splitter.split_documents(documents)
-    
-    print(f"✅ File split into {len(chunks)} chunks.")
-
-    rag_db = Chroma.from_documents(
-        documents=chunks,
-        embedding=_embedding_fn,
-        persist_directory=RAG_PERSIST_DIR,
-        collection_name=RAG_COLLECTION
-    )
+    print(f"📂 Ingesting file: {file_path}")
+    stats = ingest_file(file_path, progress=progress)
+    if stats["skipped"]:
+        return f"File '{file_path}' is already up to date."
     print("✅ Knowledge base updated and saved.")
     return f"File '{file_path}' ingested successfully!"
 
 # --- Main Agent Runner ---
 
-def run_agent_once(user_input: str, history: List[Dict[str, Any]]) -> Dict[str, Any]:
+_NO_CONTENT = "The agent processed the request but returned no content."
+_COMPLETION_PARAMS = {
+    "model": "llama-3.3-70b",
+    "stream": True,
+    "max_completion_tokens": 2048,
+    "temperature": 0.2,
+    "top_p": 1,
+}
+
+_SYSTEM_PROMPT = "You are a helpful assistant."
+
+# Keeps prompts within CONTEXT_TOKEN_BUDGET; summaries of older turns are cached per conversation
+_context_builder = ContextBuilder()
+
+def _build_messages(user_input: str, history: List[Dict[str, Any]], conversation_id: Any = None) -> Tuple[List[Dict[str, Any]], str]:
+    """
+    Combines history and the new user input for the model, within the token budget.
+    Returns the messages and a log line with the token accounting.
+    """
+    # Assuming history items have 'role' and 'content'
+    messages, info = _context_builder.build(_SYSTEM_PROMPT, history, user_input, conversation_id)
+    return messages, describe_context(info)
+
+def _done_event(parts: List[str], context_log: str) -> Dict[str, Any]:
+    return {
+        "type": "done",
+        "final": "".join(parts) or _NO_CONTENT,
+        "log": [context_log, "Agent task completed using direct Cerebras call."]
+    }
+
+def _error_event(e: Exception) -> Dict[str, Any]:
+    print(f"❌ Error in simplified agent: {e}")
+    return {
+        "type": "done",
+        "final": f"An error occurred while processing your request: {e}",
+        "log": [f"Error: {e}"]
+    }
+
+def _cancelled_event(parts: List[str], reason: str) -> Dict[str, Any]:
+    print(f"🛑 Agent generation cancelled: {reason}")
+    return {
+        "type": "done",
+        "final": "".join(parts),
+        "log": [f"Cancelled: {reason}"],
+        "cancelled": True
+    }
+
+def _cache_lookup(user_input: str, history: List[Dict[str, Any]]) -> Dict[str, Any] | None:
+    """Returns a done event for a cached answer, or None on a miss / when the cache is off."""
+    cache = get_response_cache()
+    hit = cache.lookup(user_input, history) if cache else None
+    if hit is None:
+        return None
+    print(f"⚡ Response cache hit ({hit['tier']})")
+    return {
+        "type": "done",
+        "final": hit["answer"],
+        "log": [f"Response cache hit ({hit['tier']}, similarity {hit['similarity']})"],
+        "cached": True
+    }
+
+def _cache_store(user_input: str, history: List[Dict[str, Any]], parts: List[str]):
+    cache = get_response_cache()
+    if cache and parts:
+        cache.store(user_input, history, "".join(parts))
+
+def _final_result(event: Dict[str, Any] | None) -> Dict[str, Any]:
+    if event is None:
+        return {"final": _NO_CONTENT, "log": ["Error: agent stream ended without a final event."]}
+    result = {"final": event["final"], "log": event["log"]}
+    for flag in ("cancelled", "cached"):
+        if event.get(flag):
+            result[flag] = True
+    return result
+
+def stream_agent_once(user_input: str, history: List[Dict[str, Any]], cancel_token: CancelToken | None = None,
+                      conversation_id: Any = None) -> Iterator[Dict[str, Any]]:
+    """
+    Streams the agent's answer as it is generated.
+    Yields {"type": "delta", "content": ...} for every token chunk from the model,
+    followed by a single {"type": "done", "final": ..., "log": [...]} event.
+    If `cancel_token` is cancelled mid-generation, the model stream is closed at the next
+    chunk and the done event carries "cancelled": True with the partial answer.
+    `conversation_id` keys the cached summary of older turns when history exceeds the budget.
+    """
+    parts: List[str] = []
+    stream = None
+    try:
+        if cancel_token:
+            cancel_token.raise_if_cancelled()
+
+        cached = _cache_lookup(user_input, history)
+        if cached:
+            yield {"type": "delta", "content": cached["final"]}
+            yield cached
+            return
+
+        messages, context_log = _build_messages(user_input, history, conversation_id)
+        client = get_cerebras_client(os.environ.get("CEREBRAS_API_KEY"))
+        stream = client.chat.completions.create(messages=messages, **_COMPLETION_PARAMS)
+
+        # Hand each delta to the caller as soon as it arrives
+        for chunk in stream:
+            if cancel_token:
+                cancel_token.raise_if_cancelled()
+            delta = chunk.choices[0].delta.content or ""
+            if delta:
+                parts.append(delta)
+                yield {"type": "delta", "content": delta}
+
+        _cache_store(user_input, history, parts)
+        yield _done_event(parts, context_log)
+    except TaskCancelled as e:
+        yield _cancelled_event(parts, str(e))
+    except Exception as e:
+        yield _error_event(e)
+    finally:
+        # Closing the HTTP response stops generation (and token spend) if we stop early
+        if stream is not None:
+            stream.close()
+
+def run_agent_once(user_input: str, history: List[Dict[str, Any]], cancel_token: CancelToken | None = None,
+                   conversation_id: Any = None) -> Dict[str, Any]:
     """
     Runs a simplified agent that directly calls the Cerebras model.
     This replaces the complex LangGraph agent for this specific workflow.
+    Collects the output of `stream_agent_once` for callers that need the whole answer.
     """
+    final_event = None
+    # Tools called during the run see this conversation and token (see core.request_scope)
+    with request_scope(conversation_id, cancel_token):
+        for event in stream_agent_once(user_input, history, cancel_token, conversation_id):
+            if event["type"] == "done":
+                final_event = event
+    return _final_result(final_event)
+
+# --- Async Agent Runner (used by the ASGI server) ---
+
+async def astream_agent_once(user_input: str, history: List[Dict[str, Any]], conversation_id: Any = None) -> AsyncIterator[Dict[str, Any]]:
+    """Async twin of `stream_agent_once`; awaits the model instead of blocking a thread."""
+    parts: List[str] = []
+    stream = None
     try:
-        client = Cerebras(api_key=os.environ.get("CEREBRAS_API_KEY"))
-
-        # Combine history and the new user input for the model
-        messages = [{"role": "system", "content": "You are a helpful assistant."}]
-        for item in history:
-            # Assuming history items have 'role' and 'content'
-            messages.append(item)
-        messages.append({"role": "user", "content": user_input})
-
-        stream = client.chat.completions.create(
-            messages=messages,
-            model="llama-3.3-70b",
-            stream=True,
-            max_completion_tokens=2048,
-            temperature=0.2,
-            top_p=1
-        )
-
-        # Since the backend doesn't stream to the frontend, we collect the full response
-        full_response = ""
-        for chunk in stream:
-            full_response += chunk.choices[0].delta.content or ""
+        # Cache lookups embed the prompt, so keep them off the event loop too
+        cached = await asyncio.to_thread(_cache_lookup, user_input, history)
+        if cached:
+            yield {"type": "delta", "content": cached["final"]}
+            yield cached
+            return
+
+        # Context assembly may call the LLM to summarize, so keep it off the event loop
+        messages, context_log = await asyncio.to_thread(_build_messages, user_input, history, conversation_id)
+        client = get_async_cerebras_client(os.environ.get("CEREBRAS_API_KEY"))
+        stream = await client.chat.completions.create(messages=messages, **_COMPLETION_PARAMS)
 
-        return {
-            "final": full_response or "The agent processed the request but returned no content.",
-            "log": ["Agent task completed using direct Cerebras call."]
-        }
+        async for chunk in stream:
+            delta = chunk.choices[0].delta.content or ""
+            if delta:
+                parts.append(delta)
+                yield {"type": "delta", "content": delta}
 
+        await asyncio.to_thread(_cache_store, user_input, history, parts)
+        yield _done_event(parts, context_log)
     except Exception as e:
-        print(f"❌ Error in simplified agent: {e}")
-        return {
-            "final": f"An error occurred while processing your request: {e}",
-            "log": [f"Error: {e}"]
-        }
\ No newline at end of file
+        yield _error_event(e)
+    finally:
+        if stream is not None:
+            await stream.close()
+
+async def arun_agent_once(user_input: str, history: List[Dict[str, Any]], conversation_id: Any = None) -> Dict[str, Any]:
+    """Async twin of `run_agent_once`."""
+    final_event = None
+    with request_scope(conversation_id):
+        async for event in astream_agent_once(user_input, history, conversation_id):
+            if event["type"] == "done":
+                final_event = event
+    return _final_result(final_event)
@@ -1,9 +1,13 @@
 # app.py
 import os
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, request, jsonify, send_from_directory, Response, stream_with_context
 from flask_cors import CORS
+from werkzeug.utils import secure_filename
 
-from agent import run_agent_once, ingest_knowledge_base
+from agent import run_agent_once, stream_agent_once
+from core.config import UPLOAD_DIR
+from core.jobs import get_ingest_queue, staged_upload_path
+from core.utils import agent_event_to_sse
 
 # --- Flask App Initialization ---
 
@@ -34,11 +38,12 @@ def chat():
     data = request.json
     user_input = data.get('message', '')
     history = data.get('history', [])
+    conversation_id = data.get('conversation_id')
     
     if not user_input:
         return jsonify({"error": "No message provided"}), 400
 
-    result = run_agent_once(user_input, history)
+    result = run_agent_once(user_input, history, conversation_id=conversation_id)
     
     # Ensure the response is JSON serializable
     final_answer = result.get("final", "Sorry, I encountered an issue.")
@@ -46,6 +51,30 @@ def chat():
     
     return jsonify({"answer": final_answer, "log": agent_log})
 
+@app.route('/api/chat/stream', methods=['POST'])
+def chat_stream():
+    """
+    Streams the agent's answer as Server-Sent Events.
+    Emits a `delta` event per token chunk and a final `done` event with the answer and log.
+    """
+    data = request.json
+    user_input = data.get('message', '')
+    history = data.get('history', [])
+    conversation_id = data.get('conversation_id')
+
+    if not user_input:
+        return jsonify({"error": "No message provided"}), 400
+
+    def generate():
+        for event in stream_agent_once(user_input, history, conversation_id=conversation_id):
+            yield agent_event_to_sse(event)
+
+    headers = {
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",  # Stop reverse proxies from buffering the stream
+    }
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers=headers)
+
 @app.route('/api/proposal/<int:proposal_id>/interrupt', methods=['POST'])
 def interrupt_proposal(proposal_id):
     """Interrupts an in-progress agent task."""
@@ -58,6 +87,68 @@ def interrupt_proposal(proposal_id):
         print(f"Error interrupting proposal {proposal_id}: {e}")
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/upload', methods=['POST'])
+def upload_file():
+    """Saves an uploaded file and queues it for ingestion into the knowledge base."""
+    file = request.files.get('file')
+    if file is None or not file.filename:
+        return jsonify({"error": "No file provided"}), 400
+
+    filename = secure_filename(file.filename)
+    if not filename:
+        return jsonify({"error": "Invalid file name"}), 400
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    file_path = os.path.join(UPLOAD_DIR, filename)
+    # Written beside the target; the ingest job swaps it in under the source's lock
+    staged_path = staged_upload_path(file_path)
+    file.save(staged_path)
+
+    # Ingestion runs on the background job pool; the client polls /api/upload/<job_id>
+    job_id = get_ingest_queue().submit(file_path, staged_path)
+    return jsonify({"job_id": job_id, "filename": filename, "status_url": f"/api/upload/{job_id}"}), 202
+
+@app.route('/api/upload/<job_id>', methods=['GET'])
+def upload_status(job_id):
+    """Reports the state, chunk counts and timing of an ingestion job."""
+    job = get_ingest_queue().get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job"}), 404
+    return jsonify(job), 200
+
+# --- Knowledge Base Sources ---
+
+@app.route('/api/sources', methods=['GET'])
+def list_sources():
+    """Lists ingested files with their chunk counts."""
+    from core.ingest import list_sources as list_ingested_sources
+    return jsonify({"sources": list_ingested_sources()}), 200
+
+@app.route('/api/sources/<filename>', methods=['GET'])
+def get_source(filename):
+    """Returns a page of one file's chunks (?limit=&offset=)."""
+    from core.ingest import source_chunks
+    try:
+        limit = int(request.args.get('limit', 100))
+        offset = int(request.args.get('offset', 0))
+    except ValueError:
+        return jsonify({"error": "limit and offset must be integers"}), 400
+    if limit < 1 or offset < 0:
+        return jsonify({"error": "limit must be at least 1 and offset at least 0"}), 400
+    limit = min(limit, 1000)
+    page = source_chunks(os.path.join(UPLOAD_DIR, secure_filename(filename)), limit=limit, offset=offset)
+    if page is None:
+        return jsonify({"error": "Unknown source"}), 404
+    return jsonify(page), 200
+
+@app.route('/api/sources/<filename>', methods=['DELETE'])
+def delete_source(filename):
+    """Removes a file's chunks from the knowledge base."""
+    from core.ingest import delete_source as delete_ingested_source
+    result = delete_ingested_source(os.path.join(UPLOAD_DIR, secure_filename(filename)))
+    if not result["found"]:
+        return jsonify({"error": "Unknown source"}), 404
+    return jsonify(result), 200
+
 # --- Static File Serving ---
 
 @app.route('/', defaults={'path': ''})
@@ -0,0 +1,171 @@
+# app_async.py
+# Asyncio (ASGI) version of the API in app.py, served by `python main.py serve --async`.
+# Handlers are coroutines: the LLM call and Supabase writes are awaited, and blocking
+# work (ingestion) runs on the background job pool, so one process can hold many generations in flight.
+import os
+import asyncio
+from quart import Quart, request, jsonify, send_from_directory, Response
+from quart_cors import cors
+from werkzeug.utils import secure_filename
+from supabase import acreate_client, AsyncClient
+
+from agent import arun_agent_once, astream_agent_once
+from core.config import UPLOAD_DIR
+from core.jobs import get_ingest_queue, staged_upload_path
+from core.llm import aclose_clients
+from core.utils import agent_event_to_sse
+
+# --- Quart App Initialization ---
+
+app = Quart(__name__, static_folder='../frontend/build', static_url_path='/')
+app = cors(app, allow_origin="*")
+
+# Generations and uploads can run well past Quart's 60s defaults
+app.config["RESPONSE_TIMEOUT"] = None
+app.config["BODY_TIMEOUT"] = None
+app.config["MAX_CONTENT_LENGTH"] = None
+
+# --- Supabase Client Initialization ---
+
+url: str = os.environ.get("REACT_APP_SUPABASE_URL")
+key: str = os.environ.get("REACT_APP_SUPABASE_ANON_KEY") # Use anon key for server-side actions
+
+if not url or not key:
+    raise Exception("Supabase URL and Key must be provided in your .env file for the backend server.")
+
+supabase: AsyncClient | None = None
+
+@app.before_serving
+async def startup():
+    global supabase
+    supabase = await acreate_client(url, key)
+    print("✅ Async Supabase client initialized for ASGI server.")
+
+@app.after_serving
+async def shutdown():
+    await aclose_clients()
+
+# --- API Routes ---
+
+@app.route('/api/chat', methods=['POST'])
+async def chat():
+    """Handles chat messages from the frontend."""
+    data = await request.get_json()
+    user_input = data.get('message', '')
+    history = data.get('history', [])
+    conversation_id = data.get('conversation_id')
+
+    if not user_input:
+        return jsonify({"error": "No message provided"}), 400
+
+    result = await arun_agent_once(user_input, history, conversation_id)
+
+    final_answer = result.get("final", "Sorry, I encountered an issue.")
+    agent_log = result.get("log", [])
+
+    return jsonify({"answer": final_answer, "log": agent_log})
+
+@app.route('/api/chat/stream', methods=['POST'])
+async def chat_stream():
+    """Streams the agent's answer as Server-Sent Events (see app.chat_stream)."""
+    data = await request.get_json()
+    user_input = data.get('message', '')
+    history = data.get('history', [])
+    conversation_id = data.get('conversation_id')
+
+    if not user_input:
+        return jsonify({"error": "No message provided"}), 400
+
+    async def generate():
+        async for event in astream_agent_once(user_input, history, conversation_id):
+            yield agent_event_to_sse(event)
+
+    headers = {
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+    }
+    return Response(generate(), mimetype='text/event-stream', headers=headers)
+
+@app.route('/api/proposal/<int:proposal_id>/interrupt', methods=['POST'])
+async def interrupt_proposal(proposal_id):
+    """Interrupts an in-progress agent task."""
+    try:
+        await supabase.table('proposals').update({'status': 'interrupted'}).eq('id', proposal_id).execute()
+        return jsonify({"message": "Interruption signal sent."}), 200
+    except Exception as e:
+        print(f"Error interrupting proposal {proposal_id}: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/upload', methods=['POST'])
+async def upload_file():
+    """Saves an uploaded file and queues it for ingestion into the knowledge base."""
+    files = await request.files
+    file = files.get('file')
+    if file is None or not file.filename:
+        return jsonify({"error": "No file provided"}), 400
+
+    filename = secure_filename(file.filename)
+    if not filename:
+        return jsonify({"error": "Invalid file name"}), 400
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    file_path = os.path.join(UPLOAD_DIR, filename)
+    # Written beside the target; the ingest job swaps it in under the source's lock
+    staged_path = staged_upload_path(file_path)
+    await file.save(staged_path)
+
+    # Ingestion runs on the background job pool; the client polls /api/upload/<job_id>
+    job_id = get_ingest_queue().submit(file_path, staged_path)
+    return jsonify({"job_id": job_id, "filename": filename, "status_url": f"/api/upload/{job_id}"}), 202
+
+@app.route('/api/upload/<job_id>', methods=['GET'])
+async def upload_status(job_id):
+    """Reports the state, chunk counts and timing of an ingestion job."""
+    job = get_ingest_queue().get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job"}), 404
+    return jsonify(job), 200
+
+# --- Knowledge Base Sources ---
+
+@app.route('/api/sources', methods=['GET'])
+async def list_sources():
+    """Lists ingested files with their chunk counts."""
+    from core.ingest import list_sources as list_ingested_sources
+    return jsonify({"sources": await asyncio.to_thread(list_ingested_sources)}), 200
+
+@app.route('/api/sources/<filename>', methods=['GET'])
+async def get_source(filename):
+    """Returns a page of one file's chunks (?limit=&offset=)."""
+    from core.ingest import source_chunks
+    try:
+        limit = int(request.args.get('limit', 100))
+        offset = int(request.args.get('offset', 0))
+    except ValueError:
+        return jsonify({"error": "limit and offset must be integers"}), 400
+    if limit < 1 or offset < 0:
+        return jsonify({"error": "limit must be at least 1 and offset at least 0"}), 400
+    limit = min(limit, 1000)
+    page = await asyncio.to_thread(source_chunks, os.path.join(UPLOAD_DIR, secure_filename(filename)), limit, offset)
+    if page is None:
+        return jsonify({"error": "Unknown source"}), 404
+    return jsonify(page), 200
+
+@app.route('/api/sources/<filename>', methods=['DELETE'])
+async def delete_source(filename):
+    """Removes a file's chunks from the knowledge base."""
+    from core.ingest import delete_source as delete_ingested_source
+    result = await asyncio.to_thread(delete_ingested_source, os.path.join(UPLOAD_DIR, secure_filename(filename)))
+    if not result["found"]:
+        return jsonify({"error": "Unknown source"}), 404
+    return jsonify(result), 200
+
+# --- Static File Serving ---
+
+@app.route('/', defaults={'path': ''})
+@app.route('/<path:path>')
+async def serve(path):
+    """Serves the React frontend."""
+    if path != "" and os.path.exists(os.path.join(app.static_folder, path)):
+        return await send_from_directory(app.static_folder, path)
+    else:
+        return await send_from_directory(app.static_folder, 'index.html')
@@ -0,0 +1,86 @@
+# benchmarks/bench_coding_agent.py
+# Tracks the non-LLM overhead of the coding agent (graph setup, planning/JSON handling,
+# tool execution, verification) by replacing coding.get_coding_llm with an instant stub.
+# Compares compiling the graph per request (the old behaviour) with the shared graph.
+#
+#   python benchmarks/bench_coding_agent.py --requests 50
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+class _Message:
+    def __init__(self, content: str):
+        self.content = content
+
+class StubCodingLLM:
+    """Answers planning prompts with a fixed plan and everything else with a canned draft."""
+    def __init__(self, workdir: str, files: int):
+        plan = []
+        for i in range(files):
+            path = os.path.join(workdir, f"file_{i}.py")
+            plan.append({"tool": "tool_write_file", "args": {"file_path": path, "content": f"print({i})\n"},
+                         "reason": "write", "depends_on": []})
+            plan.append({"tool": "tool_read_file", "args": {"file_path": path},
+                         "reason": "read back", "depends_on": [len(plan)]})
+        self.plan_json = json.dumps(plan)
+
+    def _answer(self, prompt) -> str:
+        text = prompt if isinstance(prompt, str) else str(prompt)
+        return self.plan_json if "execution plan" in text else "## ✅ Done\n\nAll files written."
+
+    def invoke(self, prompt):
+        return _Message(self._answer(prompt))
+
+    def stream(self, prompt):
+        answer = self._answer(prompt)
+        for i in range(0, len(answer), 16):
+            yield _Message(answer[i:i + 16])
+
+def _time_requests(run, requests: int) -> list[float]:
+    samples = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            run()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+def _summarize(name: str, samples: list[float]):
+    samples_ms = sorted(s * 1000 for s in samples)
+    p99 = samples_ms[min(len(samples_ms) - 1, int(len(samples_ms) * 0.99))]
+    print(f"{name:<28} mean {statistics.mean(samples_ms):8.3f} ms   "
+          f"p50 {statistics.median(samples_ms):8.3f} ms   p99 {p99:8.3f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark coding-agent overhead with a stubbed LLM.")
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--files", type=int, default=3, help="Files written and read back per request")
+    args = parser.parse_args()
+
+    import coding
+
+    with tempfile.TemporaryDirectory() as workdir:
+        stub = StubCodingLLM(workdir, args.files)
+        coding.get_coding_llm = lambda: stub
+        prompt = "Create a few small Python files"
+
+        _summarize("graph compile only", _time_requests(coding.build_coding_agent_graph, args.requests))
+
+        shared = coding.get_coding_graph
+        coding.get_coding_graph = coding.build_coding_agent_graph
+        _summarize("compile per request", _time_requests(lambda: coding.tool_coding_agent(prompt), args.requests))
+        coding.get_coding_graph = shared
+
+        coding.get_coding_graph()  # Warm the shared graph so the first sample isn't the compile
+        _summarize("shared compiled graph", _time_requests(lambda: coding.tool_coding_agent(prompt), args.requests))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# benchmarks/bench_import_time.py
+# Startup cost of each CLI command, measured with `python -X importtime`.
+# Every scenario runs in a fresh interpreter; the report shows total import time,
+# peak RSS and the heaviest top-level imports, so regressions in lazy loading show up.
+#
+#   python benchmarks/bench_import_time.py
+#   python benchmarks/bench_import_time.py --repeat 5 --top 10
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.stub_llm import start_stub_server
+
+# Placeholder credentials let the web apps import without a real Supabase project
+_DUMMY_ENV = {
+    "CEREBRAS_API_KEY": "stub-key",
+    "REACT_APP_SUPABASE_URL": "http://127.0.0.1:54321",
+    "REACT_APP_SUPABASE_ANON_KEY": "eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoiYW5vbiJ9.c3R1Yg",
+}
+
+# name -> interpreter arguments reproducing what the command imports before doing real work
+SCENARIOS = {
+    "main.py --help": ["main.py", "--help"],
+    "main.py chat": ["main.py", "chat", "hi"],
+    "main.py serve": ["-c", "import main; from app import app"],
+    "main.py serve --async": ["-c", "import main; from app_async import app"],
+}
+
+_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+def _parse_importtime(stderr: str):
+    """Returns (total seconds, [(cumulative seconds, module)] for top-level imports)."""
+    total_us = 0
+    top_level = []
+    for line in stderr.splitlines():
+        match = _LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, module = match.groups()
+        total_us += int(self_us)
+        if len(indent) <= 1:
+            top_level.append((int(cumulative_us) / 1e6, module))
+    return total_us / 1e6, sorted(top_level, reverse=True)
+
+def _run(args, env):
+    start = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-X", "importtime", *args], cwd=ROOT, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    stderr = proc.stderr.read()
+    # wait4 gives this child's own peak RSS (KiB on Linux)
+    _, status, usage = os.wait4(proc.pid, 0)
+    wall = time.perf_counter() - start
+    total, top = _parse_importtime(stderr)
+    return os.waitstatus_to_exitcode(status), wall, total, top, usage.ru_maxrss
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure import-time startup cost per CLI command.")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--top", type=int, default=5, help="Heaviest top-level imports to list per command.")
+    args = parser.parse_args()
+
+    stub, stub_url = start_stub_server()
+    env = dict(os.environ, **_DUMMY_ENV, CEREBRAS_BASE_URL=stub_url)
+
+    try:
+        for name, scenario in SCENARIOS.items():
+            runs = [_run(scenario, env) for _ in range(args.repeat)]
+            failed = [r for r in runs if r[0] != 0]
+            walls = [r[1] for r in runs]
+            imports = [r[2] for r in runs]
+            print(f"\n== {name} ==")
+            if failed:
+                print(f"   ⚠️  {len(failed)}/{len(runs)} runs exited with a non-zero status")
+            print(f"   wall  median {statistics.median(walls):6.2f}s   imports median {statistics.median(imports):6.2f}s   "
+                  f"peak RSS {statistics.median(r[4] for r in runs) / 1024:6.0f} MiB")
+            for cumulative, module in runs[-1][3][:args.top]:
+                print(f"   {cumulative:6.3f}s  {module}")
+    finally:
+        stub.shutdown()
+
+if __name__ == "__main__":
+    main()
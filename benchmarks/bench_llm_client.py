@@ -0,0 +1,68 @@
+# benchmarks/bench_llm_client.py
+# Measures per-request client overhead of building a fresh Cerebras client for
+# every call (the old behaviour) against the pooled registry in core.llm.
+#
+#   python benchmarks/bench_llm_client.py --requests 200
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.stub_llm import start_stub_server
+
+def _one_call(client):
+    client.chat.completions.create(
+        messages=[{"role": "user", "content": "ping"}],
+        model="llama-3.3-70b",
+        max_completion_tokens=16,
+    )
+
+def _summarize(name: str, samples: list[float], connections: int):
+    samples_ms = sorted(s * 1000 for s in samples)
+    p99 = samples_ms[min(len(samples_ms) - 1, int(len(samples_ms) * 0.99))]
+    print(f"{name:<28} mean {statistics.mean(samples_ms):7.3f} ms   "
+          f"p50 {statistics.median(samples_ms):7.3f} ms   p99 {p99:7.3f} ms   "
+          f"TCP connections {connections}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark per-request LLM client overhead.")
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    server, base_url = start_stub_server()
+    handler = server.RequestHandlerClass
+    os.environ["CEREBRAS_BASE_URL"] = base_url
+    os.environ.setdefault("CEREBRAS_API_KEY", "stub-key")
+
+    from cerebras.cloud.sdk import Cerebras
+    from core.llm import get_cerebras_client, close_clients
+
+    # Before: a new client (and connection pool) per request
+    handler.connections = 0
+    samples = []
+    for _ in range(args.requests):
+        start = time.perf_counter()
+        client = Cerebras(api_key=os.environ["CEREBRAS_API_KEY"], base_url=base_url)
+        _one_call(client)
+        samples.append(time.perf_counter() - start)
+        client.close()
+    _summarize("new client per request", samples, handler.connections)
+
+    # After: the shared registry client, warmed by one call
+    handler.connections = 0
+    _one_call(get_cerebras_client(os.environ["CEREBRAS_API_KEY"]))
+    samples = []
+    for _ in range(args.requests):
+        start = time.perf_counter()
+        _one_call(get_cerebras_client(os.environ["CEREBRAS_API_KEY"]))
+        samples.append(time.perf_counter() - start)
+    _summarize("pooled registry client", samples, handler.connections)
+
+    close_clients()
+    server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# benchmarks/bench_memory_backends.py
+# Recall@k and query latency of the memory-mapped NumPy index (core.vector_index) against
+# Chroma, on synthetic clustered embeddings so no embedding model is needed. Recall is
+# measured against exact float32 search over the same vectors.
+#
+#   python benchmarks/bench_memory_backends.py --sizes 10000,100000,1000000 --chroma-max 100000
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+def _dataset(n: int, dim: int, queries: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(16, n // 500), dim)).astype(np.float32)
+    def sample(count):
+        return centers[rng.integers(0, len(centers), count)] + 0.35 * rng.normal(size=(count, dim)).astype(np.float32)
+    vectors = sample(n)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    qs = sample(queries)
+    qs /= np.linalg.norm(qs, axis=1, keepdims=True)
+    return vectors, qs
+
+def _truth(vectors: np.ndarray, queries: np.ndarray, k: int):
+    return [set(np.argpartition(-(vectors @ q), k)[:k].tolist()) for q in queries]
+
+def _report(name: str, n: int, latencies: list[float], hits: list[set], truth: list[set], k: int, build_s: float):
+    lat_ms = sorted(x * 1000 for x in latencies)
+    p99 = lat_ms[min(len(lat_ms) - 1, int(len(lat_ms) * 0.99))]
+    recall = statistics.mean(len(h & t) / k for h, t in zip(hits, truth))
+    print(f"{name:<16} n={n:<8} build {build_s:8.2f} s   recall@{k} {recall:.3f}   "
+          f"mean {statistics.mean(lat_ms):8.3f} ms   p99 {p99:8.3f} ms")
+
+def bench_mmap(vectors, queries, truth, k: int, ivf_min: int, nprobe: int, label: str):
+    from core.vector_index import MmapVectorStore
+    with tempfile.TemporaryDirectory() as path:
+        start = time.perf_counter()
+        store = MmapVectorStore(path, ivf_min_entries=ivf_min, nprobe=nprobe)
+        texts = [""] * len(vectors)
+        for i in range(0, len(vectors), 100000):
+            store.add_vectors(vectors[i:i + 100000], texts[i:i + 100000], ids=[str(j) for j in range(i, min(len(vectors), i + 100000))])
+        build_s = time.perf_counter() - start
+        reader = MmapVectorStore(path, read_only=True, nprobe=nprobe)
+        latencies, hits = [], []
+        for q in queries:
+            t = time.perf_counter()
+            rows = reader.search_vectors(q, k)
+            latencies.append(time.perf_counter() - t)
+            hits.append({row for row, _ in rows})
+        _report(label, len(vectors), latencies, hits, truth, k, build_s)
+
+def bench_chroma(vectors, queries, truth, k: int):
+    try:
+        import chromadb
+    except ImportError:
+        print("chroma           skipped (chromadb not installed)")
+        return
+    with tempfile.TemporaryDirectory() as path:
+        client = chromadb.PersistentClient(path=path)
+        collection = client.create_collection("bench", metadata={"hnsw:space": "cosine"})
+        start = time.perf_counter()
+        batch = 5000
+        for i in range(0, len(vectors), batch):
+            collection.add(ids=[str(j) for j in range(i, min(len(vectors), i + batch))],
+                           embeddings=vectors[i:i + batch].tolist(), documents=[""] * len(vectors[i:i + batch]))
+        build_s = time.perf_counter() - start
+        latencies, hits = [], []
+        for q in queries:
+            t = time.perf_counter()
+            result = collection.query(query_embeddings=[q.tolist()], n_results=k)
+            latencies.append(time.perf_counter() - t)
+            hits.append({int(i) for i in result["ids"][0]})
+        _report("chroma", len(vectors), latencies, hits, truth, k, build_s)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark agent memory backends.")
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--dim", type=int, default=384, help="all-MiniLM-L6-v2 produces 384 dimensions")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nprobe", type=int, default=8)
+    parser.add_argument("--chroma-max", type=int, default=100000, help="Skip Chroma above this size (slow to build)")
+    args = parser.parse_args()
+
+    for n in (int(s) for s in args.sizes.split(",")):
+        vectors, queries = _dataset(n, args.dim, args.queries)
+        truth = _truth(vectors, queries, args.k)
+        bench_mmap(vectors, queries, truth, args.k, ivf_min=n + 1, nprobe=args.nprobe, label="mmap exact")
+        bench_mmap(vectors, queries, truth, args.k, ivf_min=min(n, 50000), nprobe=args.nprobe, label="mmap ivf")
+        if n <= args.chroma_max:
+            bench_chroma(vectors, queries, truth, args.k)
+        else:
+            print(f"chroma           n={n:<8} skipped (--chroma-max {args.chroma_max})")
+
+if __name__ == "__main__":
+    main()
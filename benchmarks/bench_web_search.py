@@ -0,0 +1,44 @@
+# benchmarks/bench_web_search.py
+# Compares one-at-a-time uncached searches with the cached, concurrent batch API in
+# core.search, against the local stub search server.
+#
+#   python benchmarks/bench_web_search.py --queries 8 --delay 0.3
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.stub_search import start_stub_search_server
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cached and concurrent web search.")
+    parser.add_argument("--queries", type=int, default=8)
+    parser.add_argument("--delay", type=float, default=0.3, help="Simulated search latency in seconds")
+    args = parser.parse_args()
+
+    server, url = start_stub_search_server(args.delay)
+    from core.search import HTTPSearchBackend, WebSearcher
+
+    queries = [f"topic {i}" for i in range(args.queries)]
+    backend = HTTPSearchBackend(url)
+
+    uncached = WebSearcher(backend, ttl=0)
+    start = time.perf_counter()
+    for query in queries:
+        uncached.search(query)
+    print(f"{'sequential, no cache':<24} {time.perf_counter() - start:7.3f} s")
+
+    searcher = WebSearcher(backend)
+    start = time.perf_counter()
+    searcher.search_many(queries)
+    print(f"{'batch, cold cache':<24} {time.perf_counter() - start:7.3f} s")
+
+    start = time.perf_counter()
+    searcher.search_many([q.upper() for q in queries])
+    print(f"{'batch, warm cache':<24} {time.perf_counter() - start:7.3f} s   {searcher.stats()}")
+    server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+# benchmarks/load_test_chat.py
+# Load-tests /api/chat against a local fake LLM endpoint and reports p50/p99
+# latency per concurrency level plus the highest level served without errors.
+#
+# By default it starts benchmarks/stub_llm.py and `python main.py serve [--async]`
+# itself, pointed at each other through CEREBRAS_BASE_URL:
+#
+#   python benchmarks/load_test_chat.py --async --levels 50 100 200 400
+#   python benchmarks/load_test_chat.py --url http://localhost:5000   # existing server
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.stub_llm import start_stub_server
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def _wait_for_port(port: int, timeout: float = 120.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        with socket.socket() as s:
+            if s.connect_ex(("127.0.0.1", port)) == 0:
+                return
+        time.sleep(0.5)
+    raise TimeoutError(f"server did not start listening on port {port}")
+
+def _percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+async def _run_level(client: httpx.AsyncClient, url: str, concurrency: int) -> dict:
+    async def one():
+        start = time.perf_counter()
+        try:
+            response = await client.post(f"{url}/api/chat", json={"message": "ping", "history": []})
+            ok = response.status_code == 200 and "error occurred" not in response.json().get("answer", "")
+        except httpx.HTTPError:
+            ok = False
+        return ok, time.perf_counter() - start
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(one() for _ in range(concurrency)))
+    wall = time.perf_counter() - start
+    latencies = [latency for ok, latency in results if ok]
+    return {
+        "concurrency": concurrency,
+        "ok": len(latencies),
+        "errors": concurrency - len(latencies),
+        "p50": _percentile(latencies, 0.50) if latencies else float("nan"),
+        "p99": _percentile(latencies, 0.99) if latencies else float("nan"),
+        "rps": len(latencies) / wall,
+    }
+
+async def _load_test(url: str, levels: list[int], timeout: float) -> list[dict]:
+    limits = httpx.Limits(max_connections=max(levels), max_keepalive_connections=max(levels))
+    async with httpx.AsyncClient(limits=limits, timeout=timeout) as client:
+        return [await _run_level(client, url, level) for level in levels]
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the chat API against a fake LLM.")
+    parser.add_argument("--url", help="Test an already running server instead of starting one.")
+    parser.add_argument("--async", dest="use_async", action="store_true", help="Start the ASGI server (serve --async).")
+    parser.add_argument("--levels", type=int, nargs="+", default=[10, 50, 100, 200, 400])
+    parser.add_argument("--token-delay", type=float, default=0.2, help="Seconds the fake LLM waits per streamed token.")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args()
+
+    stub, stub_url = start_stub_server(args.token_delay)
+    server = None
+    url = args.url
+    if url is None:
+        port = _free_port()
+        env = dict(os.environ, CEREBRAS_BASE_URL=stub_url, CEREBRAS_API_KEY="stub-key")
+        command = [sys.executable, "main.py", "serve", "--port", str(port)] + (["--async"] if args.use_async else [])
+        server = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL)
+        _wait_for_port(port)
+        url = f"http://127.0.0.1:{port}"
+
+    try:
+        results = asyncio.run(_load_test(url, args.levels, args.timeout))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+        stub.shutdown()
+
+    print(f"{'concurrency':>11} {'ok':>5} {'errors':>6} {'p50 (s)':>8} {'p99 (s)':>8} {'req/s':>7}")
+    for r in results:
+        print(f"{r['concurrency']:>11} {r['ok']:>5} {r['errors']:>6} {r['p50']:>8.3f} {r['p99']:>8.3f} {r['rps']:>7.1f}")
+
+    clean = [r["concurrency"] for r in results if r["errors"] == 0]
+    print(f"\nConcurrent-request capacity (highest level with no errors): {max(clean) if clean else 0}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# benchmarks/stub_llm.py
+# A tiny OpenAI/Cerebras-compatible chat completions server for benchmarks.
+# It answers every request with a canned reply (optionally streamed token by
+# token with an artificial delay) so client overhead can be measured without
+# network noise or API costs.
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REPLY_TOKENS = ["This ", "is ", "a ", "stubbed ", "answer."]
+
+def _completion(model: str, content: str) -> dict:
+    return {
+        "id": "chatcmpl-stub",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "finish_reason": "stop",
+                     "message": {"role": "assistant", "content": content}}],
+        "usage": {"prompt_tokens": 1, "completion_tokens": len(REPLY_TOKENS), "total_tokens": 1 + len(REPLY_TOKENS)},
+    }
+
+def _chunk(model: str, content: str | None, finish_reason: str | None = None) -> dict:
+    delta = {"content": content} if content is not None else {}
+    return {
+        "id": "chatcmpl-stub",
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+
+class StubLLMHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, so pooled clients can reuse connections
+    token_delay = 0.0
+    connections = 0
+
+    def setup(self):
+        super().setup()
+        type(self).connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, payload: dict, status: int = 200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        # Model listings and the SDK's TCP warm-up request
+        self._send_json({"object": "list", "data": []})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        request = json.loads(self.rfile.read(length) or b"{}")
+        model = request.get("model", "stub")
+
+        if not request.get("stream"):
+            time.sleep(self.token_delay * len(REPLY_TOKENS))
+            self._send_json(_completion(model, "".join(REPLY_TOKENS)))
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        events = [_chunk(model, token) for token in REPLY_TOKENS] + [_chunk(model, None, "stop")]
+        for event in events:
+            time.sleep(self.token_delay)
+            self._write_chunk(f"data: {json.dumps(event)}\n\n".encode())
+        self._write_chunk(b"data: [DONE]\n\n")
+        self._write_chunk(b"")
+
+    def _write_chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+def start_stub_server(token_delay: float = 0.0, port: int = 0):
+    """
+    Starts the stub server on a background thread.
+    Returns (server, base_url); call server.shutdown() when done.
+    """
+    handler = type("ConfiguredStubLLMHandler", (StubLLMHandler,), {"token_delay": token_delay, "connections": 0})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    server.request_queue_size = 1024
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, bound_port = server.server_address
+    return server, f"http://{host}:{bound_port}"
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Run a stub chat completions server.")
+    parser.add_argument("--port", type=int, default=8808)
+    parser.add_argument("--token-delay", type=float, default=0.05)
+    args = parser.parse_args()
+    server, base_url = start_stub_server(args.token_delay, args.port)
+    print(f"Stub LLM listening on {base_url} (set CEREBRAS_BASE_URL={base_url})")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
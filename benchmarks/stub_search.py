@@ -0,0 +1,59 @@
+# benchmarks/stub_search.py
+# A local search endpoint for the "http" web search backend (WEB_SEARCH_BACKEND=http).
+# Every query gets canned results after an artificial delay, so caching and
+# concurrency in core.search can be measured without hitting a real search engine.
+from __future__ import annotations
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+class StubSearchHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    delay = 0.0
+    requests = 0
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        type(self).requests += 1
+        params = parse_qs(urlparse(self.path).query)
+        query = params.get("q", [""])[0]
+        max_results = int(params.get("max_results", ["3"])[0])
+        time.sleep(self.delay)
+        results = [{"title": f"{query} result {i}", "href": f"https://example.com/{i}", "body": f"About {query}."}
+                   for i in range(max_results)]
+        body = json.dumps({"results": results}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+def start_stub_search_server(delay: float = 0.0, port: int = 0):
+    """
+    Starts the stub search server on a background thread.
+    Returns (server, url); point WEB_SEARCH_URL at the url and call server.shutdown() when done.
+    """
+    handler = type("ConfiguredStubSearchHandler", (StubSearchHandler,), {"delay": delay, "requests": 0})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, bound_port = server.server_address
+    return server, f"http://{host}:{bound_port}/search"
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Run a stub web search server.")
+    parser.add_argument("--port", type=int, default=8809)
+    parser.add_argument("--delay", type=float, default=0.3)
+    args = parser.parse_args()
+    server, url = start_stub_search_server(args.delay, args.port)
+    print(f"Stub search listening on {url} (set WEB_SEARCH_BACKEND=http WEB_SEARCH_URL={url})")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -1,9 +1,8 @@
 from __future__ import annotations
-import os, json
+import os, json, threading
 from typing import TypedDict, List, Dict, Any, Optional
 from langchain.schema import HumanMessage, SystemMessage, AIMessage
 from langgraph.graph import StateGraph, END
-from langchain_cerebras import ChatCerebras
 
 # ==================== Custom Tool Executor ====================
 class ToolInvocation:
@@ -24,16 +23,22 @@ class ToolExecutor:
         return tool_function(**tool_invocation.tool_input)
 
 # ==================== LLM Configuration ====================
-from core.config import _llm, LLM_MODEL
-
-# Specialized LLM optimized for coding tasks
-_coding_llm = ChatCerebras(
-    model="llama-3.3-70b",
-    temperature=0.54,
-    api_key=os.getenv("API_KEY"),
-    max_tokens=3755,
-    top_p=1
-)
+from core.config import LLM_MODEL, CODING_MAX_PARALLEL_STEPS
+from core.llm import get_chat_model
+from core.cancel import CancelToken
+from core.request_scope import current_cancel_token
+from core.steps import StepScheduler
+from core.utils import JSONArrayStreamParser
+
+def get_coding_llm():
+    """Specialized LLM optimized for coding tasks (built on first use, then shared)."""
+    return get_chat_model(
+        model="llama-3.3-70b",
+        temperature=0.54,
+        api_key=os.getenv("API_KEY"),
+        max_tokens=3755,
+        top_p=1
+    )
 
 from tools import tool_write_file, tool_read_file, tool_run_code
 from prompts import CODE_PLANNER_SYS
@@ -48,6 +53,9 @@ class CodingAgentState(TypedDict):
     final: str
     approved: bool
     log: List[str]
+    cancel_token: Optional[CancelToken]
+    cancelled: bool
+    scheduler: Optional[StepScheduler]
 
 # ==================== Tool Configuration ====================
 CODING_TOOLS = [tool_write_file, tool_read_file, tool_run_code]
@@ -64,10 +72,10 @@ def format_code_block(code: str, language: str = "python") -> str:
         return f"```{language}\n{code}\n```"
     return code
 
-def format_step_result(step_num: int, total: int, tool_name: str, success: bool) -> str:
+def format_step_result(step_num: int, total: Optional[int], tool_name: str, success: bool) -> str:
     """Format execution step results for better readability."""
     icon = "✅" if success else "❌"
-    progress = f"[{step_num}/{total}]"
+    progress = f"[{step_num}/{total or '?'}]"
     return f"{icon} {progress} {tool_name}"
 
 def format_error_message(error: str) -> str:
@@ -214,6 +222,11 @@ def format_code_properly(code: str, language: str = 'python') -> str:
     
     return code
 
+def is_cancelled(state: CodingAgentState) -> bool:
+    """True once the caller has cancelled this run; nodes check it before each expensive step."""
+    token = state.get("cancel_token")
+    return bool(token and token.cancelled)
+
 # ==================== Agent Nodes ====================
 def node_coding_planner(state: CodingAgentState) -> CodingAgentState:
     """
@@ -223,6 +236,9 @@ def node_coding_planner(state: CodingAgentState) -> CodingAgentState:
     print("\n" + "="*60)
     print("📝 PLANNING PHASE: Analyzing your request...")
     print("="*60)
+
+    if is_cancelled(state):
+        return {"plan": [], "cancelled": True, "log": state.get("log", []) + ["🛑 Cancelled before planning"]}
     
     tool_descriptions = "\n".join([
         f"  • {tool.__name__}: {tool.__doc__}" 
@@ -242,6 +258,9 @@ Generate a detailed JSON execution plan. Each step must include:
 - "tool": exact tool name to use
 - "args": dictionary of arguments (be specific with filenames, content, etc.)
 - "reason": clear explanation of why this step is necessary
+- "depends_on" (optional): list of earlier step numbers (starting at 1) that must finish first.
+  Use [] for steps that need nothing (e.g. reading or writing unrelated files) so they can run in parallel;
+  omit it to run the step after the previous one.
 
 📝 Output Format (JSON only, no additional text):
 [
@@ -253,40 +272,51 @@ Generate a detailed JSON execution plan. Each step must include:
   {{
     "tool": "tool_run_code",
     "args": {{"filename": "example.py"}},
-    "reason": "Execute and verify the code works correctly"
+    "reason": "Execute and verify the code works correctly",
+    "depends_on": [1]
   }}
 ]
 
 ⚠️  Important: Return ONLY the JSON array."""
 
+    # Steps start on the scheduler as soon as the streamed plan contains them
+    scheduler = StepScheduler(
+        lambda i, step: _run_plan_step(i, None, step),
+        max_workers=CODING_MAX_PARALLEL_STEPS,
+        should_stop=lambda: is_cancelled(state),
+    )
+    parser = JSONArrayStreamParser()
+    plan: List[Dict[str, Any]] = []
+    raw_response = ""
+    print("⏳ Generating execution plan (steps start as they arrive)...")
     try:
-        print("⏳ Generating execution plan...")
-        raw_response = _coding_llm.invoke(planning_prompt).content.strip()
-        
-        # Extract JSON from markdown code blocks if present
-        if "```json" in raw_response:
-            raw_response = raw_response.split("```json")[1].split("```")[0].strip()
-        elif "```" in raw_response:
-            raw_response = raw_response.split("```")[1].split("```")[0].strip()
-        
-        plan = json.loads(raw_response)
-        
-        if not isinstance(plan, list):
-            raise ValueError("Plan must be a list of executable steps")
-        
-        # Log successful planning
-        log = state.get("log", [])
-        log.append(f"✅ Generated execution plan with {len(plan)} steps")
-        
-        print(f"✅ Plan ready: {len(plan)} steps identified\n")
-        
-        return {"plan": plan, "log": log}
-        
-    except (json.JSONDecodeError, ValueError) as e:
+        for chunk in get_coding_llm().stream(planning_prompt):
+            text = chunk.content if isinstance(chunk.content, str) else ""
+            raw_response += text
+            for step in parser.feed(text):
+                if not isinstance(step, dict):
+                    raise ValueError("Plan must be a list of executable steps")
+                plan.append(step)
+                scheduler.add(len(plan), step)
+            if parser.done or parser.error or is_cancelled(state):
+                break
+        if not is_cancelled(state):
+            parser.close()
+    except Exception as e:  # Malformed JSON, or the stream itself broke off
+        scheduler.close()
         error_message = f"Planning failed: {str(e)}"
         print(f"\n❌ {error_message}")
         print(f"📄 Raw output (truncated): {raw_response[:300]}...\n")
-        
+
+        if plan:
+            # Steps already running can't be taken back; finish them and report the plan as partial
+            print(f"⚠️ Keeping the {len(plan)} step(s) parsed before the error\n")
+            return {
+                "plan": plan,
+                "scheduler": scheduler,
+                "log": state.get("log", []) + [f"⚠️ Plan stream ended early after {len(plan)} steps: {str(e)}"]
+            }
+        scheduler.results()
         return {
             "plan": [],
             "draft": format_section_header("Planning Error", "❌") + 
@@ -296,9 +326,57 @@ Generate a detailed JSON execution plan. Each step must include:
             "log": state.get("log", []) + [f"❌ Planning error: {str(e)}"]
         }
 
+    scheduler.close()
+    if is_cancelled(state):
+        return {"plan": plan, "scheduler": scheduler, "cancelled": True,
+                "log": state.get("log", []) + ["🛑 Cancelled while planning"]}
+
+    # Log successful planning
+    log = state.get("log", [])
+    log.append(f"✅ Generated execution plan with {len(plan)} steps")
+
+    print(f"✅ Plan ready: {len(plan)} steps identified\n")
+
+    return {"plan": plan, "scheduler": scheduler, "log": log}
+
+def _run_plan_step(i: int, total_steps: Optional[int], step: Dict[str, Any]):
+    """Run one plan step; returns its observation and execution-log line (total is None while the plan streams)."""
+    tool_name = step.get("tool", "unknown")
+    tool_args = step.get("args", {})
+    reason = step.get("reason", "No reason provided")
+    
+    print(f"📍 Step {i}/{total_steps or '?'}: {tool_name}")
+    print(f"   Reason: {reason}")
+    
+    tool_invocation = ToolInvocation(tool=tool_name, tool_input=tool_args)
+    
+    try:
+        result = coding_tool_executor.invoke(tool_invocation)
+        print(format_step_result(i, total_steps, tool_name, True))
+        return {
+            "step": i,
+            "tool": tool_name,
+            "args": tool_args,
+            "reason": reason,
+            "result": result,
+            "success": "error" not in result
+        }, f"✅ Step {i}: {tool_name} completed successfully"
+        
+    except Exception as e:
+        print(format_step_result(i, total_steps, tool_name, False))
+        print(f"   Error: {str(e)}")
+        return {
+            "step": i,
+            "tool": tool_name,
+            "args": tool_args,
+            "reason": reason,
+            "result": {"error": f"Execution failed: {str(e)}"},
+            "success": False
+        }, f"❌ Step {i}: {tool_name} failed - {str(e)}"
+
 def node_coding_executor(state: CodingAgentState) -> CodingAgentState:
     """
-    🛠️  Execution Phase: Execute the planned steps sequentially.
+    🛠️  Execution Phase: Execute the planned steps, running independent ones in parallel.
     Runs each tool and collects results for verification.
     """
     print("\n" + "="*60)
@@ -306,6 +384,13 @@ def node_coding_executor(state: CodingAgentState) -> CodingAgentState:
     print("="*60 + "\n")
     
     plan = state.get("plan", [])
+    scheduler = state.get("scheduler")
+
+    if state.get("cancelled"):
+        if scheduler is not None:
+            results = scheduler.results()  # Let steps already running finish
+            return {"observations": [observation for observation, _ in results]}
+        return {"observations": []}
     
     # Handle case where planning failed
     if not plan:
@@ -315,49 +400,32 @@ def node_coding_executor(state: CodingAgentState) -> CodingAgentState:
                           "\n\nNo execution plan was generated. Please try again with a clearer request.")
         }
     
-    observations = []
-    execution_log = []
     total_steps = len(plan)
-    
-    # Execute each step with progress tracking
-    for i, step in enumerate(plan, 1):
-        tool_name = step.get("tool", "unknown")
-        tool_args = step.get("args", {})
-        reason = step.get("reason", "No reason provided")
-        
-        print(f"📍 Step {i}/{total_steps}: {tool_name}")
-        print(f"   Reason: {reason}")
-        
-        tool_invocation = ToolInvocation(tool=tool_name, tool_input=tool_args)
-        
-        try:
-            result = coding_tool_executor.invoke(tool_invocation)
-            observations.append({
-                "step": i,
-                "tool": tool_name,
-                "args": tool_args,
-                "reason": reason,
-                "result": result,
-                "success": "error" not in result
-            })
-            print(format_step_result(i, total_steps, tool_name, True))
-            execution_log.append(f"✅ Step {i}: {tool_name} completed successfully")
-            
-        except Exception as e:
-            error_result = {"error": f"Execution failed: {str(e)}"}
-            observations.append({
-                "step": i,
-                "tool": tool_name,
-                "args": tool_args,
-                "reason": reason,
-                "result": error_result,
-                "success": False
-            })
-            print(format_step_result(i, total_steps, tool_name, False))
-            print(f"   Error: {str(e)}")
-            execution_log.append(f"❌ Step {i}: {tool_name} failed - {str(e)}")
+
+    # Steps whose dependencies are done run concurrently; observations stay in step order.
+    # The planner normally started them already while the plan was streaming.
+    if scheduler is None:
+        scheduler = StepScheduler(
+            lambda i, step: _run_plan_step(i, total_steps, step),
+            max_workers=min(CODING_MAX_PARALLEL_STEPS, total_steps),
+            should_stop=lambda: is_cancelled(state),
+        )
+        for i, step in enumerate(plan, 1):
+            scheduler.add(i, step)
+    results = scheduler.results()
+    observations = [observation for observation, _ in results]
+    execution_log = [line for _, line in results]
+
+    if scheduler.skipped:
+        execution_log.append(f"🛑 Cancelled; {len(scheduler.skipped)} step(s) skipped")
+        print(f"🛑 Cancelled: skipped steps {', '.join(map(str, scheduler.skipped))}")
+        return {"observations": observations, "cancelled": True, "log": state.get("log", []) + execution_log}
     
     print(f"\n✅ Execution complete: {total_steps} steps processed\n")
+
+    # Don't spend a summary generation on a run nobody is waiting for
+    if is_cancelled(state):
+        return {"observations": observations, "cancelled": True, "log": state.get("log", []) + execution_log}
     
     # Generate comprehensive, user-friendly summary
     draft_prompt = f"""You are a helpful coding assistant. Create a clear, well-formatted response based on the execution results.
@@ -387,7 +455,7 @@ def node_coding_executor(state: CodingAgentState) -> CodingAgentState:
 Make your response professional, friendly, and easy to understand."""
 
     try:
-        draft = _coding_llm.invoke(draft_prompt).content.strip()
+        draft = get_coding_llm().invoke(draft_prompt).content.strip()
     except Exception as e:
         draft = format_section_header("Execution Summary", "📊") + f"""
 
@@ -419,6 +487,14 @@ def node_coding_verifier(state: CodingAgentState) -> CodingAgentState:
     
     draft = state.get("draft", "")
     observations = state.get("observations", [])
+
+    if state.get("cancelled"):
+        completed = len(observations)
+        return {
+            "final": format_section_header("Cancelled", "🛑") +
+                     f"\n\nThe task was cancelled after {completed} step(s) completed.",
+            "approved": False
+        }
     
     # The draft from the executor is already well-formatted.
     # We will just add a concluding summary instead of a large header.
@@ -467,8 +543,20 @@ def build_coding_agent_graph():
     
     return workflow.compile()
 
+_coding_graph = None
+_coding_graph_lock = threading.Lock()
+
+def get_coding_graph():
+    """Compiled coding workflow, built on first use and shared (compiled graphs are safe to invoke concurrently)."""
+    global _coding_graph
+    if _coding_graph is None:
+        with _coding_graph_lock:
+            if _coding_graph is None:
+                _coding_graph = build_coding_agent_graph()
+    return _coding_graph
+
 # ==================== Main Entry Point ====================
-def tool_coding_agent(user_input: str) -> str:
+def tool_coding_agent(user_input: str, cancel_token: CancelToken | None = None) -> str:
     """
     🤖 Coding Agent Tool - Main Entry Point
     
@@ -479,18 +567,23 @@ def tool_coding_agent(user_input: str) -> str:
     
     Args:
         user_input: The user's coding request or question
+        cancel_token: Optional token; once cancelled, remaining steps and LLM calls are skipped.
+            Defaults to the token of the agent run this is called from (core.request_scope).
         
     Returns:
         A formatted string containing the complete response
     """
+    if cancel_token is None:
+        cancel_token = current_cancel_token()
+
     print("\n" + "="*60)
     print("🤖 CODING AGENT ACTIVATED")
     print("="*60)
     print(f"📨 Request: {user_input[:100]}{'...' if len(user_input) > 100 else ''}\n")
     
     try:
-        # Build and execute the workflow graph
-        coding_graph = build_coding_agent_graph()
+        # Reuse the process-wide compiled workflow graph
+        coding_graph = get_coding_graph()
         
         # Initialize state with all required fields
         initial_state = {
@@ -500,7 +593,10 @@ def tool_coding_agent(user_input: str) -> str:
             "draft": "",
             "final": "",
             "approved": False,
-            "log": []
+            "log": [],
+            "cancel_token": cancel_token,
+            "cancelled": False,
+            "scheduler": None
         }
         
         # Run the workflow
@@ -0,0 +1,226 @@
+# core/calc.py
+# Arithmetic evaluator behind tool_calculator. Expressions are parsed once (cached), checked
+# against a whitelist and an operation budget, then interpreted directly from the AST with
+# size guards so inputs like 9**9**9**9 are rejected instead of pinning a CPU. Batches of
+# same-shaped expressions and ranges over a variable are evaluated with NumPy when available.
+from __future__ import annotations
+import ast
+import copy
+import math
+import operator
+from functools import lru_cache
+from typing import Any, Dict, List, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from .config import (
+    CALC_MAX_EXPRESSION_CHARS, CALC_MAX_OPERATIONS, CALC_MAX_INT_BITS,
+    CALC_CACHE_SIZE, CALC_MAX_RANGE_POINTS, CALC_VECTORIZE_MIN,
+)
+
+class CalcError(ValueError):
+    """Raised for expressions that are invalid or exceed the evaluation limits."""
+
+_BINOPS = {
+    ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul, ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv, ast.Mod: operator.mod, ast.Pow: operator.pow,
+}
+_UNARYOPS = {ast.USub: operator.neg, ast.UAdd: operator.pos}
+_STRUCTURAL = (ast.Expression, ast.Load) + tuple(_BINOPS) + tuple(_UNARYOPS)
+
+# --- Parsing and Validation ---
+
+@lru_cache(maxsize=CALC_CACHE_SIZE)
+def parse_expression(expression: str, variables: Tuple[str, ...] = ()) -> ast.Expression:
+    """Parses and validates an expression; the returned tree is shared, so don't mutate it."""
+    if len(expression) > CALC_MAX_EXPRESSION_CHARS:
+        raise CalcError(f"expression longer than {CALC_MAX_EXPRESSION_CHARS} characters")
+    try:
+        tree = ast.parse(expression.strip(), mode="eval")
+    except SyntaxError as e:
+        raise CalcError(f"invalid expression: {e.msg}") from None
+    operations = 0
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.BinOp, ast.UnaryOp)):
+            operations += 1
+        elif isinstance(node, ast.Constant):
+            if isinstance(node.value, bool) or not isinstance(node.value, (int, float)):
+                raise CalcError(f"disallowed constant: {node.value!r}")
+            _check_size(node.value)
+        elif isinstance(node, ast.Name):
+            if node.id not in variables:
+                raise CalcError(f"unknown name: {node.id}")
+        elif not isinstance(node, _STRUCTURAL):
+            raise CalcError(f"disallowed expression: {type(node).__name__}")
+    if operations > CALC_MAX_OPERATIONS:
+        raise CalcError(f"more than {CALC_MAX_OPERATIONS} operations")
+    return tree
+
+# --- Scalar Interpreter ---
+
+def _check_size(value):
+    if isinstance(value, int) and value.bit_length() > CALC_MAX_INT_BITS:
+        raise CalcError(f"result exceeds {CALC_MAX_INT_BITS} bits")
+    if isinstance(value, float) and not math.isfinite(value):
+        raise CalcError("result out of floating-point range")
+
+def _apply(op: type, left, right):
+    # Estimate integer growth before doing the work, so huge powers/products never run
+    if isinstance(left, int) and isinstance(right, int):
+        if op is ast.Pow and right > 0 and abs(left) > 1 and (abs(left).bit_length() - 1) * right > CALC_MAX_INT_BITS:
+            raise CalcError(f"result exceeds {CALC_MAX_INT_BITS} bits")
+        if op is ast.Mult and left.bit_length() + right.bit_length() > CALC_MAX_INT_BITS + 1:
+            raise CalcError(f"result exceeds {CALC_MAX_INT_BITS} bits")
+    try:
+        value = _BINOPS[op](left, right)
+    except ZeroDivisionError:
+        raise CalcError("division by zero") from None
+    except OverflowError:
+        raise CalcError("result out of floating-point range") from None
+    if isinstance(value, complex):
+        raise CalcError("result is not a real number")
+    _check_size(value)
+    return value
+
+def _interpret(node: ast.AST, env: Dict[str, Any]):
+    if isinstance(node, ast.Expression):
+        return _interpret(node.body, env)
+    if isinstance(node, ast.Constant):
+        return node.value
+    if isinstance(node, ast.Name):
+        return env[node.id]
+    if isinstance(node, ast.UnaryOp):
+        return _UNARYOPS[type(node.op)](_interpret(node.operand, env))
+    return _apply(type(node.op), _interpret(node.left, env), _interpret(node.right, env))
+
+@lru_cache(maxsize=CALC_CACHE_SIZE)
+def evaluate(expression: str):
+    """Evaluates one arithmetic expression (memoized); raises CalcError."""
+    return _interpret(parse_expression(expression), {})
+
+# --- Vectorized Evaluation ---
+
+class _Templater(ast.NodeTransformer):
+    """Replaces each constant with a slot name so same-shaped expressions share one template."""
+    def __init__(self):
+        self.constants: List[Any] = []
+
+    def visit_Constant(self, node):
+        self.constants.append(node.value)
+        return ast.copy_location(ast.Name(id=f"_c{len(self.constants) - 1}", ctx=ast.Load()), node)
+
+def _vector_interpret(node: ast.AST, env: Dict[str, Any], peak: List[Any] | None = None):
+    """Interprets a tree over float64 arrays; `peak` collects the largest |intermediate| per element."""
+    if isinstance(node, ast.Expression):
+        return _vector_interpret(node.body, env, peak)
+    if isinstance(node, ast.Constant):
+        return float(node.value)
+    if isinstance(node, ast.Name):
+        value = env[node.id]
+    elif isinstance(node, ast.UnaryOp):
+        value = _UNARYOPS[type(node.op)](_vector_interpret(node.operand, env, peak))
+    else:
+        value = _BINOPS[type(node.op)](_vector_interpret(node.left, env, peak),
+                                       _vector_interpret(node.right, env, peak))
+    if peak is not None:
+        peak[0] = np.maximum(peak[0], np.abs(value))
+    return value
+
+def _vector_float_mask(node: ast.AST, env: Dict[str, Any], floats: Dict[str, Any]):
+    """Per element, whether Python would produce a float here: a float operand, /, or int ** negative int."""
+    if isinstance(node, ast.Expression):
+        return _vector_float_mask(node.body, env, floats)
+    if isinstance(node, ast.Name):
+        return floats[node.id]
+    if isinstance(node, ast.UnaryOp):
+        return _vector_float_mask(node.operand, env, floats)
+    if isinstance(node.op, ast.Div):
+        return True
+    mask = _vector_float_mask(node.left, env, floats) | _vector_float_mask(node.right, env, floats)
+    if isinstance(node.op, ast.Pow):
+        mask = mask | (_vector_interpret(node.right, env) < 0)
+    return mask
+
+def _result(fn, *args) -> Dict[str, Any]:
+    try:
+        return {"ok": True, "result": fn(*args)}
+    except CalcError as e:
+        return {"ok": False, "error": str(e)}
+
+def evaluate_batch(expressions: List[str]) -> List[Dict[str, Any]]:
+    """
+    Evaluates many expressions, returning {"ok", "result"/"error"} per input in order.
+    Large groups of same-shaped expressions are computed as float64 arrays; any element NumPy
+    can't reproduce exactly (non-finite, or any constant or intermediate beyond 2**53) falls back to the scalar path.
+    """
+    results: List[Dict[str, Any] | None] = [None] * len(expressions)
+    groups: Dict[str, List[Tuple[int, List[Any]]]] = {}
+    templates: Dict[str, ast.Expression] = {}
+    for i, expression in enumerate(expressions):
+        try:
+            tree = parse_expression(expression)
+        except CalcError as e:
+            results[i] = {"ok": False, "error": str(e)}
+            continue
+        if np is None:
+            continue
+        templater = _Templater()
+        template = templater.visit(copy.deepcopy(tree))
+        key = ast.dump(template)
+        templates.setdefault(key, template)
+        groups.setdefault(key, []).append((i, templater.constants))
+
+    for key, members in groups.items():
+        if len(members) < CALC_VECTORIZE_MIN:
+            continue
+        template = templates[key]
+        slots = len(members[0][1])
+        env = {f"_c{s}": np.array([float(c[s]) for _, c in members]) for s in range(slots)}
+        floats = {f"_c{s}": np.array([isinstance(c[s], float) for _, c in members]) for s in range(slots)}
+        peak = [np.zeros(len(members))]
+        with np.errstate(all="ignore"):
+            values = np.broadcast_to(_vector_interpret(template, env, peak), (len(members),))
+            is_float = np.broadcast_to(_vector_float_mask(template, env, floats), (len(members),))
+        for (i, _), value, largest, as_float in zip(members, values.tolist(), peak[0].tolist(), is_float.tolist()):
+            # Python keeps integer constants and intermediates exact (even ahead of a division or a
+            # float operand); float64 only agrees while every magnitude stays below 2**53
+            if not math.isfinite(value) or largest >= 2 ** 53:
+                continue
+            if not as_float:
+                # Python's result is an int, so match its type as well as its value
+                if not value.is_integer():
+                    continue
+                value = int(value)
+            results[i] = {"ok": True, "result": value}
+
+    for i, expression in enumerate(expressions):
+        if results[i] is None:
+            results[i] = _result(evaluate, expression)
+    return results
+
+def evaluate_range(expression: str, start: float, stop: float, step: float = 1.0,
+                   variable: str = "x") -> Dict[str, Any]:
+    """Evaluates an expression in `variable` over arange(start, stop, step); undefined points are None."""
+    tree = parse_expression(expression, (variable,))
+    if step == 0:
+        raise CalcError("step must not be zero")
+    points = max(0, math.ceil((stop - start) / step))
+    if points > CALC_MAX_RANGE_POINTS:
+        raise CalcError(f"range has more than {CALC_MAX_RANGE_POINTS} points")
+    if np is not None:
+        xs = np.arange(start, stop, step, dtype=float)
+        with np.errstate(all="ignore"):
+            values = np.broadcast_to(_vector_interpret(tree, {variable: xs}), xs.shape)
+        ys = [v if math.isfinite(v) else None for v in values.tolist()]
+        return {"x": xs.tolist(), "y": ys}
+    xs = [start + k * step for k in range(points)]
+    ys = []
+    for x in xs:
+        try:
+            ys.append(_interpret(tree, {variable: x}))
+        except CalcError:
+            ys.append(None)
+    return {"x": xs, "y": ys}
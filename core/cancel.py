@@ -0,0 +1,49 @@
+# core/cancel.py
+# Cooperative cancellation: long-running work polls a CancelToken and stops early
+# (closing LLM streams, skipping remaining steps) once someone cancels it.
+from __future__ import annotations
+import threading
+from typing import Dict, Hashable
+
+class TaskCancelled(Exception):
+    """Raised by CancelToken.raise_if_cancelled once the token has been cancelled."""
+
+class CancelToken:
+    def __init__(self):
+        self._event = threading.Event()
+        self.reason = ""
+
+    def cancel(self, reason: str = "cancelled"):
+        self.reason = reason
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise TaskCancelled(self.reason)
+
+class CancelRegistry:
+    """Tracks one CancelToken per task ID so a signal from elsewhere can reach the running task."""
+    def __init__(self):
+        self._tokens: Dict[Hashable, CancelToken] = {}
+        self._lock = threading.Lock()
+
+    def register(self, task_id: Hashable) -> CancelToken:
+        with self._lock:
+            return self._tokens.setdefault(task_id, CancelToken())
+
+    def cancel(self, task_id: Hashable, reason: str = "cancelled") -> bool:
+        """Cancels a tracked task. Returns False if no task with that ID is tracked."""
+        with self._lock:
+            token = self._tokens.get(task_id)
+        if token is None:
+            return False
+        token.cancel(reason)
+        return True
+
+    def discard(self, task_id: Hashable):
+        with self._lock:
+            self._tokens.pop(task_id, None)
@@ -1,10 +1,9 @@
 # core/config.py
+# Heavy clients (LLMs, the embedding model, vector stores) are built on first use through
+# the accessors below, so importing this module stays cheap for commands that never need them.
 import os
+import threading
 import dotenv
-from typing import Optional
-from langchain_cerebras import ChatCerebras
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_chroma import Chroma
 
 dotenv.load_dotenv()
 
@@ -14,20 +13,124 @@ TEMPERATURE = float(os.environ.get("LLM_TEMPERATURE", "0.2"))
 MAX_REFLECTIONS = int(os.environ.get("MAX_REFLECTIONS", "2"))
 MEM_COLLECTION = os.environ.get("MEM_COLLECTION", "mini_manus_memory")
 EMBED_MODEL = os.environ.get("EMBED_MODEL", "all-MiniLM-L6-v2")
+EMBED_BATCH_SIZE = int(os.environ.get("EMBED_BATCH_SIZE", "64"))
+EMBED_WORKERS = int(os.environ.get("EMBED_WORKERS", "1"))  # >1 encodes batches across a process pool
+EMBED_TORCH_THREADS = int(os.environ.get("EMBED_TORCH_THREADS", "0"))  # 0 keeps torch's default
+INGEST_QUEUE_SIZE = int(os.environ.get("INGEST_QUEUE_SIZE", "256"))  # Max chunks buffered between splitting and embedding
+INGEST_MAX_CONCURRENT = int(os.environ.get("INGEST_MAX_CONCURRENT", "2"))  # Uploads ingested at the same time
+INGEST_JOB_HISTORY = int(os.environ.get("INGEST_JOB_HISTORY", "500"))  # Finished jobs kept for status polling
+WORKER_MAX_CONCURRENT = int(os.environ.get("WORKER_MAX_CONCURRENT", "4"))  # Proposals processed at once by the background worker
+WORKER_METRICS_INTERVAL = float(os.environ.get("WORKER_METRICS_INTERVAL", "10"))  # Seconds between queue-depth reports
+HISTORY_CACHE_MAX_CONVERSATIONS = int(os.environ.get("HISTORY_CACHE_MAX_CONVERSATIONS", "256"))  # Conversations kept in the worker's history cache
+HISTORY_CACHE_MAX_CHARS = int(os.environ.get("HISTORY_CACHE_MAX_CHARS", "20000000"))  # Memory cap for cached message text
+CONTEXT_TOKEN_BUDGET = int(os.environ.get("CONTEXT_TOKEN_BUDGET", "6000"))  # Prompt tokens allowed for system + history + user turn
+CONTEXT_SUMMARY_MAX_TOKENS = int(os.environ.get("CONTEXT_SUMMARY_MAX_TOKENS", "400"))
+CONTEXT_SUMMARY_CACHE_SIZE = int(os.environ.get("CONTEXT_SUMMARY_CACHE_SIZE", "512"))  # Conversations whose summaries are kept
+RESPONSE_CACHE_ENABLED = os.environ.get("RESPONSE_CACHE_ENABLED", "0") == "1"  # Opt-in answer cache in front of the agent
+RESPONSE_CACHE_SEMANTIC = os.environ.get("RESPONSE_CACHE_SEMANTIC", "1") == "1"  # Also match near-identical prompts by embedding
+RESPONSE_CACHE_TTL = float(os.environ.get("RESPONSE_CACHE_TTL", "3600"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get("RESPONSE_CACHE_MAX_ENTRIES", "2000"))
+RESPONSE_CACHE_SIMILARITY = float(os.environ.get("RESPONSE_CACHE_SIMILARITY", "0.92"))  # Cosine similarity needed for a semantic hit
 PERSIST_DIR = "./agent_memory"
 RAG_PERSIST_DIR = "./rag_docs"
 RAG_COLLECTION = "rag_docs"
+RAG_MANIFEST_DIR = os.path.join(RAG_PERSIST_DIR, "manifests")
+UPLOAD_DIR = os.environ.get("UPLOAD_DIR", "uploads")
+RAG_QUERY_CACHE_SIZE = int(os.environ.get("RAG_QUERY_CACHE_SIZE", "256"))  # 0 disables the query-embedding cache
+RAG_KEYWORD_DB = os.path.join(RAG_PERSIST_DIR, "keywords.sqlite3")  # BM25 inverted index kept next to the vector store
+RAG_KEYWORD_MAX_DF = int(os.environ.get("RAG_KEYWORD_MAX_DF", "5000"))  # Terms in more chunks are treated as stopwords; bounds postings read per term
+RAG_TOP_K = int(os.environ.get("RAG_TOP_K", "3"))  # Chunks returned by tool_rag_search
+RAG_HYBRID_CANDIDATES = int(os.environ.get("RAG_HYBRID_CANDIDATES", "20"))  # Per-retriever candidates fused by RRF
+RAG_RRF_K = int(os.environ.get("RAG_RRF_K", "60"))  # Reciprocal rank fusion constant
+RAG_EXACT_MAX_TOKENS = int(os.environ.get("RAG_EXACT_MAX_TOKENS", "4"))  # Longer queries always use hybrid search
+RAG_SOURCE_STORE_CACHE = int(os.environ.get("RAG_SOURCE_STORE_CACHE", "64"))  # Per-source partition handles kept open
+CODING_MAX_PARALLEL_STEPS = int(os.environ.get("CODING_MAX_PARALLEL_STEPS", "4"))  # Independent plan steps run at once
+RUN_CODE_TIMEOUT = float(os.environ.get("RUN_CODE_TIMEOUT", "30"))  # Wall-clock seconds before tool_run_code kills the command
+RUN_CODE_CPU_SECONDS = int(os.environ.get("RUN_CODE_CPU_SECONDS", "30"))  # 0 disables the CPU rlimit
+RUN_CODE_MEMORY_MB = int(os.environ.get("RUN_CODE_MEMORY_MB", "1024"))  # Address-space cap; 0 disables it
+RUN_CODE_MAX_OUTPUT_BYTES = int(os.environ.get("RUN_CODE_MAX_OUTPUT_BYTES", "65536"))  # Kept per stream; the rest is dropped
+REPL_POOL_SIZE = int(os.environ.get("REPL_POOL_SIZE", "2"))  # Spare pre-warmed python_repl workers kept ready
+REPL_PREWARM_MODULES = [m for m in os.environ.get("REPL_PREWARM_MODULES", "numpy,pandas").split(",") if m.strip()]
+REPL_TIMEOUT = float(os.environ.get("REPL_TIMEOUT", "30"))  # Seconds per snippet before the session's worker is killed
+REPL_STARTUP_TIMEOUT = float(os.environ.get("REPL_STARTUP_TIMEOUT", "60"))
+REPL_MAX_OUTPUT_CHARS = int(os.environ.get("REPL_MAX_OUTPUT_CHARS", "20000"))
+REPL_IDLE_SECONDS = float(os.environ.get("REPL_IDLE_SECONDS", "900"))  # Idle sessions are evicted after this
+REPL_MAX_SESSIONS = int(os.environ.get("REPL_MAX_SESSIONS", "16"))
+WEB_SEARCH_BACKEND = os.environ.get("WEB_SEARCH_BACKEND", "ddgs")  # "ddgs", or "http" for a JSON endpoint at WEB_SEARCH_URL
+WEB_SEARCH_URL = os.environ.get("WEB_SEARCH_URL")
+WEB_SEARCH_CACHE_TTL = float(os.environ.get("WEB_SEARCH_CACHE_TTL", "600"))  # 0 disables the result cache
+WEB_SEARCH_CACHE_SIZE = int(os.environ.get("WEB_SEARCH_CACHE_SIZE", "512"))
+WEB_SEARCH_MAX_CONCURRENT = int(os.environ.get("WEB_SEARCH_MAX_CONCURRENT", "4"))  # Queries of one batch in flight at once
+CALC_MAX_EXPRESSION_CHARS = int(os.environ.get("CALC_MAX_EXPRESSION_CHARS", "1000"))
+CALC_MAX_OPERATIONS = int(os.environ.get("CALC_MAX_OPERATIONS", "200"))  # Operators allowed in one calculator expression
+CALC_MAX_INT_BITS = int(os.environ.get("CALC_MAX_INT_BITS", "4096"))  # Larger integer results are rejected before they are computed
+CALC_CACHE_SIZE = int(os.environ.get("CALC_CACHE_SIZE", "1024"))
+CALC_MAX_RANGE_POINTS = int(os.environ.get("CALC_MAX_RANGE_POINTS", "100000"))
+CALC_VECTORIZE_MIN = int(os.environ.get("CALC_VECTORIZE_MIN", "16"))  # Same-shaped expressions needed before a batch uses NumPy
+MEMORY_BATCH_SIZE = int(os.environ.get("MEMORY_BATCH_SIZE", "32"))  # Notes embedded and committed together by the memory writer
+MEMORY_FLUSH_INTERVAL = float(os.environ.get("MEMORY_FLUSH_INTERVAL", "2"))  # Max seconds a note waits before being written
+MEMORY_QUEUE_MAX = int(os.environ.get("MEMORY_QUEUE_MAX", "10000"))  # mem_add blocks once this many notes are pending
+MEMORY_BACKEND = os.environ.get("MEMORY_BACKEND", "chroma")  # "chroma", or "mmap" for the NumPy index in core.vector_index
+MEMORY_INDEX_DIR = os.environ.get("MEMORY_INDEX_DIR", os.path.join(PERSIST_DIR, "mmap_index"))
+MEMORY_READ_ONLY = os.environ.get("MEMORY_READ_ONLY", "0") == "1"  # Set in extra worker processes so only one process writes the mmap index
+MEMORY_IVF_MIN_ENTRIES = int(os.environ.get("MEMORY_IVF_MIN_ENTRIES", "50000"))  # Below this the mmap index is scanned exhaustively
+MEMORY_IVF_NPROBE = int(os.environ.get("MEMORY_IVF_NPROBE", "8"))  # IVF lists searched per query
 
-# --- Global Initializations ---
-_llm = ChatCerebras(
-    model=LLM_MODEL,
-    temperature=TEMPERATURE,
-    api_key=os.getenv("API_KEY"),
-    streaming=True,
-    max_tokens=2048,
-    top_p=1
-)
-_embedding_fn = HuggingFaceEmbeddings(model_name=EMBED_MODEL)
-_vectorstore: Optional[Chroma] = None
-
-print("✅ Core config and globals loaded.")
\ No newline at end of file
+# --- LLM Connection Pool ---
+LLM_BASE_URL = os.environ.get("CEREBRAS_BASE_URL")  # Override to point at a proxy or local stub
+LLM_POOL_SIZE = int(os.environ.get("LLM_POOL_SIZE", "20"))
+LLM_POOL_KEEPALIVE = int(os.environ.get("LLM_POOL_KEEPALIVE", str(LLM_POOL_SIZE)))
+LLM_KEEPALIVE_EXPIRY = float(os.environ.get("LLM_KEEPALIVE_EXPIRY", "60"))
+LLM_TIMEOUT = float(os.environ.get("LLM_TIMEOUT", "120"))
+# The async server holds many generations in flight at once, so it gets a larger pool
+LLM_ASYNC_POOL_SIZE = int(os.environ.get("LLM_ASYNC_POOL_SIZE", "512"))
+
+# --- Lazy Global Accessors ---
+_init_lock = threading.RLock()
+_embedding_fn = None
+_vectorstore = None
+
+def get_llm():
+    """Returns the shared ChatCerebras model used by the agent."""
+    from .llm import get_chat_model
+    return get_chat_model(
+        model=LLM_MODEL,
+        temperature=TEMPERATURE,
+        api_key=os.getenv("API_KEY"),
+        streaming=True,
+        max_tokens=2048,
+        top_p=1
+    )
+
+def get_embedding_fn():
+    """Returns the HuggingFace embedding model, loading it (and torch) on first call."""
+    global _embedding_fn
+    if _embedding_fn is None:
+        with _init_lock:
+            if _embedding_fn is None:
+                from langchain_huggingface import HuggingFaceEmbeddings
+                print(f"🧠 Loading embedding model '{EMBED_MODEL}'...")
+                _embedding_fn = HuggingFaceEmbeddings(model_name=EMBED_MODEL)
+    return _embedding_fn
+
+def get_memory_store():
+    """Returns the agent memory vector store, opening it on first call."""
+    global _vectorstore
+    if _vectorstore is None:
+        with _init_lock:
+            if _vectorstore is None:
+                if MEMORY_BACKEND == "mmap":
+                    from .vector_index import MmapVectorStore
+                    _vectorstore = MmapVectorStore(MEMORY_INDEX_DIR, embedding=get_embedding_fn(),
+                                                   read_only=MEMORY_READ_ONLY)
+                else:
+                    from langchain_chroma import Chroma
+                    _vectorstore = Chroma(
+                        collection_name=MEM_COLLECTION,
+                        embedding_function=get_embedding_fn(),
+                        persist_directory=PERSIST_DIR
+                    )
+                print(f"✅ Agent memory loaded ({MEMORY_BACKEND}).")
+    return _vectorstore
+
+print("✅ Core config loaded.")
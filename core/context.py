@@ -0,0 +1,176 @@
+# core/context.py
+# Token-budgeted prompt assembly. Recent turns are kept verbatim; once the history no
+# longer fits the budget, older turns are folded into a running summary (cached per
+# conversation and extended incrementally) or dropped if no summary can be made.
+from __future__ import annotations
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .config import CONTEXT_TOKEN_BUDGET, CONTEXT_SUMMARY_MAX_TOKENS, CONTEXT_SUMMARY_CACHE_SIZE
+
+MESSAGE_OVERHEAD_TOKENS = 4  # Role and separator tokens the chat template adds per message
+RECENT_FRACTION = 0.5  # After summarizing, recent turns get this share of the budget so the summary is reused for several turns
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("cl100k_base")
+except Exception:  # tiktoken is optional; fall back to a character heuristic
+    _encoding = None
+
+def count_tokens(text: str) -> int:
+    """Approximate token count (cl100k_base when tiktoken is installed, else ~4 chars/token)."""
+    if not text:
+        return 0
+    if _encoding is not None:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return len(text) // 4 + 1
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Trims text from the end until it fits `max_tokens`."""
+    tokens = count_tokens(text)
+    while text and tokens > max_tokens:
+        text = text[: int(len(text) * max_tokens / tokens * 0.95)]
+        tokens = count_tokens(text)
+    return text
+
+def message_tokens(message: Dict[str, Any]) -> int:
+    return count_tokens(str(message.get("content") or "")) + MESSAGE_OVERHEAD_TOKENS
+
+def _prefix_hash(history: List[Dict[str, Any]], end: int) -> str:
+    digest = hashlib.sha256()
+    for message in history[:end]:
+        digest.update(str(message.get("role")).encode())
+        digest.update(b"\0")
+        digest.update(str(message.get("content") or "").encode())
+        digest.update(b"\1")
+    return digest.hexdigest()
+
+def default_summarizer(previous_summary: Optional[str], messages: List[Dict[str, Any]]) -> str:
+    """Summarizes turns with the shared LLM, extending an earlier summary if one exists."""
+    from .config import get_llm
+    transcript = "\n".join(f"{m.get('role', 'user')}: {m.get('content') or ''}" for m in messages)
+    prompt = (
+        "Summarize the following conversation so an assistant can continue it. Keep names, numbers, "
+        f"decisions and open questions. Use at most {CONTEXT_SUMMARY_MAX_TOKENS} tokens.\n\n"
+        + (f"Summary so far:\n{previous_summary}\n\nNew turns:\n" if previous_summary else "Conversation:\n")
+        + transcript
+    )
+    return get_llm().invoke(prompt).content.strip()
+
+class ContextBuilder:
+    def __init__(self, budget: int = CONTEXT_TOKEN_BUDGET,
+                 summarize: Callable[[Optional[str], List[Dict[str, Any]]], str] | None = default_summarizer,
+                 cache_size: int = CONTEXT_SUMMARY_CACHE_SIZE):
+        self.budget = budget
+        self.summarize = summarize
+        self.cache_size = cache_size
+        # conversation key -> (turns covered, hash of those turns, summary, summary tokens)
+        self._summaries: "OrderedDict[str, Tuple[int, str, str, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def build(self, system_prompt: str, history: List[Dict[str, Any]], user_input: str,
+              conversation_id: Any = None) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """
+        Returns (messages, info) where messages fit the token budget and info holds the
+        token accounting (also rendered into the agent log).
+        """
+        system = {"role": "system", "content": system_prompt}
+        user = {"role": "user", "content": user_input}
+        fixed = message_tokens(system) + message_tokens(user)
+        available = max(0, self.budget - fixed)
+        costs = [message_tokens(m) for m in history]
+        info = {"budget": self.budget, "history_turns": len(history), "summarized": 0, "dropped": 0,
+                "summary_tokens": 0, "summary_cached": False}
+
+        # Everything fits: no accounting games needed
+        if sum(costs) <= available:
+            return self._finish([system, *history, user], info, len(history))
+
+        key = self._key(history, conversation_id)
+        cached = self._cached_summary(key, history)
+        if cached:
+            covered, _, summary, summary_cost = cached
+            if summary_cost + sum(costs[covered:]) <= available:
+                info.update(summarized=covered, summary_tokens=summary_cost, summary_cached=True)
+                return self._finish([system, self._summary_message(summary), *history[covered:], user], info, len(history) - covered)
+
+        # Cut so the recent window uses only part of the budget, leaving room to grow
+        split = self._split(costs, int(available * RECENT_FRACTION) - CONTEXT_SUMMARY_MAX_TOKENS)
+        summary = None
+        if self.summarize and split > 0:
+            try:
+                if cached and cached[0] <= split:
+                    summary = self.summarize(cached[2], history[cached[0]:split])
+                else:
+                    summary = self.summarize(None, history[:split])
+            except Exception as e:
+                print(f"⚠️  Context summary failed, dropping older turns instead: {e}")
+
+        if summary:
+            summary = truncate_to_tokens(summary, CONTEXT_SUMMARY_MAX_TOKENS)
+            summary_cost = count_tokens(summary) + MESSAGE_OVERHEAD_TOKENS
+            self._store(key, (split, _prefix_hash(history, split), summary, summary_cost))
+            info.update(summarized=split, summary_tokens=summary_cost)
+            return self._finish([system, self._summary_message(summary), *history[split:], user], info, len(history) - split)
+
+        # No summary available: keep as many recent turns as fit and drop the rest
+        split = self._split(costs, available)
+        info["dropped"] = split
+        return self._finish([system, *history[split:], user], info, len(history) - split)
+
+    # --- Helpers ---
+
+    @staticmethod
+    def _split(costs: List[int], allowance: int) -> int:
+        """Index of the oldest turn kept verbatim when recent turns may use `allowance` tokens."""
+        used = 0
+        split = len(costs)
+        while split > 0 and used + costs[split - 1] <= allowance:
+            used += costs[split - 1]
+            split -= 1
+        return split
+
+    @staticmethod
+    def _summary_message(summary: str) -> Dict[str, str]:
+        return {"role": "system", "content": f"Summary of the earlier conversation:\n{summary}"}
+
+    @staticmethod
+    def _key(history: List[Dict[str, Any]], conversation_id: Any) -> str:
+        if conversation_id is not None:
+            return f"conversation:{conversation_id}"
+        # Without an ID, the opening turn identifies the conversation well enough
+        return f"root:{_prefix_hash(history, 1)}"
+
+    def _cached_summary(self, key: str, history: List[Dict[str, Any]]):
+        with self._lock:
+            cached = self._summaries.get(key)
+            if cached:
+                self._summaries.move_to_end(key)
+        # Only valid if the turns it covers are unchanged
+        if cached and cached[0] <= len(history) and cached[1] == _prefix_hash(history, cached[0]):
+            return cached
+        return None
+
+    def _store(self, key: str, value: Tuple[int, str, str, int]):
+        with self._lock:
+            self._summaries[key] = value
+            self._summaries.move_to_end(key)
+            while len(self._summaries) > self.cache_size:
+                self._summaries.popitem(last=False)
+
+    def _finish(self, messages: List[Dict[str, Any]], info: Dict[str, Any], verbatim: int):
+        info["verbatim"] = verbatim
+        info["prompt_tokens"] = sum(message_tokens(m) for m in messages)
+        return messages, info
+
+def describe(info: Dict[str, Any]) -> str:
+    """One-line rendering of the context accounting for the agent log."""
+    line = (f"Context: {info['prompt_tokens']}/{info['budget']} tokens, "
+            f"{info['verbatim']}/{info['history_turns']} turns verbatim")
+    if info["summarized"]:
+        line += f", {info['summarized']} summarized into {info['summary_tokens']} tokens" + (" (cached)" if info["summary_cached"] else "")
+    if info["dropped"]:
+        line += f", {info['dropped']} dropped"
+    return line
@@ -0,0 +1,89 @@
+# core/dispatch.py
+# A fixed-size worker pool fed by a priority queue, with optional per-key
+# serialization (tasks sharing a key never run at the same time).
+from __future__ import annotations
+import itertools
+import queue
+import threading
+import traceback
+from collections import deque
+from typing import Any, Callable, Dict, Hashable
+
+_STOP = float("inf")
+
+class PriorityTaskExecutor:
+    """
+    Runs tasks on `max_workers` threads, lowest priority value first (FIFO within a priority).
+    Tasks submitted with the same `key` run one at a time, in submission order.
+    """
+    def __init__(self, max_workers: int, name: str = "worker"):
+        self._queue: queue.PriorityQueue = queue.PriorityQueue()
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._active_keys: set = set()
+        self._parked: Dict[Hashable, deque] = {}
+        self._shutdown = False
+        self._stats = {"submitted": 0, "running": 0, "completed": 0, "failed": 0}
+        self._threads = [
+            threading.Thread(target=self._work, name=f"{name}-{i}", daemon=True)
+            for i in range(max_workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, fn: Callable[..., Any], *args: Any, priority: int = 0, key: Hashable | None = None):
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError("executor is shutting down")
+            self._stats["submitted"] += 1
+        self._queue.put((priority, next(self._seq), key, fn, args))
+
+    def stats(self) -> Dict[str, int]:
+        """Queue-depth and throughput counters."""
+        with self._lock:
+            parked = sum(len(items) for items in self._parked.values())
+            return {**self._stats, "queued": self._queue.qsize() + parked, "parked": parked}
+
+    def _work(self):
+        while True:
+            item = self._queue.get()
+            priority, _, key, fn, args = item
+            if priority == _STOP:
+                return
+            with self._lock:
+                if key is not None and key in self._active_keys:
+                    # Another task for this key is running; it re-queues this one when done
+                    self._parked.setdefault(key, deque()).append(item)
+                    continue
+                if key is not None:
+                    self._active_keys.add(key)
+                self._stats["running"] += 1
+            try:
+                fn(*args)
+                failed = False
+            except Exception:
+                traceback.print_exc()
+                failed = True
+            finally:
+                with self._lock:
+                    self._stats["running"] -= 1
+                    self._stats["failed" if failed else "completed"] += 1
+                    if key is not None:
+                        self._active_keys.discard(key)
+                        parked = self._parked.get(key)
+                        if parked:
+                            self._queue.put(parked.popleft())
+                            if not parked:
+                                del self._parked[key]
+
+    def shutdown(self, wait: bool = True):
+        """Stops accepting tasks; queued tasks still run before the workers exit."""
+        with self._lock:
+            if self._shutdown:
+                return
+            self._shutdown = True
+        for _ in self._threads:
+            self._queue.put((_STOP, next(self._seq), None, None, ()))
+        if wait:
+            for thread in self._threads:
+                thread.join()
@@ -0,0 +1,126 @@
+# core/embedding.py
+# Batched embedding stage for ingestion. Chunks are encoded in fixed-size batches,
+# either in-process or across a pool of worker processes (each with its own copy
+# of the model), and every batch is written to the store as soon as it is ready.
+from __future__ import annotations
+import os
+import time
+import atexit
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Tuple
+
+from langchain_core.documents import Document
+
+from .config import get_embedding_fn, EMBED_MODEL, EMBED_BATCH_SIZE, EMBED_WORKERS, EMBED_TORCH_THREADS
+
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+_worker_model = None
+
+# --- Worker Process ---
+
+def _init_worker(model_name: str, torch_threads: int):
+    global _worker_model
+    os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+    if torch_threads > 0:
+        import torch
+        torch.set_num_threads(torch_threads)
+    from langchain_huggingface import HuggingFaceEmbeddings
+    _worker_model = HuggingFaceEmbeddings(model_name=model_name)
+
+def _encode_batch(texts: List[str]) -> List[List[float]]:
+    return _worker_model.embed_documents(texts)
+
+def _get_pool() -> ProcessPoolExecutor:
+    """The worker pool is created once and kept, so each worker loads the model only once."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                print(f"🧮 Starting {EMBED_WORKERS} embedding worker processes...")
+                _pool = ProcessPoolExecutor(
+                    max_workers=EMBED_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(EMBED_MODEL, EMBED_TORCH_THREADS),
+                )
+                atexit.register(shutdown_pool)
+    return _pool
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(cancel_futures=True)
+        _pool = None
+
+# --- Batching ---
+
+def iter_batches(items: Iterable[Any], batch_size: int = EMBED_BATCH_SIZE) -> Iterator[List[Any]]:
+    batch: List[Any] = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def embed_batches(batches: Iterable[List[Tuple[str, Document]]]) -> Iterator[Tuple[List[Tuple[str, Document]], List[List[float]]]]:
+    """
+    Embeds batches of (id, chunk) pairs and yields (batch, vectors) as each batch completes.
+    With EMBED_WORKERS > 1 batches run in parallel across processes; at most two batches
+    per worker are in flight, so memory stays bounded however many batches there are.
+    """
+    if EMBED_WORKERS <= 1:
+        if EMBED_TORCH_THREADS > 0:
+            import torch
+            torch.set_num_threads(EMBED_TORCH_THREADS)
+        for batch in batches:
+            yield batch, get_embedding_fn().embed_documents([doc.page_content for _, doc in batch])
+        return
+
+    pool = _get_pool()
+    pending: Dict[Any, List[Tuple[str, Document]]] = {}
+    for batch in batches:
+        pending[pool.submit(_encode_batch, [doc.page_content for _, doc in batch])] = batch
+        if len(pending) >= EMBED_WORKERS * 2:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield pending.pop(future), future.result()
+    for future in list(pending):
+        yield pending.pop(future), future.result()
+
+def _clean_metadata(metadata: Dict[str, Any]) -> Dict[str, Any] | None:
+    """Chroma only stores scalar metadata; drop lists/dicts some loaders attach."""
+    cleaned = {k: v for k, v in (metadata or {}).items() if isinstance(v, (str, int, float, bool))}
+    return cleaned or None
+
+def embed_and_upsert(store, items: Iterable[Tuple[str, Document]], on_batch: Callable[[int], None] | None = None,
+                     mirrors: Iterable[Any] = ()) -> Dict[str, Any]:
+    """
+    Embeds (id, chunk) pairs in batches and upserts each batch into the Chroma store
+    (and any `mirrors`, e.g. a per-source partition) as soon as it is encoded.
+    `on_batch` receives the running embedded count. Returns the chunk count and throughput.
+    """
+    start = time.perf_counter()
+    count = 0
+    targets = [store, *mirrors]
+    for batch, vectors in embed_batches(iter_batches(items)):
+        for target in targets:
+            target._collection.upsert(
+                ids=[chunk_id for chunk_id, _ in batch],
+                embeddings=vectors,
+                documents=[doc.page_content for _, doc in batch],
+                metadatas=[_clean_metadata(doc.metadata) for _, doc in batch],
+            )
+        count += len(batch)
+        if on_batch:
+            on_batch(count)
+    elapsed = time.perf_counter() - start
+    rate = count / elapsed if elapsed > 0 else 0.0
+    if count:
+        print(f"⚡ Embedded {count} chunks in {elapsed:.2f}s ({rate:.1f} chunks/sec).")
+    return {"embedded": count, "embed_seconds": round(elapsed, 3), "chunks_per_sec": round(rate, 1)}
@@ -0,0 +1,140 @@
+# core/history.py
+# In-process cache of team-chat history per conversation. Entries are kept current by
+# realtime message inserts; the database is only asked for rows newer than the last
+# one seen, and least-recently-used conversations are evicted under a memory cap.
+from __future__ import annotations
+import bisect
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+# fetch(conversation_id, after_created_at) -> rows with 'id', 'content', 'created_at', oldest first
+FetchRows = Callable[[Any, Optional[str]], List[Dict[str, Any]]]
+
+class _Entry:
+    __slots__ = ("messages", "created", "ids", "last_seen", "chars", "synced", "reload")
+
+    def __init__(self):
+        self.messages: List[Dict[str, str]] = []
+        self.created: List[str] = []  # created_at of each message, kept sorted
+        self.ids: set = set()
+        self.last_seen: str | None = None
+        self.chars = 0
+        self.synced = False
+        self.reload = False  # Next get() re-reads the whole conversation
+
+class ConversationHistoryCache:
+    def __init__(self, fetch: FetchRows, max_conversations: int = 256, max_chars: int = 20_000_000):
+        self.fetch = fetch
+        self.max_conversations = max_conversations
+        self.max_chars = max_chars
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Any, _Entry]" = OrderedDict()
+        self._inflight: Dict[Any, List[int]] = {}  # conversation -> [fetches running, inserts seen meanwhile]
+        self._total_chars = 0
+        self._lock = threading.Lock()
+
+    def get(self, conversation_id) -> List[Dict[str, str]]:
+        """
+        Returns the conversation's history as agent messages.
+        A synced entry is served from memory; otherwise only rows newer than the
+        last seen `created_at` are fetched (all rows for a conversation not in cache,
+        or one that received an out-of-order insert).
+        """
+        with self._lock:
+            entry = self._entries.get(conversation_id)
+            if entry is not None and entry.synced:
+                self._entries.move_to_end(conversation_id)
+                self.hits += 1
+                return list(entry.messages)
+            self.misses += 1
+            after = None if entry is None or entry.reload else entry.last_seen
+            if entry is not None:
+                entry.reload = False
+            # Inserts for a conversation that isn't cached yet can't be applied; count them instead
+            inflight = self._inflight.setdefault(conversation_id, [0, 0])
+            inflight[0] += 1
+            generation = inflight[1]
+
+        try:
+            rows = self.fetch(conversation_id, after)
+        finally:
+            with self._lock:
+                inflight[0] -= 1
+                missed = inflight[1] != generation
+                if inflight[0] == 0:
+                    del self._inflight[conversation_id]
+
+        with self._lock:
+            entry = self._entries.get(conversation_id)
+            if entry is not None or after is None:
+                if entry is None:
+                    entry = self._entries[conversation_id] = _Entry()
+                for row in rows:
+                    self._add_row(entry, row)
+                if missed:
+                    entry.reload = True
+                entry.synced = not entry.reload
+                self._entries.move_to_end(conversation_id)
+                messages = list(entry.messages)
+                self._evict(keep=conversation_id)
+                return messages
+        # Evicted while the incremental fetch ran; its rows alone would be a truncated history
+        return self.get(conversation_id)
+
+    def append(self, row: Dict[str, Any]):
+        """Adds a realtime-inserted message row; ignored for conversations not in cache."""
+        with self._lock:
+            conversation_id = row.get("conversation_id")
+            entry = self._entries.get(conversation_id)
+            if entry is None:
+                if conversation_id in self._inflight:
+                    self._inflight[conversation_id][1] += 1
+                return
+            self._add_row(entry, row, realtime=True)
+            self._evict(keep=conversation_id)
+
+    def mark_stale(self):
+        """Call when the realtime feed may have missed inserts; the next get() catches up."""
+        with self._lock:
+            for entry in self._entries.values():
+                entry.synced = False
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"conversations": len(self._entries), "chars": self._total_chars, "hits": self.hits, "misses": self.misses}
+
+    def _add_row(self, entry: _Entry, row: Dict[str, Any], realtime: bool = False):
+        if row["id"] in entry.ids:
+            return
+        created = row["created_at"]
+        if entry.last_seen is not None and created < entry.last_seen:
+            position = bisect.bisect_right(entry.created, created)
+            if realtime:
+                # Out-of-order realtime delivery: keep the row, and re-read the whole
+                # conversation on the next get() in case others were skipped as well
+                entry.synced = False
+                entry.reload = True
+        else:
+            position = len(entry.messages)
+            entry.last_seen = created
+        content = row.get("content") or ""
+        # You might want to map sender_id to a role like 'user' or 'assistant' if needed
+        entry.messages.insert(position, {"role": "user", "content": content})
+        entry.created.insert(position, created)
+        entry.ids.add(row["id"])
+        entry.chars += len(content)
+        self._total_chars += len(content)
+
+    def _evict(self, keep=None):
+        """Drops least-recently-used conversations until both caps are respected."""
+        while self._entries and (len(self._entries) > self.max_conversations or self._total_chars > self.max_chars):
+            conversation_id = next(iter(self._entries))
+            if conversation_id == keep:
+                if len(self._entries) == 1:
+                    return
+                self._entries.move_to_end(conversation_id)
+                continue
+            entry = self._entries.pop(conversation_id)
+            self._total_chars -= entry.chars
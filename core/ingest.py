@@ -0,0 +1,304 @@
+# core/ingest.py
+# Incremental, streaming knowledge-base ingestion.
+# Every chunk gets an ID derived from its content and location, and a per-source
+# manifest remembers which chunk IDs a file produced last time. Re-ingesting a
+# file only embeds chunks that are new and deletes chunks that disappeared.
+from __future__ import annotations
+import os
+import json
+import hashlib
+import queue
+import threading
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Tuple
+
+from langchain_community.document_loaders import (
+    TextLoader, PyPDFLoader, CSVLoader, UnstructuredExcelLoader,
+    UnstructuredPowerPointLoader, UnstructuredWordDocumentLoader
+)
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_core.documents import Document
+
+from .config import INGEST_QUEUE_SIZE, RAG_COLLECTION
+from .manifests import load_manifest, save_manifest, delete_manifest, iter_manifests
+from .rag import get_rag_store, invalidate_rag_store, source_collection, mark_partitioned, drop_source_store
+from .keyword_index import get_keyword_index
+from .embedding import embed_and_upsert
+
+_KEYWORD_BATCH = 256  # Chunks written to the keyword index per transaction
+_COPY_BATCH = 1000  # Chunks copied or deleted per Chroma call
+_source_locks: Dict[str, threading.Lock] = {}
+_source_locks_guard = threading.Lock()
+_published_uploads: Dict[str, int] = {}  # Source -> sequence of the newest staged upload moved into place
+
+# --- Loading ---
+
+def get_loader(file_path: str):
+    """Picks the document loader for a file based on its extension."""
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext == ".txt":
+        return TextLoader(file_path, encoding="utf-8")
+    elif ext == ".pdf":
+        return PyPDFLoader(file_path)
+    elif ext == ".csv":
+        return CSVLoader(file_path)
+    elif ext in [".xls", ".xlsx"]:
+        return UnstructuredExcelLoader(file_path)
+    elif ext in [".ppt", ".pptx"]:
+        return UnstructuredPowerPointLoader(file_path)
+    elif ext in [".doc", ".docx"]:
+        return UnstructuredWordDocumentLoader(file_path)
+    raise ValueError(f"❌ Unsupported file type: {ext}")
+
+# --- Hashing ---
+
+def hash_file(file_path: str) -> str:
+    """SHA-256 of the file contents, read in blocks so large files are not loaded at once."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+# Metadata that locates a chunk within its file. Everything else loaders attach (PDF
+# moddate/creationdate, total_pages, ...) changes on every save and must not affect IDs.
+_ID_METADATA_KEYS = ("source", "page", "page_number", "row")
+
+def chunk_id(chunk: Document) -> str:
+    """Content-hash ID for a chunk. Its location (source, page, row) is part of the hash."""
+    location = {key: chunk.metadata[key] for key in _ID_METADATA_KEYS if key in chunk.metadata}
+    digest = hashlib.sha256()
+    digest.update(json.dumps(location, sort_keys=True, default=str).encode())
+    digest.update(b"\0")
+    digest.update(chunk.page_content.encode())
+    return digest.hexdigest()
+
+def _source_lock(source: str) -> threading.Lock:
+    with _source_locks_guard:
+        return _source_locks.setdefault(source, threading.Lock())
+
+def _publish_upload(file_path: str, staged_path: str):
+    """Moves a staged upload (core.jobs.staged_upload_path) onto the source; call with its lock held."""
+    sequence = int(staged_path.rsplit(".", 2)[-2])
+    if sequence > _published_uploads.get(file_path, -1):
+        os.replace(staged_path, file_path)
+        _published_uploads[file_path] = sequence
+    else:
+        # Jobs can start out of order; a newer upload of the same name is already in place
+        os.remove(staged_path)
+
+# --- Streaming Pipeline ---
+
+_DONE = object()
+
+def iter_chunks(file_path: str) -> Iterator[Document]:
+    """Lazily loads a file page by page (or row by row) and splits each piece as it arrives."""
+    text_splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
+    for document in get_loader(file_path).lazy_load():
+        yield from text_splitter.split_documents([document])
+
+def bounded_stage(items: Iterable[Any], maxsize: int = INGEST_QUEUE_SIZE) -> Iterator[Any]:
+    """
+    Runs `items` on a background thread and hands its output over a bounded queue,
+    so loading/splitting overlaps embedding without buffering more than `maxsize` items.
+    Errors raised by the producer are re-raised in the consumer.
+    """
+    handoff: queue.Queue = queue.Queue(maxsize=maxsize)
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                handoff.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in items:
+                if not put(item):
+                    return
+            put(_DONE)
+        except BaseException as e:
+            put(e)
+
+    threading.Thread(target=produce, daemon=True).start()
+    try:
+        while True:
+            item = handoff.get()
+            if item is _DONE:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        # Unblocks the producer if the consumer stops early
+        stop.set()
+
+# --- Ingestion ---
+
+def _backfill_partition(file_path: str):
+    """Copies a source's chunks (with their stored embeddings) from the shared collection into its partition."""
+    stored = get_rag_store().get(where={"source": file_path}, include=["embeddings", "documents", "metadatas"])
+    partition = get_rag_store(source_collection(file_path))
+    for i in range(0, len(stored["ids"]), _COPY_BATCH):
+        partition._collection.upsert(
+            ids=stored["ids"][i:i + _COPY_BATCH],
+            embeddings=stored["embeddings"][i:i + _COPY_BATCH],
+            documents=stored["documents"][i:i + _COPY_BATCH],
+            metadatas=stored["metadatas"][i:i + _COPY_BATCH],
+        )
+    print(f"🗂️ Partition for {file_path} seeded with {len(stored['ids'])} chunks.")
+
+def _backfill_keywords(file_path: str):
+    """Indexes a source's chunks from the vector store (for sources ingested before the keyword index)."""
+    stored = get_rag_store().get(where={"source": file_path}, include=["documents"])
+    get_keyword_index().add(zip(stored["ids"], [file_path] * len(stored["ids"]), stored["documents"]))
+    print(f"🔤 Keyword index backfilled with {len(stored['ids'])} chunks from {file_path}.")
+
+def ingest_file(file_path: str, progress: Callable[[Dict[str, Any]], None] | None = None,
+                staged_path: str | None = None) -> Dict[str, Any]:
+    """
+    Ingests a file into the RAG collection, embedding only chunks that changed.
+    The file is streamed through load -> split -> embed, so peak memory is bounded by the
+    queue and batch sizes rather than the file size. `progress`, if given, is called with
+    running counts after every embedded batch. `staged_path` is a new upload of the file,
+    moved into place once no other ingest of it is running.
+    Returns counts of added, deleted and unchanged chunks.
+    """
+    with _source_lock(file_path):
+        if staged_path:
+            _publish_upload(file_path, staged_path)
+        stat = os.stat(file_path)
+        manifest = load_manifest(file_path)
+        if manifest and manifest.get("mtime") == stat.st_mtime and manifest.get("size") == stat.st_size:
+            file_hash = manifest["file_hash"]  # Same mtime and size: skip reading the file
+        else:
+            file_hash = hash_file(file_path)
+        keywords = get_keyword_index()
+        partition = source_collection(file_path)
+        if manifest and manifest.get("file_hash") == file_hash:
+            if manifest["chunks"] and not keywords.has_source(file_path):
+                _backfill_keywords(file_path)
+            if manifest.get("partition") != partition:
+                _backfill_partition(file_path)
+                save_manifest(file_path, {**manifest, "partition": partition})
+                mark_partitioned(file_path)
+            print(f"⏭️  {file_path} is unchanged since the last ingest, skipping.")
+            return {"added": 0, "deleted": 0, "unchanged": len(manifest["chunks"]), "skipped": True}
+
+        store = get_rag_store()
+        if manifest is None:
+            # First incremental ingest: clear chunks left by older, non-deduplicated ingests
+            store.delete(where={"source": file_path})
+            keywords.delete_source(file_path)
+            drop_source_store(file_path)
+            old_ids: set = set()
+        else:
+            old_ids = set(manifest["chunks"])
+            if manifest.get("partition") != partition:
+                # Ingested before partitions existed; seed this source's partition from the shared collection
+                _backfill_partition(file_path)
+        source_store = get_rag_store(partition)
+        # Sources ingested before the keyword index existed get their unchanged chunks indexed too
+        index_all = bool(old_ids) and not keywords.has_source(file_path)
+        keyword_batch: list = []
+
+        # Ordered set of every chunk ID in the new version of the file (IDs only, not text)
+        seen_ids: Dict[str, None] = {}
+        counts = {"chunks": 0, "added": 0}
+
+        def new_chunks() -> Iterator[Tuple[str, Document]]:
+            for chunk in iter_chunks(file_path):
+                counts["chunks"] += 1
+                cid = chunk_id(chunk)
+                # Identical chunks collapse onto one ID, which removes duplicates within the file
+                if cid in seen_ids:
+                    continue
+                seen_ids[cid] = None
+                is_new = cid not in old_ids
+                if is_new or index_all:
+                    keyword_batch.append((cid, file_path, chunk.page_content))
+                    if len(keyword_batch) >= _KEYWORD_BATCH:
+                        keywords.add(keyword_batch)
+                        keyword_batch.clear()
+                if is_new:
+                    counts["added"] += 1
+                    yield cid, chunk
+
+        def on_batch(embedded: int):
+            if progress:
+                progress({"stage": "embedding", "chunks_seen": counts["chunks"], "embedded": embedded})
+
+        # Chroma upserts by ID, so a retried ingest never duplicates chunks
+        embed_stats = embed_and_upsert(store, bounded_stage(new_chunks()), on_batch=on_batch, mirrors=[source_store])
+
+        keywords.add(keyword_batch)
+
+        stale_ids = list(old_ids.difference(seen_ids))
+        if stale_ids:
+            store.delete(ids=stale_ids)
+            source_store.delete(ids=stale_ids)
+            keywords.delete(stale_ids)
+        invalidate_rag_store(RAG_COLLECTION)
+        invalidate_rag_store(partition)
+
+        save_manifest(file_path, {
+            "source": file_path,
+            "file_hash": file_hash,
+            "mtime": stat.st_mtime,
+            "size": stat.st_size,
+            "partition": partition,
+            "chunks": list(seen_ids),
+        })
+        mark_partitioned(file_path)
+
+        stats = {"added": counts["added"], "deleted": len(stale_ids), "unchanged": len(seen_ids) - counts["added"], "skipped": False, **embed_stats}
+        if progress:
+            progress({"stage": "done", "chunks_seen": counts["chunks"], "embedded": embed_stats["embedded"]})
+        print(f"✅ {file_path}: {stats['added']} chunks added, {stats['deleted']} deleted, {stats['unchanged']} unchanged.")
+        return stats
+
+# --- Source Management ---
+
+def list_sources() -> List[Dict[str, Any]]:
+    """Every ingested source with its chunk count."""
+    return sorted(
+        ({"source": m["source"], "chunks": len(m.get("chunks", [])), "mtime": m.get("mtime"),
+          "partitioned": m.get("partition") == source_collection(m["source"])} for m in iter_manifests()),
+        key=lambda entry: entry["source"],
+    )
+
+def source_chunks(file_path: str, limit: int = 100, offset: int = 0) -> Dict[str, Any] | None:
+    """A page of one source's chunks, read from its partition (cost depends only on that source)."""
+    manifest = load_manifest(file_path)
+    if manifest is None:
+        return None
+    ids = manifest["chunks"][offset:offset + limit]
+    chunks = []
+    if ids:
+        stored = get_rag_store(source_collection(file_path)).get(ids=ids, include=["documents", "metadatas"])
+        chunks = [{"id": cid, "text": text, "metadata": meta}
+                  for cid, text, meta in zip(stored["ids"], stored["documents"], stored["metadatas"])]
+    return {"source": file_path, "total": len(manifest["chunks"]), "offset": offset, "chunks": chunks}
+
+def delete_source(file_path: str) -> Dict[str, Any]:
+    """
+    Removes a source from every index: its partition is dropped whole, and its chunk IDs
+    (from the manifest) are deleted from the shared collection, so the cost scales with the source.
+    """
+    with _source_lock(file_path):
+        manifest = load_manifest(file_path)
+        if manifest is None:
+            return {"source": file_path, "found": False, "deleted": 0}
+        ids = manifest.get("chunks", [])
+        store = get_rag_store()
+        for i in range(0, len(ids), _COPY_BATCH):
+            store.delete(ids=ids[i:i + _COPY_BATCH])
+        drop_source_store(file_path)
+        get_keyword_index().delete_source(file_path)
+        delete_manifest(file_path)
+        invalidate_rag_store(RAG_COLLECTION)
+        print(f"🗑️ Removed {file_path} ({len(ids)} chunks) from the knowledge base.")
+        return {"source": file_path, "found": True, "deleted": len(ids)}
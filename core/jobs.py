@@ -0,0 +1,99 @@
+# core/jobs.py
+# Background ingestion jobs. Uploads are queued here and ingested on a bounded
+# worker pool, so the upload request returns immediately and clients poll for status.
+from __future__ import annotations
+import time
+import uuid
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+from .config import INGEST_MAX_CONCURRENT, INGEST_JOB_HISTORY
+
+def staged_upload_path(file_path: str) -> str:
+    """
+    Where to write a new upload of `file_path`. The ingest job moves it into place under the
+    source's lock, so a running ingest of the same name never reads a half-written file.
+    The suffix orders uploads of the same name (see core.ingest).
+    """
+    return f"{file_path}.{time.time_ns()}.upload"
+
+class IngestJobQueue:
+    """Runs ingestion jobs on a fixed-size thread pool and tracks their state."""
+    def __init__(self, ingest: Callable[..., Dict[str, Any]], max_workers: int = INGEST_MAX_CONCURRENT, history: int = INGEST_JOB_HISTORY):
+        self.ingest = ingest
+        self.history = history
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ingest")
+        self._jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, file_path: str, staged_path: str | None = None) -> str:
+        """Queues a file for ingestion (first moving `staged_path` onto it, if given) and returns the job ID."""
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._jobs[job_id] = {
+                "job_id": job_id,
+                "file": file_path,
+                "state": "queued",
+                "chunks_seen": 0,
+                "embedded": 0,
+                "queued_at": time.time(),
+                "started_at": None,
+                "finished_at": None,
+            }
+            self._evict_finished()
+        self._executor.submit(self._run, job_id, file_path, staged_path)
+        return job_id
+
+    def get(self, job_id: str) -> Dict[str, Any] | None:
+        """Returns a snapshot of a job's state, or None if it is unknown."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def _update(self, job_id: str, **fields: Any):
+        with self._lock:
+            self._jobs[job_id].update(fields)
+
+    def _run(self, job_id: str, file_path: str, staged_path: str | None = None):
+        started = time.time()
+        self._update(job_id, state="running", started_at=started)
+        print(f"[INGEST] ▶️  Job {job_id} started for {file_path}")
+        try:
+            progress = lambda p: self._update(job_id, chunks_seen=p["chunks_seen"], embedded=p["embedded"])
+            if staged_path:
+                stats = self.ingest(file_path, progress=progress, staged_path=staged_path)
+            else:
+                stats = self.ingest(file_path, progress=progress)
+            finished = time.time()
+            self._update(job_id, state="succeeded", finished_at=finished, duration=round(finished - started, 3), **stats)
+            print(f"[INGEST] ✅ Job {job_id} finished in {finished - started:.2f}s")
+        except Exception as e:
+            finished = time.time()
+            self._update(job_id, state="failed", finished_at=finished, duration=round(finished - started, 3), error=str(e))
+            print(f"[INGEST] ❌ Job {job_id} failed: {e}")
+
+    def _evict_finished(self):
+        """Forgets the oldest finished jobs once more than `history` are tracked."""
+        excess = len(self._jobs) - self.history
+        if excess <= 0:
+            return
+        for job_id in [j for j, job in self._jobs.items() if job["state"] in ("succeeded", "failed")][:excess]:
+            del self._jobs[job_id]
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+_queue: IngestJobQueue | None = None
+_queue_lock = threading.Lock()
+
+def get_ingest_queue() -> IngestJobQueue:
+    """Returns the process-wide ingestion job queue."""
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                from .ingest import ingest_file
+                _queue = IngestJobQueue(ingest_file)
+    return _queue
@@ -0,0 +1,218 @@
+# core/keyword_index.py
+# Lexical side of RAG retrieval: an inverted index (term -> chunk postings) in SQLite, kept
+# next to the Chroma collection and updated with the same chunk IDs during ingestion.
+# Scores are BM25. Identifier-like tokens (SKUs, error codes, file names) are indexed whole
+# as well as split, so exact lookups work without touching the embedding model.
+from __future__ import annotations
+import math
+import os
+import re
+import sqlite3
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Tuple
+
+from .config import RAG_KEYWORD_DB, RAG_KEYWORD_MAX_DF
+
+# Letters and digits in any script ([^\W_] is \w without the underscore)
+_TOKEN_RE = re.compile(r"[^\W_]+(?:[-_./:#][^\W_]+)*")
+_PART_RE = re.compile(r"[^\W_]+")
+_BM25_K1 = 1.2
+_BM25_B = 0.75
+_INDEX_VERSION = 3  # Bump when tokenize() or the postings layout changes; postings are rebuilt from the stored chunks
+_FILL_STATS = "INSERT INTO source_stats SELECT source, COUNT(*), SUM(length) FROM chunks GROUP BY source"
+
+def tokenize(text: str) -> List[str]:
+    """Casefolded word tokens; compound identifiers yield the whole token and its parts."""
+    tokens = []
+    for match in _TOKEN_RE.finditer(text.casefold()):
+        token = match.group(0)
+        tokens.append(token)
+        if not token.isalnum():
+            tokens.extend(_PART_RE.findall(token))
+    return tokens
+
+def is_identifier(token: str) -> bool:
+    """
+    Tokens dense embeddings handle poorly: an inner separator (file names, error codes) or
+    letters mixed with digits (SKUs). Plain numbers like years are ordinary words.
+    """
+    if not token.isalnum():
+        return True
+    return any(c.isdigit() for c in token) and any(c.isalpha() for c in token)
+
+class KeywordIndex:
+    """BM25 inverted index over RAG chunks, keyed by the same content-hash IDs as the vector store."""
+    def __init__(self, path: str = RAG_KEYWORD_DB, max_df: int = RAG_KEYWORD_MAX_DF):
+        self.path = path
+        self.max_df = max_df
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(postings)")]
+        if columns and "source" not in columns:
+            self._conn.execute("DROP TABLE postings")  # Older layout; rebuilt below
+        self._conn.executescript("""
+            PRAGMA journal_mode=WAL;
+            PRAGMA synchronous=NORMAL;
+            CREATE TABLE IF NOT EXISTS chunks (
+                id TEXT PRIMARY KEY, source TEXT NOT NULL, length INTEGER NOT NULL, text TEXT NOT NULL);
+            CREATE INDEX IF NOT EXISTS chunks_source ON chunks(source);
+            CREATE TABLE IF NOT EXISTS postings (
+                term TEXT NOT NULL, chunk_id TEXT NOT NULL, tf INTEGER NOT NULL, source TEXT NOT NULL,
+                PRIMARY KEY (term, chunk_id)) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS postings_chunk ON postings(chunk_id);
+            -- Source-filtered queries read only that source's postings
+            CREATE INDEX IF NOT EXISTS postings_source_term ON postings(source, term, chunk_id, tf);
+            -- Per-source chunk count and total length, so BM25 corpus stats don't scan chunks
+            CREATE TABLE IF NOT EXISTS source_stats (
+                source TEXT PRIMARY KEY, chunks INTEGER NOT NULL, length INTEGER NOT NULL);
+        """)
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] != _INDEX_VERSION:
+            self._rebuild_postings()
+        elif self._conn.execute("SELECT 1 FROM source_stats LIMIT 1").fetchone() is None:
+            with self._conn:  # Index written before source_stats existed
+                self._conn.execute(_FILL_STATS)
+
+    def _rebuild_postings(self):
+        """Re-tokenizes every stored chunk (after a tokenizer or layout change)."""
+        with self._lock, self._conn:
+            rows = self._conn.execute("SELECT id, source, text FROM chunks").fetchall()
+            if rows:
+                print(f"🔤 Re-tokenizing {len(rows)} keyword-index chunks...")
+            self._conn.execute("DELETE FROM postings")
+            self._conn.execute("DELETE FROM source_stats")
+            for chunk_id, source, text in rows:
+                counts = Counter(tokenize(text))
+                self._conn.execute("UPDATE chunks SET length = ? WHERE id = ?", (sum(counts.values()), chunk_id))
+                self._conn.executemany("INSERT INTO postings VALUES (?, ?, ?, ?)",
+                                       [(term, chunk_id, tf, source) for term, tf in counts.items()])
+            self._conn.execute(_FILL_STATS)
+            self._conn.execute(f"PRAGMA user_version = {_INDEX_VERSION}")
+
+    # --- Updates ---
+    def _adjust_stats(self, rows: Iterable[Tuple[str, int]], sign: int):
+        """Adds (sign=1) or removes (sign=-1) (source, length) chunk rows from source_stats. Caller holds the lock."""
+        deltas: Dict[str, List[int]] = {}
+        for source, length in rows:
+            delta = deltas.setdefault(source, [0, 0])
+            delta[0] += sign
+            delta[1] += sign * length
+        self._conn.executemany(
+            "INSERT INTO source_stats VALUES (?, ?, ?) ON CONFLICT(source) DO UPDATE SET "
+            "chunks = chunks + excluded.chunks, length = length + excluded.length",
+            [(source, chunks, length) for source, (chunks, length) in deltas.items()])
+        self._conn.execute("DELETE FROM source_stats WHERE chunks <= 0")
+
+    def _existing(self, ids: List[Tuple[str]]) -> List[Tuple[str, int]]:
+        return [row for (chunk_id,) in ids for row in self._conn.execute(
+            "SELECT source, length FROM chunks WHERE id = ?", (chunk_id,))]
+
+    def add(self, chunks: Iterable[Tuple[str, str, str]]):
+        """Indexes (chunk_id, source, text) triples; re-adding an ID replaces it."""
+        rows, postings, ids = [], [], []
+        for chunk_id, source, text in chunks:
+            counts = Counter(tokenize(text))
+            ids.append((chunk_id,))
+            rows.append((chunk_id, source, sum(counts.values()), text))
+            postings.extend((term, chunk_id, tf, source) for term, tf in counts.items())
+        if not rows:
+            return
+        with self._lock, self._conn:
+            self._adjust_stats(self._existing(ids), -1)
+            self._conn.executemany("DELETE FROM postings WHERE chunk_id = ?", ids)
+            self._conn.executemany("INSERT OR REPLACE INTO chunks VALUES (?, ?, ?, ?)", rows)
+            self._conn.executemany("INSERT INTO postings VALUES (?, ?, ?, ?)", postings)
+            self._adjust_stats([(source, length) for _, source, length, _ in rows], 1)
+
+    def delete(self, chunk_ids: Iterable[str]):
+        ids = [(chunk_id,) for chunk_id in chunk_ids]
+        with self._lock, self._conn:
+            self._adjust_stats(self._existing(ids), -1)
+            self._conn.executemany("DELETE FROM postings WHERE chunk_id = ?", ids)
+            self._conn.executemany("DELETE FROM chunks WHERE id = ?", ids)
+
+    def delete_source(self, source: str):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM postings WHERE source = ?", (source,))
+            self._conn.execute("DELETE FROM chunks WHERE source = ?", (source,))
+            self._conn.execute("DELETE FROM source_stats WHERE source = ?", (source,))
+
+    def has_source(self, source: str) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM chunks WHERE source = ? LIMIT 1", (source,)).fetchone() is not None
+
+    # --- Queries ---
+    def search(self, query: str, k: int = 10, source: str | None = None,
+               require_all: List[str] | None = None) -> List[Dict[str, object]]:
+        """
+        BM25 top-k as [{"id", "text", "source", "score"}]. `require_all` keeps only chunks
+        containing every listed token (used for exact-identifier lookups).
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms or k <= 0:
+            return []
+        stats_scope, posting_scope, scope_args = ("WHERE source = ?", "AND p.source = ?", [source]) if source else ("", "", [])
+        with self._lock:
+            total, total_length = self._conn.execute(
+                f"SELECT SUM(chunks), SUM(length) FROM source_stats {stats_scope}", scope_args).fetchone()
+            if not total:
+                return []
+            avg_length = total_length / total
+            # Document frequencies, counted no further than the ceiling (an index-only read per term)
+            df = {term: self._conn.execute(
+                f"SELECT COUNT(*) FROM (SELECT 1 FROM postings p WHERE p.term = ? {posting_scope} LIMIT ?)",
+                [term] + scope_args + [self.max_df + 1]).fetchone()[0] for term in terms}
+            # Terms above the ceiling carry almost no BM25 weight; skip them like stopwords unless
+            # an exact lookup needs them or nothing else is left, and then read at most max_df postings
+            required = set(require_all or ())
+            kept = [t for t in terms if df[t] and (df[t] <= self.max_df or t in required)]
+            if not kept:
+                kept = [t for t in terms if df[t]]
+            postings = [row for term in kept for row in self._conn.execute(
+                f"SELECT p.term, p.chunk_id, p.tf, c.length FROM postings p JOIN chunks c ON c.id = p.chunk_id "
+                f"WHERE p.term = ? {posting_scope} LIMIT ?",
+                [term] + scope_args + [-1 if term in required else self.max_df])]
+
+        scores: Dict[str, float] = {}
+        matched: Dict[str, set] = {}
+        for term, chunk_id, tf, length in postings:
+            idf = math.log(1 + (total - df[term] + 0.5) / (df[term] + 0.5))
+            norm = tf + _BM25_K1 * (1 - _BM25_B + _BM25_B * length / (avg_length or 1))
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * tf * (_BM25_K1 + 1) / norm
+            matched.setdefault(chunk_id, set()).add(term)
+        if require_all:
+            needed = set(require_all)
+            scores = {cid: s for cid, s in scores.items() if needed <= matched[cid]}
+        top = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+        if not top:
+            return []
+        with self._lock:
+            rows = dict((row[0], row[1:]) for row in self._conn.execute(
+                f"SELECT id, text, source FROM chunks WHERE id IN ({','.join('?' * len(top))})",
+                [cid for cid, _ in top]).fetchall())
+        return [{"id": cid, "text": rows[cid][0], "source": rows[cid][1], "score": score}
+                for cid, score in top if cid in rows]
+
+    def identifier_terms(self, query: str) -> List[str]:
+        """Identifier-like query tokens that actually occur in the index."""
+        candidates = [t for t in dict.fromkeys(_TOKEN_RE.findall(query.casefold())) if is_identifier(t)]
+        if not candidates:
+            return []
+        with self._lock:
+            found = {row[0] for row in self._conn.execute(
+                f"SELECT DISTINCT term FROM postings WHERE term IN ({','.join('?' * len(candidates))})",
+                candidates).fetchall()}
+        return [t for t in candidates if t in found]
+
+_index: KeywordIndex | None = None
+_index_lock = threading.Lock()
+
+def get_keyword_index() -> KeywordIndex:
+    """Returns the process-wide keyword index, creating the database on first use."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                os.makedirs(os.path.dirname(RAG_KEYWORD_DB) or ".", exist_ok=True)
+                _index = KeywordIndex(RAG_KEYWORD_DB)
+    return _index
@@ -0,0 +1,119 @@
+# core/llm.py
+# Process-wide registry of LLM clients, so every request reuses the same
+# keep-alive connection pool instead of paying for a new TLS handshake.
+from __future__ import annotations
+import threading
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
+
+import httpx
+from cerebras.cloud.sdk import Cerebras, AsyncCerebras
+
+from .config import (
+    LLM_BASE_URL, LLM_POOL_SIZE, LLM_POOL_KEEPALIVE, LLM_KEEPALIVE_EXPIRY,
+    LLM_TIMEOUT, LLM_ASYNC_POOL_SIZE
+)
+
+if TYPE_CHECKING:
+    from langchain_cerebras import ChatCerebras
+
+_lock = threading.Lock()
+_http_client: Optional[httpx.Client] = None
+_cerebras_clients: Dict[Optional[str], Cerebras] = {}
+_async_http_client: Optional[httpx.AsyncClient] = None
+_async_cerebras_clients: Dict[Optional[str], AsyncCerebras] = {}
+_chat_models: Dict[Tuple, "ChatCerebras"] = {}
+
+def _pool_limits(pool_size: Optional[int] = None) -> httpx.Limits:
+    pool_size = pool_size or LLM_POOL_SIZE
+    return httpx.Limits(
+        max_connections=pool_size,
+        max_keepalive_connections=min(LLM_POOL_KEEPALIVE, pool_size),
+        keepalive_expiry=LLM_KEEPALIVE_EXPIRY,
+    )
+
+def get_http_client() -> httpx.Client:
+    """Returns the shared, pooled HTTP client used by all LLM SDK clients."""
+    global _http_client
+    if _http_client is None:
+        with _lock:
+            if _http_client is None:
+                _http_client = httpx.Client(limits=_pool_limits(), timeout=LLM_TIMEOUT)
+    return _http_client
+
+def get_cerebras_client(api_key: Optional[str] = None) -> Cerebras:
+    """Returns the process-wide Cerebras SDK client for the given API key."""
+    client = _cerebras_clients.get(api_key)
+    if client is None:
+        http_client = get_http_client()
+        with _lock:
+            client = _cerebras_clients.get(api_key)
+            if client is None:
+                client = Cerebras(api_key=api_key, base_url=LLM_BASE_URL, http_client=http_client)
+                _cerebras_clients[api_key] = client
+    return client
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """
+    Returns the shared async HTTP client used by the async serving mode.
+    Its connections belong to the event loop that first uses it, so only call
+    this from the server's single event loop.
+    """
+    global _async_http_client
+    if _async_http_client is None:
+        with _lock:
+            if _async_http_client is None:
+                _async_http_client = httpx.AsyncClient(limits=_pool_limits(LLM_ASYNC_POOL_SIZE), timeout=LLM_TIMEOUT)
+    return _async_http_client
+
+def get_async_cerebras_client(api_key: Optional[str] = None) -> AsyncCerebras:
+    """Returns the process-wide AsyncCerebras SDK client for the given API key."""
+    client = _async_cerebras_clients.get(api_key)
+    if client is None:
+        http_client = get_async_http_client()
+        with _lock:
+            client = _async_cerebras_clients.get(api_key)
+            if client is None:
+                client = AsyncCerebras(api_key=api_key, base_url=LLM_BASE_URL, http_client=http_client)
+                _async_cerebras_clients[api_key] = client
+    return client
+
+def get_chat_model(**params: Any) -> ChatCerebras:
+    """
+    Returns a shared ChatCerebras instance for the given constructor parameters.
+    Models with identical parameters are built once and reused; all of them share
+    the pooled HTTP client.
+    """
+    key = tuple(sorted(params.items()))
+    model = _chat_models.get(key)
+    if model is None:
+        http_client = get_http_client()
+        with _lock:
+            model = _chat_models.get(key)
+            if model is None:
+                # Deferred: langchain_cerebras is only needed by the LangChain-based agents
+                from langchain_cerebras import ChatCerebras
+                if LLM_BASE_URL:
+                    # ChatCerebras talks to the OpenAI-compatible /v1 prefix directly
+                    params.setdefault("base_url", f"{LLM_BASE_URL.rstrip('/')}/v1")
+                model = ChatCerebras(http_client=http_client, **params)
+                _chat_models[key] = model
+    return model
+
+def close_clients():
+    """Closes the shared sync connection pool and forgets every cached sync client."""
+    global _http_client
+    with _lock:
+        if _http_client is not None:
+            _http_client.close()
+        _http_client = None
+        _cerebras_clients.clear()
+        _chat_models.clear()
+
+async def aclose_clients():
+    """Closes the shared async connection pool and forgets every cached async client."""
+    global _async_http_client
+    with _lock:
+        client, _async_http_client = _async_http_client, None
+        _async_cerebras_clients.clear()
+    if client is not None:
+        await client.aclose()
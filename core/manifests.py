@@ -0,0 +1,51 @@
+# core/manifests.py
+# Per-source ingest manifests: which chunk IDs a file produced last time, its hash, and
+# the vector partition holding its chunks. Shared by ingestion and retrieval.
+from __future__ import annotations
+import os
+import json
+import hashlib
+from typing import Any, Dict, Iterator
+
+from .config import RAG_MANIFEST_DIR
+
+def _manifest_path(source: str) -> str:
+    name = hashlib.sha256(source.encode()).hexdigest()[:32]
+    return os.path.join(RAG_MANIFEST_DIR, f"{name}.json")
+
+def load_manifest(source: str) -> Dict[str, Any] | None:
+    """Returns the manifest recorded for a source the last time it was ingested, if any."""
+    try:
+        with open(_manifest_path(source), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+def save_manifest(source: str, manifest: Dict[str, Any]):
+    os.makedirs(RAG_MANIFEST_DIR, exist_ok=True)
+    path = _manifest_path(source)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, path)
+
+def delete_manifest(source: str):
+    try:
+        os.remove(_manifest_path(source))
+    except FileNotFoundError:
+        pass
+
+def iter_manifests() -> Iterator[Dict[str, Any]]:
+    """Every ingested source's manifest, in no particular order."""
+    try:
+        names = os.listdir(RAG_MANIFEST_DIR)
+    except FileNotFoundError:
+        return
+    for name in names:
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(RAG_MANIFEST_DIR, name), "r", encoding="utf-8") as f:
+                yield json.load(f)
+        except (OSError, json.JSONDecodeError):
+            continue
@@ -1,18 +1,131 @@
 # core/memory.py
-from typing import List
-from .config import _vectorstore
+# Agent memory. Notes are queued and written to the vector store in batches on a background
+# thread (one embedding pass and one commit per batch), so mem_add is cheap for the caller.
+from __future__ import annotations
+import atexit
+import threading
+import time
+from typing import Callable, List
 
-def mem_add(text: str, kind: str = "note"):
-    if _vectorstore:
+from .config import get_memory_store, MEMORY_BATCH_SIZE, MEMORY_FLUSH_INTERVAL, MEMORY_QUEUE_MAX
+
+class MemoryWriter:
+    """
+    Write-behind buffer in front of a vector store. A batch is written once `batch_size`
+    notes are pending or `flush_interval` seconds have passed; flush() waits for everything
+    queued so far, and close() (run at exit) drains the buffer.
+    """
+    def __init__(self, store_fn: Callable = get_memory_store, batch_size: int = MEMORY_BATCH_SIZE,
+                 flush_interval: float = MEMORY_FLUSH_INTERVAL, max_pending: int = MEMORY_QUEUE_MAX):
+        self._store_fn = store_fn
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.max_pending = max(self.batch_size, max_pending)
+        self._cond = threading.Condition()
+        self._pending: List[str] = []
+        self._queued = 0
+        self._done = 0
+        self._flush_requested = False
+        self._closed = False
+        self._stats = {"queued": 0, "written": 0, "failed": 0, "batches": 0}
+        self._thread = threading.Thread(target=self._run, name="memory-writer", daemon=True)
+        self._thread.start()
+
+    def add(self, text: str):
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("memory writer is closed")
+            # Backpressure only when the writer has fallen far behind
+            self._cond.wait_for(lambda: len(self._pending) < self.max_pending)
+            self._pending.append(text)
+            self._queued += 1
+            self._stats["queued"] += 1
+            # The first pending note starts the flush_interval clock; a full batch goes right away
+            if len(self._pending) == 1 or len(self._pending) >= self.batch_size:
+                self._cond.notify_all()
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Blocks until every note queued before the call is written (or failed); False on timeout."""
+        with self._cond:
+            target = self._queued
+            self._flush_requested = True
+            self._cond.notify_all()
+            return self._cond.wait_for(lambda: self._done >= target, timeout)
+
+    def close(self):
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+
+    def stats(self):
+        with self._cond:
+            return {**self._stats, "pending": len(self._pending)}
+
+    def _run(self):
+        oldest = None
+        while True:
+            with self._cond:
+                while True:
+                    if self._pending and oldest is None:
+                        oldest = time.monotonic()
+                    due = oldest is not None and time.monotonic() - oldest >= self.flush_interval
+                    if self._pending and (len(self._pending) >= self.batch_size or self._flush_requested
+                                          or self._closed or due):
+                        break
+                    if self._closed:
+                        return
+                    self._flush_requested = False  # Nothing left to flush
+                    wait = None if oldest is None else max(0.0, self.flush_interval - (time.monotonic() - oldest))
+                    self._cond.wait(wait)
+                batch = self._pending[:self.batch_size]
+                del self._pending[:self.batch_size]
+                if not self._pending:
+                    oldest = None
+                self._cond.notify_all()  # Wake writers blocked on a full buffer
+            self._write(batch)
+
+    def _write(self, batch: List[str]):
         try:
-            _vectorstore.add_texts([f"{kind}: {text}"])
-            print(f"🧠 Memory Add Request Sent: '{kind}: {text[:60]}...'")
+            self._store_fn().add_texts(batch)
+            ok = True
         except Exception as e:
-            print(f"❌ Memory Add Failed: {e}")
+            print(f"❌ Memory batch of {len(batch)} failed: {e}")
+            ok = False
+        with self._cond:
+            self._done += len(batch)
+            self._stats["written" if ok else "failed"] += len(batch)
+            self._stats["batches"] += 1
+            self._cond.notify_all()
+
+_writer: MemoryWriter | None = None
+_writer_lock = threading.Lock()
+
+def get_memory_writer() -> MemoryWriter:
+    """Returns the process-wide memory writer; pending notes are flushed at interpreter exit."""
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = MemoryWriter()
+                atexit.register(_writer.close)
+    return _writer
+
+def mem_add(text: str, kind: str = "note"):
+    """Queues a note; it reaches the store with the next batch (see MemoryWriter)."""
+    try:
+        get_memory_writer().add(f"{kind}: {text}")
+        print(f"🧠 Memory Add Queued: '{kind}: {text[:60]}...'")
+    except Exception as e:
+        print(f"❌ Memory Add Failed: {e}")
+
+def flush() -> bool:
+    """Waits until all queued notes are in the store."""
+    return get_memory_writer().flush()
 
 def mem_recall(query: str, k: int = 3) -> List[str]:
     """Recalls k most similar documents from the vector store."""
-    if _vectorstore:
-        docs = _vectorstore.similarity_search(query, k=k)
-        return [d.page_content for d in docs]
-    return []
\ No newline at end of file
+    docs = get_memory_store().similarity_search(query, k=k)
+    return [d.page_content for d in docs]
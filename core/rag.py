@@ -0,0 +1,182 @@
+# core/rag.py
+# Long-lived handles to the RAG vector store, shared by search and ingestion, and the
+# hybrid (BM25 + vector) retrieval used by tool_rag_search.
+from __future__ import annotations
+import re
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List
+
+from langchain_core.embeddings import Embeddings
+from langchain_chroma import Chroma
+
+from .config import (
+    get_embedding_fn, RAG_PERSIST_DIR, RAG_COLLECTION, RAG_QUERY_CACHE_SIZE,
+    RAG_TOP_K, RAG_HYBRID_CANDIDATES, RAG_RRF_K, RAG_EXACT_MAX_TOKENS, RAG_SOURCE_STORE_CACHE,
+)
+from .keyword_index import get_keyword_index
+from .manifests import load_manifest
+
+def normalize_query(text: str) -> str:
+    """Collapses whitespace and case so trivially different queries share a cache entry."""
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+class CachedQueryEmbeddings(Embeddings):
+    """Embedding wrapper with an LRU cache for query embeddings; document embedding passes through."""
+    def __init__(self, base: Embeddings, max_size: int = 256):
+        self.base = base
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._cache: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.base.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        key = normalize_query(text)
+        with self._lock:
+            vector = self._cache.get(key)
+            if vector is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return vector
+            self.misses += 1
+
+        vector = self.base.embed_query(text)  # The key is only for lookups; embed what the caller asked
+        if self.max_size > 0:
+            with self._lock:
+                self._cache[key] = vector
+                self._cache.move_to_end(key)
+                while len(self._cache) > self.max_size:
+                    self._cache.popitem(last=False)
+        return vector
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+_query_embeddings: CachedQueryEmbeddings | None = None
+_stores: "OrderedDict[str, Chroma]" = OrderedDict()
+_stores_lock = threading.RLock()
+_partitioned: set = set()  # Sources known to have their own partition collection
+
+def get_query_embeddings() -> CachedQueryEmbeddings:
+    """Returns the embedding model wrapped with the shared query-embedding cache."""
+    global _query_embeddings
+    if _query_embeddings is None:
+        with _stores_lock:
+            if _query_embeddings is None:
+                _query_embeddings = CachedQueryEmbeddings(get_embedding_fn(), RAG_QUERY_CACHE_SIZE)
+    return _query_embeddings
+
+def get_rag_store(collection: str = RAG_COLLECTION) -> Chroma:
+    """Returns the process-wide handle for a RAG collection, opening it on first use."""
+    store = _stores.get(collection)
+    if store is None:
+        with _stores_lock:
+            store = _stores.get(collection)
+            if store is None:
+                print(f"📚 Opening RAG collection '{collection}'...")
+                store = Chroma(
+                    persist_directory=RAG_PERSIST_DIR,
+                    embedding_function=get_query_embeddings(),
+                    collection_name=collection
+                )
+                _stores[collection] = store
+                # Keep the shared collection plus the most recently used source partitions
+                while len(_stores) > RAG_SOURCE_STORE_CACHE + 1:
+                    oldest = next(name for name in _stores if name != RAG_COLLECTION)
+                    del _stores[oldest]
+    with _stores_lock:
+        if collection in _stores:
+            _stores.move_to_end(collection)
+    return store
+
+# --- Per-Source Partitions ---
+
+def source_collection(source: str) -> str:
+    """Name of the collection holding only `source`'s chunks."""
+    return f"{RAG_COLLECTION}_src_{hashlib.sha256(source.encode()).hexdigest()[:24]}"
+
+def get_source_store(source: str) -> Chroma | None:
+    """
+    The partition for one source, so filtered searches scan only that file's chunks.
+    None if the source was ingested before partitions existed (search the shared collection instead).
+    """
+    if source not in _partitioned:
+        manifest = load_manifest(source)
+        if not manifest or manifest.get("partition") != source_collection(source):
+            return None
+        _partitioned.add(source)
+    return get_rag_store(source_collection(source))
+
+def mark_partitioned(source: str, partitioned: bool = True):
+    if partitioned:
+        _partitioned.add(source)
+    else:
+        _partitioned.discard(source)
+
+def drop_source_store(source: str):
+    """Deletes a source's partition collection outright."""
+    name = source_collection(source)
+    mark_partitioned(source, False)
+    try:
+        get_rag_store(name).delete_collection()
+    finally:
+        invalidate_rag_store(name)
+
+def invalidate_rag_store(collection: str | None = None):
+    """
+    Drops cached handles (one collection, or all of them) after the store is written,
+    so the next search reopens it and sees the new chunks.
+    """
+    with _stores_lock:
+        if collection is None:
+            _stores.clear()
+        else:
+            _stores.pop(collection, None)
+
+def query_cache_stats() -> Dict[str, int]:
+    cache = get_query_embeddings()
+    return {"hits": cache.hits, "misses": cache.misses, "size": len(cache._cache)}
+
+# --- Hybrid Retrieval ---
+
+def hybrid_search(query: str, k: int = RAG_TOP_K, source: str | None = None,
+                  candidates: int = RAG_HYBRID_CANDIDATES, rrf_k: int = RAG_RRF_K) -> Dict[str, Any]:
+    """
+    Retrieves the top-k chunks for a query, optionally limited to one source file.
+    Short queries naming an indexed identifier (SKU, error code, file name) are answered
+    from the keyword index alone, without embedding the query ("exact" mode). Everything
+    else fuses BM25 and vector rankings with reciprocal rank fusion ("hybrid" mode).
+    """
+    keywords = get_keyword_index()
+    identifiers = keywords.identifier_terms(query)
+    if identifiers and len(query.split()) <= RAG_EXACT_MAX_TOKENS:
+        exact = keywords.search(query, k=k, source=source, require_all=identifiers)
+        if exact:
+            return {"mode": "exact", "results": [{**hit, "via": ["keyword"]} for hit in exact]}
+
+    ranked: Dict[str, Dict[str, Any]] = {}
+    def fuse(rank: int, text: str, hit_source: str | None, via: str):
+        entry = ranked.setdefault(text, {"text": text, "source": hit_source, "score": 0.0, "via": []})
+        entry["score"] += 1.0 / (rrf_k + rank)
+        entry["via"].append(via)
+
+    for rank, hit in enumerate(keywords.search(query, k=candidates, source=source), 1):
+        fuse(rank, hit["text"], hit["source"], "keyword")
+    vector_store = get_source_store(source) if source else None
+    search_kwargs: Dict[str, Any] = {"k": candidates}
+    if vector_store is None:
+        vector_store = get_rag_store()
+        if source:
+            search_kwargs["filter"] = {"source": source}
+    for rank, doc in enumerate(vector_store.similarity_search(query, **search_kwargs), 1):
+        # Fused by text: both indexes hold the same chunks, and identical text is a duplicate anyway
+        fuse(rank, doc.page_content, doc.metadata.get("source"), "vector")
+
+    results = sorted(ranked.values(), key=lambda entry: entry["score"], reverse=True)[:k]
+    return {"mode": "hybrid", "results": results}
@@ -0,0 +1,284 @@
+# core/repl.py
+# Persistent Python REPL for the agent. Each session gets its own worker process (so state
+# such as loaded dataframes survives between calls and sessions can't see each other), taken
+# from a pool of processes that already imported the heavy modules. Runaway snippets are
+# killed on timeout, output is capped, and sessions idle for too long are evicted.
+from __future__ import annotations
+import ast
+import atexit
+import importlib
+import io
+import multiprocessing
+import threading
+import time
+import traceback
+from contextlib import redirect_stdout, redirect_stderr
+from typing import Any, Dict, List
+
+from .config import (
+    REPL_POOL_SIZE, REPL_PREWARM_MODULES, REPL_TIMEOUT, REPL_STARTUP_TIMEOUT,
+    REPL_MAX_OUTPUT_CHARS, REPL_IDLE_SECONDS, REPL_MAX_SESSIONS,
+)
+
+_ctx = multiprocessing.get_context("spawn")
+
+# --- Worker Process ---
+
+class _CappedWriter(io.TextIOBase):
+    """stdout/stderr replacement that keeps only the first `limit` characters."""
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.parts: List[str] = []
+        self.size = 0
+        self.dropped = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        room = self.limit - self.size
+        if room > 0:
+            self.parts.append(text[:room])
+            self.size += min(room, len(text))
+        self.dropped += max(0, len(text) - max(room, 0))
+        return len(text)
+
+    def getvalue(self) -> str:
+        value = "".join(self.parts)
+        if self.dropped:
+            value += f"\n... [truncated {self.dropped} chars]"
+        return value
+
+def _execute(code: str, namespace: Dict[str, Any], max_output: int) -> Dict[str, Any]:
+    """Run `code` in `namespace`; like the interactive shell, the value of a trailing expression is returned."""
+    stdout, stderr = _CappedWriter(max_output), _CappedWriter(max_output)
+    result, error = None, None
+    try:
+        tree = ast.parse(code, mode="exec")
+        last_expr = None
+        if tree.body and isinstance(tree.body[-1], ast.Expr):
+            last_expr = ast.Expression(tree.body.pop().value)
+        with redirect_stdout(stdout), redirect_stderr(stderr):
+            exec(compile(tree, "<repl>", "exec"), namespace)
+            if last_expr is not None:
+                value = eval(compile(last_expr, "<repl>", "eval"), namespace)
+                if value is not None:
+                    result = repr(value)
+                    if len(result) > max_output:
+                        result = result[:max_output] + f"... [truncated {len(result) - max_output} chars]"
+    except BaseException as exc:
+        # Only show frames from the snippet itself, not this wrapper
+        frames = [f for f in traceback.extract_tb(exc.__traceback__) if f.filename == "<repl>"]
+        error = "".join(traceback.format_list(frames) + traceback.format_exception_only(type(exc), exc))
+    return {"ok": error is None, "stdout": stdout.getvalue(), "stderr": stderr.getvalue(),
+            "result": result, "error": error}
+
+def _worker_main(conn, prewarm: List[str], max_output: int):
+    for name in prewarm:
+        try:
+            importlib.import_module(name)
+        except Exception:
+            pass  # Optional; the snippet gets a normal ImportError if it needs it
+    conn.send("ready")
+    namespace: Dict[str, Any] = {"__name__": "__repl__"}
+    while True:
+        try:
+            code = conn.recv()
+        except (EOFError, OSError):
+            return
+        if code is None:
+            return
+        conn.send(_execute(code, namespace, max_output))
+
+# --- Parent Side ---
+
+class _Worker:
+    def __init__(self, prewarm: List[str], max_output: int):
+        self.conn, child_conn = _ctx.Pipe()
+        self.process = _ctx.Process(target=_worker_main, args=(child_conn, prewarm, max_output),
+                                    name="repl-worker", daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.ready = False
+
+    def wait_ready(self, timeout: float) -> bool:
+        if not self.ready and self.conn.poll(timeout):
+            self.ready = self.conn.recv() == "ready"
+        return self.ready
+
+    def run(self, code: str, timeout: float) -> Dict[str, Any] | None:
+        """Result dict, or None if the worker had to be killed (timeout or crash)."""
+        try:
+            self.conn.send(code)
+            if self.conn.poll(timeout):
+                return self.conn.recv()
+        except (EOFError, OSError):
+            pass
+        self.kill()
+        return None
+
+    def kill(self):
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join(timeout=5)
+        self.conn.close()
+
+class _Session:
+    def __init__(self, worker: _Worker):
+        self.worker = worker
+        self.lock = threading.Lock()
+        self.last_used = time.monotonic()
+
+class ReplPool:
+    """
+    Hands each session a dedicated, pre-warmed worker and keeps `size` spare workers ready.
+    Sessions idle longer than `idle_seconds` (or beyond `max_sessions`, oldest first) are evicted.
+    """
+    def __init__(self, size: int = REPL_POOL_SIZE, prewarm: List[str] | None = None,
+                 timeout: float = REPL_TIMEOUT, max_output: int = REPL_MAX_OUTPUT_CHARS,
+                 idle_seconds: float = REPL_IDLE_SECONDS, max_sessions: int = REPL_MAX_SESSIONS):
+        self.size = size
+        self.prewarm = REPL_PREWARM_MODULES if prewarm is None else prewarm
+        self.timeout = timeout
+        self.max_output = max_output
+        self.idle_seconds = idle_seconds
+        self.max_sessions = max_sessions
+        self._lock = threading.Lock()
+        self._spare: List[_Worker] = []
+        self._sessions: Dict[str, _Session] = {}
+        self._closed = threading.Event()
+        self._stats = {"runs": 0, "timeouts": 0, "evicted": 0, "cold_starts": 0}
+        self._refill()
+        self._reaper = threading.Thread(target=self._reap, name="repl-reaper", daemon=True)
+        self._reaper.start()
+
+    def run(self, code: str, session_id: str = "default", timeout: float | None = None) -> Dict[str, Any]:
+        timeout = self.timeout if timeout is None else timeout
+        session = self._locked_session(session_id)
+        try:
+            if not session.worker.wait_ready(REPL_STARTUP_TIMEOUT):
+                self._drop(session_id, session)
+                return {"ok": False, "error": "REPL worker failed to start", "session_id": session_id}
+            started = time.perf_counter()
+            result = session.worker.run(code, timeout)
+            elapsed = time.perf_counter() - started
+            session.last_used = time.monotonic()
+        finally:
+            session.lock.release()
+        with self._lock:
+            self._stats["runs"] += 1
+        if result is None:
+            # The worker (and the session's state) is gone; the next call starts a fresh session
+            self._drop(session_id, session)
+            with self._lock:
+                self._stats["timeouts"] += elapsed >= timeout
+            reason = f"Execution timed out after {timeout}s" if elapsed >= timeout else "REPL worker exited unexpectedly"
+            return {"ok": False, "session_id": session_id, "elapsed_ms": round(elapsed * 1000, 1),
+                    "error": f"{reason}; session state was reset"}
+        return {**result, "session_id": session_id, "elapsed_ms": round(elapsed * 1000, 1)}
+
+    def reset(self, session_id: str):
+        """Discard a session's state."""
+        with self._lock:
+            session = self._sessions.get(session_id)
+        if session:
+            self._drop(session_id, session)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._stats, "sessions": len(self._sessions), "spare": len(self._spare)}
+
+    def close(self):
+        self._closed.set()
+        with self._lock:
+            workers = self._spare + [s.worker for s in self._sessions.values()]
+            self._spare, self._sessions = [], {}
+        for worker in workers:
+            worker.kill()
+
+    # --- Internals ---
+    def _session(self, session_id: str) -> _Session:
+        evicted = []
+        took_spare = False
+        with self._lock:
+            if self._closed.is_set():
+                raise RuntimeError("REPL pool is closed")
+            session = self._sessions.get(session_id)
+            if session is None:
+                if self._spare:
+                    worker = self._spare.pop(0)
+                    took_spare = True
+                else:
+                    worker = _Worker(self.prewarm, self.max_output)
+                    self._stats["cold_starts"] += 1
+                session = self._sessions[session_id] = _Session(worker)
+                while len(self._sessions) > self.max_sessions:
+                    oldest = min((k for k in self._sessions if k != session_id),
+                                 key=lambda k: self._sessions[k].last_used)
+                    evicted.append(self._sessions.pop(oldest))
+                    self._stats["evicted"] += 1
+        for old in evicted:
+            with old.lock:
+                old.worker.kill()
+        if took_spare:
+            threading.Thread(target=self._refill, name="repl-refill", daemon=True).start()
+        return session
+
+    def _locked_session(self, session_id: str) -> _Session:
+        """The session with its lock held, retrying if it was evicted while we waited for the lock."""
+        while True:
+            session = self._session(session_id)
+            session.lock.acquire()
+            with self._lock:
+                if self._sessions.get(session_id) is session:
+                    return session
+            session.lock.release()
+
+    def _drop(self, session_id: str, session: _Session):
+        with self._lock:
+            if self._sessions.get(session_id) is session:
+                del self._sessions[session_id]
+        session.worker.kill()
+        threading.Thread(target=self._refill, name="repl-refill", daemon=True).start()
+
+    def _refill(self):
+        with self._lock:
+            missing = self.size - len(self._spare)
+            if self._closed.is_set() or missing <= 0:
+                return
+            self._spare.extend(_Worker(self.prewarm, self.max_output) for _ in range(missing))
+
+    def _reap(self):
+        interval = max(1.0, min(60.0, self.idle_seconds / 4))
+        while not self._closed.wait(interval):
+            now = time.monotonic()
+            with self._lock:
+                idle = [(k, s) for k, s in self._sessions.items()
+                        if now - s.last_used > self.idle_seconds and not s.lock.locked()]
+            for session_id, session in idle:
+                # Hold the session lock while dropping so a run can't start on the worker we kill
+                if not session.lock.acquire(blocking=False):
+                    continue
+                try:
+                    if time.monotonic() - session.last_used <= self.idle_seconds:
+                        continue  # Used since the scan
+                    print(f"🧹 Evicting idle REPL session {session_id}")
+                    self._drop(session_id, session)
+                    with self._lock:
+                        self._stats["evicted"] += 1
+                finally:
+                    session.lock.release()
+
+_pool: ReplPool | None = None
+_pool_lock = threading.Lock()
+
+def get_repl_pool() -> ReplPool:
+    """Returns the process-wide REPL pool, starting its spare workers on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                print(f"🐍 Starting {REPL_POOL_SIZE} warm Python REPL workers...")
+                _pool = ReplPool()
+                atexit.register(_pool.close)
+    return _pool
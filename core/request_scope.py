@@ -0,0 +1,47 @@
+# core/request_scope.py
+# Per-request context for tool calls: which conversation (or request) is running and its
+# CancelToken. The agent entry points set it; tools read it instead of taking extra args,
+# so state such as REPL sessions is never shared between conversations.
+from __future__ import annotations
+import contextlib
+import uuid
+from contextvars import ContextVar
+from typing import Any, Iterator
+
+from .cancel import CancelToken
+
+class RequestScope:
+    __slots__ = ("conversation_id", "request_id", "cancel_token")
+
+    def __init__(self, conversation_id: Any = None, request_id: str | None = None,
+                 cancel_token: CancelToken | None = None):
+        self.conversation_id = conversation_id
+        self.request_id = request_id or uuid.uuid4().hex
+        self.cancel_token = cancel_token
+
+    @property
+    def key(self) -> str:
+        """Stable per-conversation key; falls back to the request when there is no conversation."""
+        if self.conversation_id is not None:
+            return f"conversation:{self.conversation_id}"
+        return f"request:{self.request_id}"
+
+_scope: ContextVar[RequestScope | None] = ContextVar("request_scope", default=None)
+
+@contextlib.contextmanager
+def request_scope(conversation_id: Any = None, cancel_token: CancelToken | None = None,
+                  request_id: str | None = None) -> Iterator[RequestScope]:
+    """Makes a RequestScope current for the duration of the block (and threads started via asyncio.to_thread)."""
+    scope = RequestScope(conversation_id, request_id, cancel_token)
+    reset = _scope.set(scope)
+    try:
+        yield scope
+    finally:
+        _scope.reset(reset)
+
+def current_scope() -> RequestScope | None:
+    return _scope.get()
+
+def current_cancel_token() -> CancelToken | None:
+    scope = _scope.get()
+    return scope.cancel_token if scope else None
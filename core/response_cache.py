@@ -0,0 +1,141 @@
+# core/response_cache.py
+# Opt-in cache of agent answers (RESPONSE_CACHE_ENABLED=1). An exact tier matches the
+# normalized prompt plus a fingerprint of the history; a semantic tier finds earlier
+# prompts with the same history whose embeddings are close enough to reuse the answer.
+from __future__ import annotations
+import time
+import uuid
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from .config import (
+    RESPONSE_CACHE_ENABLED, RESPONSE_CACHE_TTL, RESPONSE_CACHE_MAX_ENTRIES,
+    RESPONSE_CACHE_SIMILARITY, RESPONSE_CACHE_SEMANTIC, get_embedding_fn
+)
+from .rag import normalize_query
+
+def history_fingerprint(history: List[Dict[str, Any]]) -> str:
+    digest = hashlib.sha256()
+    for message in history:
+        digest.update(str(message.get("role")).encode())
+        digest.update(b"\0")
+        digest.update(str(message.get("content") or "").encode())
+        digest.update(b"\1")
+    return digest.hexdigest()
+
+class ResponseCache:
+    def __init__(self, ttl: float = RESPONSE_CACHE_TTL, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES,
+                 similarity: float = RESPONSE_CACHE_SIMILARITY, semantic: bool = RESPONSE_CACHE_SEMANTIC):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.similarity = similarity
+        self.semantic = semantic
+        # key -> {"answer", "created_at"}; insertion order doubles as age order for eviction
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._store = None
+        self._lock = threading.Lock()
+        self.stats = {"exact_hits": 0, "semantic_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+    def _semantic_store(self):
+        """Dedicated in-memory Chroma collection, so it always matches the exact tier's contents."""
+        if self._store is None:
+            from langchain_chroma import Chroma
+            self._store = Chroma(
+                collection_name=f"response_cache_{uuid.uuid4().hex[:8]}",
+                embedding_function=get_embedding_fn(),
+                collection_metadata={"hnsw:space": "cosine"},
+            )
+        return self._store
+
+    @staticmethod
+    def _key(prompt: str, fingerprint: str) -> str:
+        return hashlib.sha256(f"{fingerprint}\0{prompt}".encode()).hexdigest()
+
+    def lookup(self, user_input: str, history: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Returns {"answer", "tier", "similarity"} on a hit, else None."""
+        prompt = normalize_query(user_input)
+        fingerprint = history_fingerprint(history)
+        key = self._key(prompt, fingerprint)
+        now = time.time()
+
+        with self._lock:
+            self._expire(now)
+            entry = self._entries.get(key)
+            if entry:
+                self.stats["exact_hits"] += 1
+                return {"answer": entry["answer"], "tier": "exact", "similarity": 1.0}
+
+        if self.semantic and self._entries:
+            try:
+                matches = self._semantic_store().similarity_search_with_score(prompt, k=1, filter={"history": fingerprint})
+            except Exception as e:
+                print(f"⚠️  Semantic cache lookup failed: {e}")
+                matches = []
+            if matches:
+                doc, distance = matches[0]
+                similarity = 1.0 - distance
+                with self._lock:
+                    entry = self._entries.get(doc.metadata.get("key"))
+                    if entry and similarity >= self.similarity:
+                        self.stats["semantic_hits"] += 1
+                        return {"answer": entry["answer"], "tier": "semantic", "similarity": round(similarity, 4)}
+
+        with self._lock:
+            self.stats["misses"] += 1
+        return None
+
+    def store(self, user_input: str, history: List[Dict[str, Any]], answer: str):
+        prompt = normalize_query(user_input)
+        fingerprint = history_fingerprint(history)
+        key = self._key(prompt, fingerprint)
+        with self._lock:
+            is_new = key not in self._entries
+            self._entries[key] = {"answer": answer, "created_at": time.time()}
+            self._entries.move_to_end(key)
+            self.stats["stores"] += 1
+            evicted = []
+            while len(self._entries) > self.max_entries:
+                evicted.append(self._entries.popitem(last=False)[0])
+            self.stats["evictions"] += len(evicted)
+        if self.semantic:
+            try:
+                store = self._semantic_store()
+                if is_new:
+                    store.add_texts([prompt], metadatas=[{"key": key, "history": fingerprint}], ids=[key])
+                if evicted:
+                    store.delete(ids=evicted)
+            except Exception as e:
+                print(f"⚠️  Semantic cache store failed: {e}")
+
+    def _expire(self, now: float):
+        """Drops entries older than the TTL (oldest first). Caller holds the lock."""
+        expired = []
+        while self._entries:
+            key, entry = next(iter(self._entries.items()))
+            if now - entry["created_at"] < self.ttl:
+                break
+            self._entries.popitem(last=False)
+            expired.append(key)
+        if expired:
+            self.stats["evictions"] += len(expired)
+            if self.semantic and self._store is not None:
+                try:
+                    self._store.delete(ids=expired)
+                except Exception as e:
+                    print(f"⚠️  Semantic cache eviction failed: {e}")
+
+_cache: ResponseCache | None = None
+_cache_lock = threading.Lock()
+
+def get_response_cache() -> ResponseCache | None:
+    """Returns the process-wide response cache, or None when it is disabled."""
+    global _cache
+    if not RESPONSE_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResponseCache()
+    return _cache
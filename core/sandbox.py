@@ -0,0 +1,199 @@
+# core/sandbox.py
+# Runs shell commands for the agent with a wall-clock timeout, CPU and memory rlimits and a
+# byte budget on captured output. The command gets its own process group, so a timeout
+# kills everything it spawned, and the child's resource usage is reported back.
+from __future__ import annotations
+import codecs
+import os
+import re
+import signal
+import subprocess
+import threading
+import time
+from typing import Any, Callable, Dict
+
+try:
+    import resource  # POSIX only
+except ImportError:
+    resource = None
+
+from .config import RUN_CODE_TIMEOUT, RUN_CODE_CPU_SECONDS, RUN_CODE_MEMORY_MB, RUN_CODE_MAX_OUTPUT_BYTES
+
+_POSIX = os.name == "posix"
+_READ_SIZE = 65536
+_ESCAPED_PIPE_GRACE = 5.0  # Seconds to wait for output pipes to close after the group is killed
+
+# How an allocation refused by RLIMIT_AS usually surfaces (Python, C/C++, the shell, Node)
+_MEMORY_ERROR_RE = re.compile(r"MemoryError|Cannot allocate memory|std::bad_alloc|out of memory|"
+                              r"Out of memory|memory exhausted|heap out of memory")
+
+def _limit_prefix(cpu_seconds: int, memory_mb: int) -> str:
+    """
+    Shell lines that apply the rlimits before the command runs. Done by the shell itself
+    rather than a preexec_fn, which isn't safe to use from a multithreaded process.
+    """
+    if resource is None:
+        return ""
+    def capped(which, value):
+        hard = resource.getrlimit(which)[1]  # An unprivileged shell can't raise the hard limit
+        return value if hard == resource.RLIM_INFINITY else min(value, hard)
+    lines = []
+    if cpu_seconds > 0:
+        # SIGXCPU at the soft limit, SIGKILL one second later if it is ignored
+        hard = capped(resource.RLIMIT_CPU, cpu_seconds + 1)
+        lines += [f"ulimit -S -t {min(cpu_seconds, hard)} || exit 126", f"ulimit -H -t {hard} || exit 126"]
+    if memory_mb > 0:
+        lines.append(f"ulimit -v {capped(resource.RLIMIT_AS, memory_mb * 1024 * 1024) // 1024} || exit 126")
+    lines.append("ulimit -c 0")
+    return "\n".join(lines) + "\n"
+
+class _Capture:
+    """Drains one pipe, keeping at most `max_bytes` and forwarding decoded chunks as they arrive."""
+    def __init__(self, pipe, name: str, max_bytes: int, on_output: Callable[[str, str], None] | None):
+        self.name = name
+        self.kept = bytearray()
+        self.total = 0
+        self._pipe = pipe
+        self._max_bytes = max_bytes
+        self._on_output = on_output
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self.thread = threading.Thread(target=self._drain, name=f"sandbox-{name}", daemon=True)
+        self.thread.start()
+
+    def _drain(self):
+        fd = self._pipe.fileno()
+        try:
+            while True:
+                chunk = os.read(fd, _READ_SIZE)
+                if not chunk:
+                    break
+                self.total += len(chunk)
+                room = self._max_bytes - len(self.kept)
+                if room > 0:
+                    # Keep reading past the budget so the child never blocks on a full pipe
+                    kept = chunk[:room]
+                    self.kept.extend(kept)
+                    if self._on_output:
+                        self._on_output(self.name, self._decoder.decode(kept))
+        except OSError:
+            pass
+        finally:
+            self._pipe.close()
+
+    @property
+    def truncated(self) -> bool:
+        return self.total > len(self.kept)
+
+    def text(self) -> str:
+        text = self.kept.decode("utf-8", errors="replace")
+        if self.truncated:
+            text += f"\n... [truncated {self.total - len(self.kept)} bytes]"
+        return text
+
+def _kill_group(proc: subprocess.Popen) -> bool:
+    """SIGKILLs the command's process group; False if nothing was left to kill."""
+    try:
+        if _POSIX:
+            os.killpg(proc.pid, signal.SIGKILL)
+        else:
+            proc.kill()
+        return True
+    except (ProcessLookupError, PermissionError, OSError):
+        return False
+
+def run_sandboxed(command: str, timeout: float | None = None, cpu_seconds: int | None = None,
+                  memory_mb: int | None = None, max_output_bytes: int | None = None,
+                  cwd: str | None = None,
+                  on_output: Callable[[str, str], None] | None = None) -> Dict[str, Any]:
+    """
+    Run `command` through the shell under the configured limits.
+    `on_output(stream, text)` is called with output as it is produced (within the byte budget).
+    """
+    timeout = RUN_CODE_TIMEOUT if timeout is None else timeout
+    cpu_seconds = RUN_CODE_CPU_SECONDS if cpu_seconds is None else cpu_seconds
+    memory_mb = RUN_CODE_MEMORY_MB if memory_mb is None else memory_mb
+    max_output_bytes = RUN_CODE_MAX_OUTPUT_BYTES if max_output_bytes is None else max_output_bytes
+
+    popen_kwargs: Dict[str, Any] = {}
+    if _POSIX:
+        popen_kwargs["start_new_session"] = True
+        command = _limit_prefix(cpu_seconds, memory_mb) + command
+
+    started = time.monotonic()
+    proc = subprocess.Popen(command, shell=True, cwd=cwd, stdin=subprocess.DEVNULL,
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE, **popen_kwargs)
+    stdout = _Capture(proc.stdout, "stdout", max_output_bytes, on_output)
+    stderr = _Capture(proc.stderr, "stderr", max_output_bytes, on_output)
+
+    # --- Wait (wait4 gives us the child's own rusage) ---
+    waited: Dict[str, Any] = {}
+    def _wait():
+        if hasattr(os, "wait4"):
+            _, status, usage = os.wait4(proc.pid, 0)
+            waited["returncode"] = os.waitstatus_to_exitcode(status)
+            waited["usage"] = usage
+        else:
+            waited["returncode"] = proc.wait()
+    waiter = threading.Thread(target=_wait, name="sandbox-wait", daemon=True)
+    waiter.start()
+    waiter.join(timeout if timeout and timeout > 0 else None)
+
+    timed_out = waiter.is_alive()
+    if timed_out:
+        print(f"⏱️ Command exceeded {timeout}s; killing its process group")
+        _kill_group(proc)
+    waiter.join()
+    proc.returncode = waited.get("returncode")
+    # Anything the command left running in the background (servers, `cmd &`) dies with it.
+    # The group is ours alone (start_new_session), and it stays reserved while members remain.
+    killed_background = not timed_out and _kill_group(proc)
+    for capture in (stdout, stderr):
+        # Only a process that escaped with setsid could still hold the pipes open
+        capture.thread.join(timeout=_ESCAPED_PIPE_GRACE)
+    wall_seconds = time.monotonic() - started
+
+    usage: Dict[str, Any] = {"wall_seconds": round(wall_seconds, 3)}
+    if "usage" in waited:
+        ru = waited["usage"]
+        usage.update({
+            "user_seconds": round(ru.ru_utime, 3),
+            "system_seconds": round(ru.ru_stime, 3),
+            # ru_maxrss is kilobytes on Linux, bytes on macOS
+            "max_rss_kb": ru.ru_maxrss // 1024 if os.uname().sysname == "Darwin" else ru.ru_maxrss,
+        })
+
+    limit = None
+    returncode = proc.returncode
+    if timed_out:
+        limit = "wall_time"
+    elif returncode is not None and cpu_seconds > 0 and \
+            usage.get("user_seconds", 0) + usage.get("system_seconds", 0) >= cpu_seconds:
+        # Killed by the rlimit directly (negative) or reported by the shell as 128 + signal
+        cpu_signals = {getattr(signal, "SIGXCPU", -1), signal.SIGKILL}
+        if -returncode in cpu_signals or returncode - 128 in cpu_signals:
+            limit = "cpu_time"
+    if limit is None and returncode and memory_mb > 0:
+        # RLIMIT_AS makes allocations fail rather than killing the process
+        near_limit = usage.get("max_rss_kb", 0) >= memory_mb * 1024 * 0.9
+        if near_limit or _MEMORY_ERROR_RE.search(stderr.text()):
+            limit = "memory"
+
+    result = {
+        "status": "error" if limit else "success",
+        "output": stdout.text(),
+        "error": stderr.text() or None,
+        "exit_code": returncode,
+        "timed_out": timed_out,
+        "limit": limit,
+        "truncated": {"stdout": stdout.truncated, "stderr": stderr.truncated},
+        "output_bytes": {"stdout": stdout.total, "stderr": stderr.total},
+        "usage": usage,
+        "killed_background": killed_background,
+    }
+    if limit == "wall_time":
+        result["message"] = f"Command timed out after {timeout}s and was killed"
+    elif limit == "cpu_time":
+        result["message"] = f"Command exceeded its CPU limit of {cpu_seconds}s"
+    elif limit == "memory":
+        result["message"] = f"Command exceeded its memory limit of {memory_mb} MB"
+    return result
@@ -0,0 +1,139 @@
+# core/search.py
+# Web search for the agent: a TTL cache in front of a pluggable backend (DuckDuckGo by
+# default, or any HTTP endpoint returning JSON), with a batch API that runs queries concurrently.
+from __future__ import annotations
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Tuple
+
+from .config import (
+    WEB_SEARCH_BACKEND, WEB_SEARCH_URL, WEB_SEARCH_CACHE_TTL,
+    WEB_SEARCH_CACHE_SIZE, WEB_SEARCH_MAX_CONCURRENT, LLM_TIMEOUT,
+)
+
+def normalize_search_query(query: str) -> str:
+    """Collapses whitespace and case so trivially different queries share a cache entry."""
+    return " ".join(query.split()).lower()
+
+# --- Backends ---
+
+class DDGSBackend:
+    """DuckDuckGo via the `ddgs` package; each thread keeps its own session instead of opening one per query."""
+    def __init__(self):
+        self._local = threading.local()
+
+    def search(self, query: str, max_results: int) -> List[Dict[str, Any]]:
+        ddgs = getattr(self._local, "ddgs", None)
+        if ddgs is None:
+            from ddgs import DDGS
+            ddgs = self._local.ddgs = DDGS()
+        return [{"title": r.get("title"), "href": r.get("href"), "body": r.get("body")}
+                for r in ddgs.text(query, max_results=max_results)]
+
+class HTTPSearchBackend:
+    """GETs `{url}?q=...&max_results=...` and expects `{"results": [{"title", "href", "body"}, ...]}`."""
+    def __init__(self, url: str, timeout: float = LLM_TIMEOUT):
+        import httpx
+        self.url = url
+        self._client = httpx.Client(timeout=timeout)
+
+    def search(self, query: str, max_results: int) -> List[Dict[str, Any]]:
+        response = self._client.get(self.url, params={"q": query, "max_results": max_results})
+        response.raise_for_status()
+        return response.json().get("results", [])[:max_results]
+
+def make_backend(name: str = WEB_SEARCH_BACKEND, url: str | None = WEB_SEARCH_URL):
+    if name == "ddgs":
+        return DDGSBackend()
+    if name == "http":
+        if not url:
+            raise ValueError("WEB_SEARCH_URL must be set for the http search backend")
+        return HTTPSearchBackend(url)
+    raise ValueError(f"unknown web search backend: {name}")
+
+# --- Cached Searcher ---
+
+class WebSearcher:
+    """Caches results per (normalized query, max_results) for `ttl` seconds; failures are never cached."""
+    def __init__(self, backend, ttl: float = WEB_SEARCH_CACHE_TTL, max_entries: int = WEB_SEARCH_CACHE_SIZE,
+                 max_workers: int = WEB_SEARCH_MAX_CONCURRENT):
+        self.backend = backend
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._cache: "OrderedDict[Tuple[str, int], Tuple[float, List[Dict[str, Any]]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="web-search")
+        self._stats = {"hits": 0, "misses": 0, "errors": 0}
+
+    def search(self, query: str, max_results: int = 3) -> Dict[str, Any]:
+        """One query; the result says whether it came from the cache and how long it took."""
+        started = time.perf_counter()
+        key = (normalize_search_query(query), max_results)
+        results = self._cached(key)
+        cached = results is not None
+        if not cached:
+            try:
+                results = self.backend.search(query, max_results)
+            except Exception as e:
+                with self._lock:
+                    self._stats["errors"] += 1
+                return {"query": query, "error": f"search_failed: {e}", "cached": False,
+                        "latency_ms": round((time.perf_counter() - started) * 1000, 1)}
+            self._store(key, results)
+        return {"query": query, "results": results, "cached": cached,
+                "latency_ms": round((time.perf_counter() - started) * 1000, 1)}
+
+    def search_many(self, queries: List[str], max_results: int = 3) -> List[Dict[str, Any]]:
+        """Runs the queries concurrently (duplicates only once) and returns results in input order."""
+        unique: Dict[Tuple[str, int], str] = {}
+        for query in queries:
+            unique.setdefault((normalize_search_query(query), max_results), query)
+        futures = {key: self._pool.submit(self.search, query, max_results) for key, query in unique.items()}
+        results = []
+        for query in queries:
+            result = futures[(normalize_search_query(query), max_results)].result()
+            results.append({**result, "query": query})
+        return results
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._stats, "entries": len(self._cache)}
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def _cached(self, key: Tuple[str, int]) -> List[Dict[str, Any]] | None:
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None and time.monotonic() - entry[0] < self.ttl:
+                self._cache.move_to_end(key)
+                self._stats["hits"] += 1
+                return entry[1]
+            if entry is not None:
+                del self._cache[key]
+            self._stats["misses"] += 1
+            return None
+
+    def _store(self, key: Tuple[str, int], results: List[Dict[str, Any]]):
+        if self.ttl <= 0 or self.max_entries <= 0:
+            return
+        with self._lock:
+            self._cache[key] = (time.monotonic(), results)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+_searcher: WebSearcher | None = None
+_searcher_lock = threading.Lock()
+
+def get_web_searcher() -> WebSearcher:
+    """Returns the process-wide searcher built from WEB_SEARCH_BACKEND."""
+    global _searcher
+    if _searcher is None:
+        with _searcher_lock:
+            if _searcher is None:
+                _searcher = WebSearcher(make_backend())
+    return _searcher
@@ -0,0 +1,125 @@
+# core/steps.py
+# Dependency-aware execution of plan steps: each step runs on a bounded thread pool as
+# soon as the steps it depends on have finished, so independent work overlaps.
+from __future__ import annotations
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Set
+
+def step_dependencies(step_num: int, step: Dict[str, Any]) -> Set[int]:
+    """
+    Step numbers (1-based) that must finish before `step_num` starts.
+    Steps without a usable "depends_on" run after the previous step, as plans always did.
+    """
+    deps = step.get("depends_on") if isinstance(step, dict) else None
+    if isinstance(deps, (int, str)) and not isinstance(deps, bool):
+        deps = [deps]
+    if not isinstance(deps, list):
+        return {step_num - 1} if step_num > 1 else set()
+    parsed = set()
+    for dep in deps:
+        try:
+            parsed.add(int(dep))
+        except (TypeError, ValueError):
+            # Can't tell what it meant; keep the step ordered rather than guess
+            return {step_num - 1} if step_num > 1 else set()
+    parsed.discard(step_num)
+    return parsed
+
+class StepScheduler:
+    """
+    Runs `run_step(step_num, step)` for each added step once its dependencies are done.
+    Steps may be added while earlier ones are already running; call close() when the plan is
+    complete, then results() waits for everything and returns the outputs in step order.
+    """
+    def __init__(self, run_step: Callable[[int, Dict[str, Any]], Any], max_workers: int,
+                 should_stop: Callable[[], bool] | None = None):
+        self._run_step = run_step
+        self._should_stop = should_stop or (lambda: False)
+        self._pool = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="plan-step")
+        self._cond = threading.Condition()
+        self._steps: Dict[int, Dict[str, Any]] = {}
+        self._waiting: Dict[int, Set[int]] = {}  # step -> dependencies not finished yet
+        self._done: Set[int] = set()
+        self._results: Dict[int, Any] = {}
+        self._skipped: Set[int] = set()
+        self._running = 0
+        self._closed = False
+
+    def add(self, step_num: int, step: Dict[str, Any]):
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("scheduler is closed")
+            self._steps[step_num] = step
+            waiting = step_dependencies(step_num, step) - self._done
+            if waiting:
+                self._waiting[step_num] = waiting
+            else:
+                self._start(step_num)
+
+    def close(self):
+        """No more steps are coming; drop dependencies on steps that never arrived."""
+        with self._cond:
+            self._closed = True
+            for step_num in sorted(self._waiting):
+                self._waiting[step_num] &= self._steps.keys()
+            self._start_ready()
+            self._cond.notify_all()
+
+    def results(self) -> List[Any]:
+        """Wait for all steps (closing the scheduler if needed) and return outputs ordered by step."""
+        if not self._closed:
+            self.close()
+        with self._cond:
+            while True:
+                if self._running == 0:
+                    if not self._waiting:
+                        break
+                    if self._should_stop():
+                        self._skipped.update(self._waiting)
+                        self._waiting.clear()
+                        break
+                    # Only cycles are left; run the earliest remaining step to break them
+                    step_num = min(self._waiting)
+                    del self._waiting[step_num]
+                    self._start(step_num)
+                    continue
+                self._cond.wait()
+        self._pool.shutdown(wait=True)
+        return [self._results[n] for n in sorted(self._results)]
+
+    @property
+    def skipped(self) -> List[int]:
+        """Steps never started because should_stop() turned true."""
+        with self._cond:
+            return sorted(self._skipped)
+
+    # --- Internals (called with the condition held) ---
+    def _start(self, step_num: int):
+        if self._should_stop():
+            self._skipped.add(step_num)
+            return
+        self._running += 1
+        self._pool.submit(self._execute, step_num, self._steps[step_num])
+
+    def _start_ready(self):
+        for step_num in sorted(n for n, deps in self._waiting.items() if not deps):
+            del self._waiting[step_num]
+            self._start(step_num)
+
+    def _execute(self, step_num: int, step: Dict[str, Any]):
+        try:
+            result = self._run_step(step_num, step)
+        except Exception:
+            traceback.print_exc()
+            result = None
+        with self._cond:
+            if result is not None:
+                self._results[step_num] = result
+            self._done.add(step_num)
+            self._running -= 1
+            for deps in self._waiting.values():
+                deps.discard(step_num)
+            self._start_ready()
+            self._cond.notify_all()
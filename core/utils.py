@@ -1,22 +1,188 @@
 # core/utils.py
 import json
 import re
-from typing import Any, Optional
+from typing import Any, Iterable, Iterator, List, Optional
+
+_JSON_START = re.compile(r"[\[{]")
+_MAX_JSON_CANDIDATES = 32  # Opening brackets tried before giving up on embedded JSON
+
+def _balanced_end(text: str, start: int) -> Optional[int]:
+    """Index just past the bracket closing the one at `start` (string-aware), or None."""
+    depth, in_string, escape = 0, False, False
+    for i in range(start, len(text)):
+        c = text[i]
+        if in_string:
+            if escape:
+                escape = False
+            elif c == "\\":
+                escape = True
+            elif c == '"':
+                in_string = False
+        elif c == '"':
+            in_string = True
+        elif c in "{[":
+            depth += 1
+        elif c in "}]":
+            depth -= 1
+            if depth == 0:
+                return i + 1
+    return None
 
 def extract_json_block(text: str) -> Optional[str]:
-    """Extracts the first JSON object or array from a string."""
-    match = re.search(r"(\{.*\}|\[.*\])", text, flags=re.S)
-    return match.group(1) if match else None
+    """Extracts the first balanced JSON object or array from a string in a single pass."""
+    match = _JSON_START.search(text)
+    if not match:
+        return None
+    end = _balanced_end(text, match.start())
+    return text[match.start():end] if end else None
 
 def safe_json_loads(text: str) -> Any:
     """Safely parses a JSON string, even if it's embedded in other text."""
     try:
         return json.loads(text)
     except json.JSONDecodeError:
-        block = extract_json_block(text)
-        if block:
+        pass
+    # Decode from each opening bracket in turn; raw_decode stops at the end of the value
+    decoder = json.JSONDecoder()
+    for attempt, match in enumerate(_JSON_START.finditer(text)):
+        if attempt >= _MAX_JSON_CANDIDATES:
+            break
+        try:
+            return decoder.raw_decode(text, match.start())[0]
+        except json.JSONDecodeError:
+            continue
+    block = extract_json_block(text)
+    if block:
+        return {"error": "json parse fail", "raw": block}
+    return {"error": "no json found", "raw": text}
+
+class JSONArrayStreamParser:
+    """
+    Incremental parser for a JSON array that arrives in pieces (e.g. a streamed LLM reply).
+    feed() returns each element as soon as its closing character has arrived; text around the
+    array (prose, ``` fences) is ignored and every character is scanned once. close() raises
+    ValueError if the stream ended before the array did or an element was not valid JSON.
+    """
+    def __init__(self):
+        self._buf = ""
+        self._pos = 0           # Next character of _buf to scan
+        self._state = "seek"    # seek -> between -> element -> ... -> done
+        self._array_start = 0   # Offset of the array's "[" in _buf (kept until the first element parses)
+        self._start = 0         # Offset of the current element in _buf
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self.count = 0
+        self.error: Optional[str] = None
+
+    @property
+    def done(self) -> bool:
+        return self._state == "done"
+
+    def feed(self, text: str) -> List[Any]:
+        """Consumes the next piece of the stream; returns the elements it completed."""
+        if self._state == "done" or self.error:
+            return []
+        self._buf += text
+        buf, i, items = self._buf, self._pos, []
+        while i < len(buf) and self._state != "done":
+            c = buf[i]
+            if self._state == "seek":
+                if c == "[":
+                    self._state, self._array_start = "between", i
+                i += 1
+                continue
+            if self._state == "between":
+                if c in " \t\r\n,":
+                    i += 1
+                    continue
+                if c == "]":
+                    self._state = "done"
+                    i += 1
+                    continue
+                self._state, self._start = "element", i
+                self._depth, self._in_string, self._escape = 0, False, False
+
+            # Inside an element: find where it ends
+            end = None
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if self._depth == 0:
+                        end = i + 1
+            elif c == '"':
+                self._in_string = True
+            elif c in "{[":
+                self._depth += 1
+            elif c in "}]":
+                if self._depth == 0:
+                    end = i  # "]" closing the array right after a bare scalar
+                else:
+                    self._depth -= 1
+                    if self._depth == 0:
+                        end = i + 1
+            elif c == "," and self._depth == 0:
+                end = i
+            if end is None:
+                i += 1
+                continue
+
             try:
-                return json.loads(block)
-            except json.JSONDecodeError:
-                return {"error": "json parse fail", "raw": block}
-        return {"error": "no json found", "raw": text}
\ No newline at end of file
+                item = json.loads(buf[self._start:end])
+            except json.JSONDecodeError as e:
+                if self.count == 0:
+                    # A "[" in leading prose rather than the array itself; look for the next one
+                    self._state = "seek"
+                    i = self._array_start + 1
+                    continue
+                self.error = f"element {self.count + 1} is not valid JSON: {e}"
+                break
+            items.append(item)
+            self.count += 1
+            self._state = "between"
+            i = end if end == i else i + 1
+
+        # Drop text that will never be looked at again
+        if self._state == "element":
+            cut = self._array_start if self.count == 0 else self._start
+        elif self._state == "between" and self.count == 0:
+            cut = self._array_start
+        else:
+            cut = i
+        self._buf = buf[cut:]
+        self._pos = i - cut
+        self._start -= cut
+        self._array_start -= cut
+        return items
+
+    def close(self):
+        """Call once the stream has ended; raises ValueError unless a whole array was parsed."""
+        if self.error:
+            raise ValueError(self.error)
+        if self._state == "seek":
+            raise ValueError("no JSON array found")
+        if self._state != "done":
+            raise ValueError(f"stream ended before the JSON array was complete ({self.count} element(s) parsed)")
+
+def iter_json_array(chunks: Iterable[str]) -> Iterator[Any]:
+    """Yields the elements of a streamed JSON array as they complete; raises ValueError if it ends malformed."""
+    parser = JSONArrayStreamParser()
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+        if parser.done or parser.error:
+            break
+    parser.close()
+
+def format_sse(event: str, payload: Any) -> str:
+    """Formats a payload as one Server-Sent Events message."""
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+def agent_event_to_sse(event: dict) -> str:
+    """Converts an agent stream event (delta/done) into the SSE wire format used by /api/chat/stream."""
+    if event["type"] == "delta":
+        return format_sse("delta", {"content": event["content"]})
+    return format_sse(event["type"], {"answer": event["final"], "log": event["log"]})
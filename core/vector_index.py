@@ -0,0 +1,270 @@
+# core/vector_index.py
+# A small vector store for agent memory: float16 embeddings in a memory-mapped file, an
+# append-only JSONL sidecar for ids/text/metadata, and brute-force or IVF top-k in NumPy.
+# One process writes; any number of worker processes can open the same directory
+# read-only and share the vectors through the OS page cache.
+#
+# Layout of `path`:
+#   meta.json      dim, committed row count, IVF state (rewritten atomically after each write)
+#   vectors.f16    (capacity, dim) float16, L2-normalized
+#   offsets.i64    byte offset of each row's line in entries.jsonl
+#   entries.jsonl  {"id", "text", "metadata"} per row
+#   ivf-<n>.npz    centroids plus rows grouped by list, built over the first n rows once the
+#                  index is large enough; meta.json names the current file, so swapping
+#                  meta publishes the lists and the row count together
+from __future__ import annotations
+import json
+import os
+import threading
+import uuid
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from .config import MEMORY_IVF_MIN_ENTRIES, MEMORY_IVF_NPROBE
+
+_INITIAL_CAPACITY = 1024
+_SCAN_CHUNK = 65536  # Rows converted to float32 at a time during a scan
+_IVF_REBUILD_FRACTION = 0.25  # Rebuild once rows added after the last build exceed this share
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+def _top_k(scores: np.ndarray, rows: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    if len(scores) > k:
+        keep = np.argpartition(-scores, k - 1)[:k]
+        scores, rows = scores[keep], rows[keep]
+    order = np.argsort(-scores)
+    return rows[order], scores[order]
+
+def _kmeans(sample: np.ndarray, nlist: int, iterations: int = 10, seed: int = 0) -> np.ndarray:
+    """Spherical k-means on normalized float32 rows; returns normalized centroids."""
+    rng = np.random.default_rng(seed)
+    centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+    for _ in range(iterations):
+        assign = np.argmax(sample @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, sample)
+        empty = np.bincount(assign, minlength=nlist) == 0
+        sums[empty] = sample[rng.choice(len(sample), int(empty.sum()))]  # Reseed empty lists
+        centroids = _normalize(sums)
+    return centroids
+
+class MmapVectorStore:
+    """
+    Drop-in for the parts of the Chroma vector store that agent memory uses
+    (add_texts / similarity_search), plus raw-vector methods for benchmarks.
+    Scores are cosine similarities.
+    """
+    def __init__(self, path: str, embedding=None, dim: int | None = None, read_only: bool = False,
+                 ivf_min_entries: int = MEMORY_IVF_MIN_ENTRIES, nprobe: int = MEMORY_IVF_NPROBE):
+        self.path = path
+        self.embedding = embedding
+        self.read_only = read_only
+        self.ivf_min_entries = ivf_min_entries
+        self.nprobe = nprobe
+        self._lock = threading.RLock()
+        self._meta_mtime = None
+        self._vectors = None
+        self._offsets = None
+        self._ivf = None
+        if not read_only:
+            os.makedirs(path, exist_ok=True)
+        self._meta = self._read_meta() or {"dim": dim, "count": 0, "capacity": 0, "ivf_count": 0}
+        if self._meta["dim"]:
+            self._open_arrays()
+
+    # --- Files ---
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _read_meta(self) -> Dict[str, Any] | None:
+        try:
+            self._meta_mtime = os.stat(self._file("meta.json")).st_mtime_ns
+            with open(self._file("meta.json"), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _write_meta(self):
+        tmp = self._file("meta.json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._meta, f)
+        os.replace(tmp, self._file("meta.json"))
+
+    def _open_arrays(self):
+        dim, capacity = self._meta["dim"], self._meta["capacity"]
+        if capacity == 0:
+            self._vectors, self._offsets = None, None
+        else:
+            mode = "r" if self.read_only else "r+"
+            self._vectors = np.memmap(self._file("vectors.f16"), dtype=np.float16, mode=mode, shape=(capacity, dim))
+            self._offsets = np.memmap(self._file("offsets.i64"), dtype=np.int64, mode=mode, shape=(capacity,))
+        self._ivf = None
+        if self._meta.get("ivf_count"):
+            with np.load(self._file(self._meta.get("ivf_file", "ivf.npz"))) as data:
+                self._ivf = {name: data[name] for name in data.files}
+
+    def _refresh(self):
+        """Readers pick up rows committed by the writer since they last looked."""
+        if not self.read_only:
+            return
+        try:
+            mtime = os.stat(self._file("meta.json")).st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime == self._meta_mtime:
+            return
+        for _ in range(3):
+            self._meta = self._read_meta()
+            try:
+                self._open_arrays()
+                return
+            except FileNotFoundError:
+                continue  # The writer published a newer IVF file and removed ours; re-read meta
+        raise RuntimeError(f"vector store at {self.path} keeps changing underneath the reader")
+
+    def _ensure_capacity(self, needed: int):
+        capacity = self._meta["capacity"]
+        if needed <= capacity:
+            return
+        new_capacity = max(_INITIAL_CAPACITY, capacity)
+        while new_capacity < needed:
+            new_capacity *= 2
+        self._vectors, self._offsets = None, None  # Release the old mappings before growing the files
+        for name, row_bytes in (("vectors.f16", 2 * self._meta["dim"]), ("offsets.i64", 8)):
+            with open(self._file(name), "ab") as f:
+                f.truncate(new_capacity * row_bytes)
+        self._meta["capacity"] = new_capacity
+        self._open_arrays()
+
+    # --- Writes ---
+    def add_vectors(self, vectors, texts: List[str], metadatas: List[Dict[str, Any]] | None = None,
+                    ids: List[str] | None = None) -> List[str]:
+        if self.read_only:
+            raise RuntimeError("vector store is open read-only")
+        vectors = _normalize(vectors)
+        if vectors.ndim != 2 or len(vectors) != len(texts):
+            raise ValueError("need one vector per text")
+        ids = ids or [uuid.uuid4().hex for _ in texts]
+        metadatas = metadatas or [{} for _ in texts]
+        with self._lock:
+            if not self._meta["dim"]:
+                self._meta["dim"] = vectors.shape[1]
+            elif vectors.shape[1] != self._meta["dim"]:
+                raise ValueError(f"expected {self._meta['dim']}-dimensional vectors, got {vectors.shape[1]}")
+            start = self._meta["count"]
+            end = start + len(texts)
+            self._ensure_capacity(end)
+            self._vectors[start:end] = vectors.astype(np.float16)
+            with open(self._file("entries.jsonl"), "ab") as f:
+                offset = f.tell()
+                for row, (id_, text, metadata) in enumerate(zip(ids, texts, metadatas)):
+                    line = json.dumps({"id": id_, "text": text, "metadata": metadata}).encode() + b"\n"
+                    self._offsets[start + row] = offset
+                    f.write(line)
+                    offset += len(line)
+            self._vectors.flush()
+            self._offsets.flush()
+            # Rows become visible to readers only once meta.json says so
+            self._meta["count"] = end
+            replaced_ivf = self._maybe_build_ivf()
+            self._write_meta()
+            if replaced_ivf:
+                try:
+                    os.remove(self._file(replaced_ivf))
+                except FileNotFoundError:
+                    pass
+        return ids
+
+    def add_texts(self, texts: List[str], metadatas: List[Dict[str, Any]] | None = None, **kwargs) -> List[str]:
+        texts = list(texts)
+        if not texts:
+            return []
+        return self.add_vectors(self.embedding.embed_documents(texts), texts, metadatas, kwargs.get("ids"))
+
+    def _maybe_build_ivf(self) -> str | None:
+        """Builds new IVF lists when due; returns the file they replace (delete it once meta is written)."""
+        count, built = self._meta["count"], self._meta.get("ivf_count", 0)
+        if count < self.ivf_min_entries or (built and count - built <= built * _IVF_REBUILD_FRACTION):
+            return None
+        nlist = max(2, int(np.sqrt(count)))
+        print(f"🗂️ Building IVF index for {count} memory vectors ({nlist} lists)...")
+        rng = np.random.default_rng(0)
+        sample_rows = np.sort(rng.choice(count, min(count, nlist * 64), replace=False))
+        centroids = _kmeans(self._vectors[sample_rows].astype(np.float32), nlist)
+        assign = np.empty(count, dtype=np.int32)
+        for start in range(0, count, _SCAN_CHUNK):
+            end = min(count, start + _SCAN_CHUNK)
+            assign[start:end] = np.argmax(self._vectors[start:end].astype(np.float32) @ centroids.T, axis=1)
+        order = np.argsort(assign, kind="stable").astype(np.int64)
+        bounds = np.searchsorted(assign[order], np.arange(nlist + 1)).astype(np.int64)
+        name = f"ivf-{count}.npz"
+        tmp = self._file(f"ivf-{count}.tmp.npz")
+        np.savez(tmp, centroids=centroids, order=order, bounds=bounds)
+        os.replace(tmp, self._file(name))
+        # Readers keep using the previous file until meta.json names this one
+        replaced = self._meta.get("ivf_file", "ivf.npz") if built else None
+        self._ivf = {"centroids": centroids, "order": order, "bounds": bounds}
+        self._meta["ivf_count"] = count
+        self._meta["ivf_file"] = name
+        return replaced if replaced != name else None
+
+    # --- Reads ---
+    def __len__(self) -> int:
+        self._refresh()
+        return self._meta["count"]
+
+    def search_vectors(self, query, k: int = 4) -> List[Tuple[int, float]]:
+        """Top-k (row, cosine score) for one query vector."""
+        with self._lock:
+            self._refresh()
+            count = self._meta["count"]
+            if count == 0 or k <= 0:
+                return []
+            q = _normalize(query).reshape(-1)
+            vectors, ivf = self._vectors, self._ivf
+            built = self._meta.get("ivf_count", 0) if ivf is not None else 0
+
+        candidates: List[Tuple[np.ndarray, np.ndarray]] = []
+        if built:
+            # Probe the nearest lists, then scan rows added since the last build
+            probes = np.argsort(-(ivf["centroids"] @ q))[:self.nprobe]
+            rows = np.concatenate([ivf["order"][ivf["bounds"][p]:ivf["bounds"][p + 1]] for p in probes])
+            rows.sort()  # Sequential access into the mapped file
+            if len(rows):
+                candidates.append(_top_k(vectors[rows].astype(np.float32) @ q, rows, k))
+            scan_from = built
+        else:
+            scan_from = 0
+        for start in range(scan_from, count, _SCAN_CHUNK):
+            end = min(count, start + _SCAN_CHUNK)
+            scores = vectors[start:end].astype(np.float32) @ q
+            candidates.append(_top_k(scores, np.arange(start, end), k))
+        rows = np.concatenate([c[0] for c in candidates])
+        scores = np.concatenate([c[1] for c in candidates])
+        rows, scores = _top_k(scores, rows, k)
+        return list(zip(rows.tolist(), scores.tolist()))
+
+    def get_entries(self, rows: List[int]) -> List[Dict[str, Any]]:
+        # Under the lock: growing the files briefly drops the offsets mapping
+        with self._lock:
+            offsets = [int(self._offsets[row]) for row in rows]
+        with open(self._file("entries.jsonl"), "rb") as f:
+            entries = []
+            for offset in offsets:
+                f.seek(offset)
+                entries.append(json.loads(f.readline()))
+        return entries
+
+    def similarity_search_with_score(self, query: str, k: int = 4) -> List[Tuple[Any, float]]:
+        from langchain_core.documents import Document
+        hits = self.search_vectors(self.embedding.embed_query(query), k)
+        entries = self.get_entries([row for row, _ in hits])
+        return [(Document(page_content=e["text"], metadata={**e["metadata"], "id": e["id"]}), score)
+                for e, (_, score) in zip(entries, hits)]
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs) -> List[Any]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k)]
@@ -1,10 +1,14 @@
 import os
-import time
+import signal
 import threading
 from supabase import create_client, Client
 from dotenv import load_dotenv
 from agent import run_agent_once # Main agent
-from coding import _coding_llm # Cerebras model for rejections
+from coding import get_coding_llm # Cerebras model for rejections
+from core.config import WORKER_MAX_CONCURRENT, WORKER_METRICS_INTERVAL, HISTORY_CACHE_MAX_CONVERSATIONS, HISTORY_CACHE_MAX_CHARS
+from core.dispatch import PriorityTaskExecutor
+from core.cancel import CancelRegistry
+from core.history import ConversationHistoryCache
 
 load_dotenv()
 
@@ -20,34 +24,58 @@ if not url or not key:
 supabase: Client = create_client(url, key)
 print("Supabase client initialized.")
 
+# --- Worker Pool ---
+# A fixed number of proposals run at once (protecting the LLM rate limit); approved
+# proposals jump ahead of rejection analyses, and tasks for one conversation run in order.
+PRIORITY_APPROVED = 0
+PRIORITY_REJECTED = 1
+
+executor = PriorityTaskExecutor(WORKER_MAX_CONCURRENT, name="proposal")
+
+# One cancel token per queued/running proposal; an 'interrupted' status update cancels it
+cancel_registry = CancelRegistry()
+
+# --- Conversation History Cache ---
+
+def fetch_messages(conversation_id, after_created_at=None):
+    """Fetches a conversation's messages, optionally only those newer than `after_created_at`."""
+    query = supabase.table('messages').select('id, conversation_id, content, created_at').eq('conversation_id', conversation_id)
+    if after_created_at is not None:
+        query = query.gt('created_at', after_created_at)
+    return query.order('created_at').execute().data
+
+history_cache = ConversationHistoryCache(fetch_messages, HISTORY_CACHE_MAX_CONVERSATIONS, HISTORY_CACHE_MAX_CHARS)
+
 # --- Worker Logic ---
 
 def process_proposal(proposal_id, prompt, conversation_id):
     """
-    Runs the agent in a separate thread to avoid blocking the Realtime listener.
+    Runs the agent on the worker pool to avoid blocking the Realtime listener.
     """
-    print(f"\n[WORKER] ✅ Thread started for proposal '{proposal_id}' in conversation '{conversation_id}'.")
+    print(f"\n[WORKER] ✅ Started proposal '{proposal_id}' in conversation '{conversation_id}'.")
+    cancel_token = cancel_registry.register(proposal_id)
+    if cancel_token.cancelled:
+        print(f"[WORKER] 🛑 Task '{proposal_id}' was interrupted before it started. Skipping.")
+        cancel_registry.discard(proposal_id)
+        return
     
     try:
         # --- Fetch Conversation History ---
-        history = []
-        if conversation_id:
-            print(f"Fetching history for conversation {conversation_id}...")
-            # Fetch messages from the team chat for context
-            messages_res = supabase.table('messages').select('sender_id, content').eq('conversation_id', conversation_id).order('created_at').execute()
-            
-            # Format history for the agent
-            for msg in messages_res.data:
-                # You might want to map sender_id to a role like 'user' or 'assistant' if needed
-                history.append({"role": "user", "content": msg['content']})
+        # Served from the in-process cache; only messages newer than the last one seen hit the database
+        history = history_cache.get(conversation_id) if conversation_id else []
 
         # Run the agent with the prompt from the proposal
         print(f"[WORKER] 🧠 Running agent with prompt: '{prompt}' and {len(history)} history messages.")
-        result = run_agent_once(prompt, history)
+        result = run_agent_once(prompt, history, cancel_token=cancel_token, conversation_id=conversation_id)
         final_answer = result.get("final", "Agent finished but no answer was provided.")
+
+        if result.get("cancelled"):
+            # Generation was aborted mid-stream; the status is already 'interrupted'
+            print(f"[WORKER] 🛑 Task '{proposal_id}' was interrupted by the user. Generation stopped early.")
+            return
         
         # --- Interruption Check ---
-        # After the agent finishes, check if the task was interrupted while it was running.
+        # Fallback for interrupts whose realtime event was missed while the agent ran.
         current_proposal_status = supabase.table('proposals').select('status').eq('id', proposal_id).single().execute().data.get('status')
         
         if current_proposal_status == 'interrupted':
@@ -65,17 +93,19 @@ def process_proposal(proposal_id, prompt, conversation_id):
         print(f"[WORKER] ❌ Error processing proposal {proposal_id}: {e}")
         # Optionally update the proposal with an error message
         supabase.table('proposals').update({'agent_analysis': f"An error occurred: {e}", 'status': 'error'}).eq('id', proposal_id).execute()
+    finally:
+        cancel_registry.discard(proposal_id)
 
 def process_rejection(proposal_id, prompt):
     """
     Handles fully rejected proposals using the Cerebras model.
     """
-    print(f"\n[WORKER] ⚠️ Thread started for REJECTED proposal '{proposal_id}'. Running Cerebras model with prompt: '{prompt}'")
+    print(f"\n[WORKER] ⚠️ Started REJECTED proposal '{proposal_id}'. Running Cerebras model with prompt: '{prompt}'")
     
     try:
         # Use the specialized Cerebras LLM for this task
         rejection_prompt = f"The following task was rejected by the team. Please analyze why it might have been rejected and suggest an alternative approach or explanation.\n\nRejected Task: \"{prompt}\""
-        result = _coding_llm.invoke(rejection_prompt).content
+        result = get_coding_llm().invoke(rejection_prompt).content
         
         print(f"[WORKER] 🤖 Cerebras model finished. Updating proposal '{proposal_id}' with rejection analysis.")
         
@@ -106,20 +136,68 @@ def handle_proposal_update(payload):
 
         # Case 1: Task is approved, run the main agent
         if new_data.get('status') == 'approved' and old_data.get('status') != 'approved':
-            threading.Thread(target=process_proposal, args=(proposal_id, prompt, conversation_id)).start()
+            # Register now so an interrupt that arrives while the task is still queued is not lost
+            cancel_registry.register(proposal_id)
+            executor.submit(process_proposal, proposal_id, prompt, conversation_id, priority=PRIORITY_APPROVED, key=conversation_id)
 
         # Case 2: Task is fully rejected, run the Cerebras model
         elif new_data.get('status') == 'rejected' and old_data.get('status') != 'rejected':
-            threading.Thread(target=process_rejection, args=(proposal_id, prompt)).start()
+            executor.submit(process_rejection, proposal_id, prompt, priority=PRIORITY_REJECTED, key=conversation_id)
+
+        # Case 3: Task was interrupted, stop it wherever it is
+        elif new_data.get('status') == 'interrupted' and old_data.get('status') != 'interrupted':
+            if cancel_registry.cancel(proposal_id, "interrupted by user"):
+                print(f"[WORKER] 🛑 Cancel signal delivered to proposal '{proposal_id}'.")
+
+def handle_message_insert(payload):
+    """Keeps cached conversation history current as team-chat messages are inserted."""
+    history_cache.append(payload['new'])
+
+def handle_subscription_state(status, error=None):
+    # Inserts may have been missed while the feed was down; re-sync cached conversations lazily
+    if status != 'SUBSCRIBED':
+        print(f"[REALTIME] Subscription state changed to {status}: {error or ''}")
+        history_cache.mark_stale()
 
 # --- Realtime Subscription ---
 
 print("Subscribing to proposal updates...")
 channel = supabase.channel('proposals-db-changes')
-channel.on('postgres_changes', event='*', schema='public', table='proposals', callback=handle_proposal_update).subscribe()
+channel.on('postgres_changes', event='*', schema='public', table='proposals', callback=handle_proposal_update)
+channel.on('postgres_changes', event='INSERT', schema='public', table='messages', callback=handle_message_insert)
+channel.subscribe(handle_subscription_state)
 
 print("Worker is now listening for changes. Press Ctrl+C to exit.")
 
-# Keep the script running to listen for events
-while True:
-    time.sleep(1)
\ No newline at end of file
+# --- Graceful Shutdown ---
+
+stop_event = threading.Event()
+
+def request_shutdown(signum, frame):
+    if stop_event.is_set():
+        print("\n[WORKER] Forced exit.")
+        os._exit(1)
+    print("\n[WORKER] Shutting down: finishing queued proposals (press Ctrl+C again to force)...")
+    stop_event.set()
+
+signal.signal(signal.SIGINT, request_shutdown)
+signal.signal(signal.SIGTERM, request_shutdown)
+
+# Report queue depth while waiting for a shutdown signal
+last_stats = None
+while not stop_event.wait(WORKER_METRICS_INTERVAL):
+    stats = executor.stats()
+    if stats != last_stats:
+        cache_stats = history_cache.stats()
+        print(f"[METRICS] queued={stats['queued']} running={stats['running']} "
+              f"completed={stats['completed']} failed={stats['failed']} "
+              f"history_cache={cache_stats['conversations']} convs/{cache_stats['chars']} chars "
+              f"hits={cache_stats['hits']} misses={cache_stats['misses']}")
+        last_stats = stats
+
+try:
+    channel.unsubscribe()
+except Exception as e:
+    print(f"[WORKER] Could not unsubscribe cleanly: {e}")
+executor.shutdown(wait=True)
+print("[WORKER] Stopped.")
@@ -33,18 +33,116 @@ export const postChatMessage = (message, history) => {
 };
 
 /**
- * Uploads a file to the backend for ingestion.
+ * Sends a chat message and streams the agent's answer as it is generated.
+ * @param {string} message - The user's message.
+ * @param {Array<Array<string>>} history - The conversation history.
+ * @param {function(string): void} onDelta - Called with each chunk of answer text.
+ * @returns {Promise<object>} - The agent's full response and log once the stream ends.
+ */
+export const streamChatMessage = async (message, history, onDelta) => {
+    const response = await fetch(`${API_BASE_URL}/chat/stream`, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({ message, history }),
+    });
+    if (!response.ok) {
+        const errorData = await response.json().catch(() => ({ error: 'Network response was not ok' }));
+        throw new Error(errorData.error || `HTTP error! status: ${response.status}`);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let result = null;
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        // SSE events are separated by a blank line
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const rawEvent = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+
+            let eventType = 'message';
+            let data = '';
+            for (const line of rawEvent.split('\n')) {
+                if (line.startsWith('event: ')) eventType = line.slice(7);
+                else if (line.startsWith('data: ')) data += line.slice(6);
+            }
+            if (!data) continue;
+
+            const payload = JSON.parse(data);
+            if (eventType === 'delta') {
+                onDelta?.(payload.content);
+            } else if (eventType === 'done') {
+                result = payload;
+            }
+        }
+    }
+
+    if (!result) throw new Error('Stream ended before the agent finished.');
+    return result;
+};
+
+/**
+ * Fetches the state of a background ingestion job.
+ * @param {string} jobId - The job ID returned by the upload endpoint.
+ * @returns {Promise<object>} - The job's state, chunk counts and timing.
+ */
+export const getUploadStatus = (jobId) => {
+    return fetchJson(`${API_BASE_URL}/upload/${jobId}`);
+};
+
+/**
+ * Uploads a file to the backend and waits for its ingestion job to finish.
  * @param {File} file - The file to upload.
+ * @param {function(object): void} [onProgress] - Called with the job state on every poll.
  * @returns {Promise<object>} - The status of the upload.
  */
-export const uploadFile = (file) => {
+export const uploadFile = async (file, onProgress) => {
     const formData = new FormData();
     formData.append('file', file);
 
-    return fetchJson(`${API_BASE_URL}/upload`, {
+    const { job_id: jobId, filename } = await fetchJson(`${API_BASE_URL}/upload`, {
         method: 'POST',
         body: formData,
     });
+
+    while (true) {
+        const job = await getUploadStatus(jobId);
+        onProgress?.(job);
+        if (job.state === 'succeeded') {
+            return { ...job, status: `File '${filename}' ingested successfully!` };
+        }
+        if (job.state === 'failed') {
+            throw new Error(job.error || 'Ingestion failed');
+        }
+        await new Promise((resolve) => setTimeout(resolve, 1000));
+    }
+};
+
+/**
+ * Lists the files in the knowledge base.
+ * @returns {Promise<object>} - `{ sources: [{ source, chunks, mtime, partitioned }] }`.
+ */
+export const listSources = () => {
+    return fetchJson(`${API_BASE_URL}/sources`);
+};
+
+/**
+ * Removes an uploaded file's chunks from the knowledge base.
+ * @param {string} filename - The file name returned by uploadFile.
+ * @returns {Promise<object>} - The number of chunks deleted.
+ */
+export const deleteSource = (filename) => {
+    return fetchJson(`${API_BASE_URL}/sources/${encodeURIComponent(filename)}`, {
+        method: 'DELETE',
+    });
 };
 
 /**
@@ -1,37 +1,44 @@
 # main.py
 import os
 import click
-from langchain_chroma import Chroma
 
 # --- Core Imports ---
 # By importing config first, we ensure all environment variables and constants are loaded.
+# Models and vector stores (including agent memory) are created lazily on first use, and
+# each command imports only what it needs, so e.g. `chat` never loads the web server or torch.
 import core.config
 
-# Now, we can safely import other components that might use the config.
-from app import app
-from agent import run_agent_once
-
 @click.group()
 def cli():
     """AI Agent Platform CLI"""
-    # Initialize the memory vector store and assign it to the global variable in the core config.
-    print("🧠 Initializing agent memory vector store...")
-    core.config._vectorstore = Chroma(
-        collection_name=core.config.MEM_COLLECTION,
-        embedding_function=core.config._embedding_fn,
-        persist_directory=core.config.PERSIST_DIR
-    )
-    print("✅ Agent memory loaded.")
 
 @cli.command()
-def serve():
-    """Starts the Flask web server."""
-    app.run(host='0.0.0.0', port=5000, debug=app.config['DEBUG'])
+@click.option('--async', 'use_async', is_flag=True, help="Serve the asyncio (ASGI) app with Hypercorn instead of Flask's dev server.")
+@click.option('--host', default='0.0.0.0', show_default=True)
+@click.option('--port', default=5000, show_default=True, type=int)
+def serve(use_async, host, port):
+    """Starts the web server."""
+    if not use_async:
+        from app import app
+        app.run(host=host, port=port, debug=app.config['DEBUG'])
+        return
+
+    import asyncio
+    from hypercorn.asyncio import serve as hypercorn_serve
+    from hypercorn.config import Config
+    from app_async import app as async_app
+
+    config = Config()
+    config.bind = [f"{host}:{port}"]
+    print(f"🚀 Serving async API on http://{host}:{port}")
+    asyncio.run(hypercorn_serve(async_app, config))
 
 @cli.command()
 @click.argument('user_input', required=False)
 def chat(user_input):
     """Starts an interactive chat session with the agent."""
+    from agent import run_agent_once
+
     history = []
     if not user_input:
         user_input = click.prompt("User")
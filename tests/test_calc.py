@@ -0,0 +1,47 @@
+# tests/test_calc.py
+# The vectorized batch path must agree with the scalar evaluator, including where float64
+# would silently round an integer intermediate.
+import pytest
+
+from core import calc
+
+needs_numpy = pytest.mark.skipif(calc.np is None, reason="NumPy not installed")
+
+def _batch_matches_scalar(expressions):
+    for expression, result in zip(expressions, calc.evaluate_batch(expressions)):
+        expected = calc.evaluate(expression)
+        assert result == {"ok": True, "result": expected}, expression
+        assert type(result["result"]) is type(expected), expression
+
+@needs_numpy
+def test_batch_large_intermediate_before_division():
+    _batch_matches_scalar(["(2**53+1-2**53)/1"] * 16)
+
+@needs_numpy
+def test_batch_large_intermediate_with_offsets():
+    _batch_matches_scalar([f"(2**53+{i}-2**53)/1" for i in range(16)])
+
+@needs_numpy
+def test_batch_large_intermediate_with_float_constant():
+    _batch_matches_scalar([f"(2**53+{i}-2**53)*1.0" for i in range(16)])
+
+@needs_numpy
+def test_batch_large_integer_result():
+    _batch_matches_scalar([f"2**53+{i}" for i in range(16)])
+
+@needs_numpy
+def test_batch_negative_power_is_float():
+    _batch_matches_scalar(["2**-1*4"] * 16)
+    _batch_matches_scalar([f"2**({i}-8)*4" for i in range(16)])
+
+@needs_numpy
+def test_batch_small_values_stay_vectorized():
+    expressions = [f"({i}+1)*3/2 - 0.5" for i in range(32)]
+    _batch_matches_scalar(expressions)
+    _batch_matches_scalar([f"{i}*{i}-7" for i in range(32)])
+
+def test_batch_reports_errors_per_expression():
+    results = calc.evaluate_batch(["1/0", "9**9**9**9", "2+2"])
+    assert results[0] == {"ok": False, "error": "division by zero"}
+    assert not results[1]["ok"]
+    assert results[2] == {"ok": True, "result": 4}
@@ -0,0 +1,80 @@
+# tests/test_history.py
+# ConversationHistoryCache must not lose realtime inserts that arrive out of order or
+# while a conversation's first fetch is still running, nor serve a partial history
+# after an eviction during an incremental fetch.
+import threading
+
+from core.history import ConversationHistoryCache
+
+def _row(id_, created_at, content=None, conversation_id="c"):
+    return {"id": id_, "conversation_id": conversation_id, "content": content or f"m{id_}", "created_at": created_at}
+
+class _FakeDB:
+    def __init__(self, rows=()):
+        self.rows = list(rows)
+        self.calls = []
+        self.hold_first = None
+        self.hold_call = 1  # Which fetch (1-based) waits on hold_first
+
+    def fetch(self, conversation_id, after):
+        rows = sorted((r for r in self.rows if r["conversation_id"] == conversation_id
+                       and (after is None or r["created_at"] > after)), key=lambda r: r["created_at"])
+        self.calls.append(after)
+        if self.hold_first is not None and len(self.calls) == self.hold_call:
+            self.hold_first.wait(2.0)
+        return rows
+
+def _contents(messages):
+    return [m["content"] for m in messages]
+
+def test_out_of_order_insert_is_kept_and_triggers_full_reread():
+    db = _FakeDB([_row(1, "2024-01-01T00:00:01")])
+    cache = ConversationHistoryCache(db.fetch)
+    cache.get("c")
+    newer, late = _row(2, "2024-01-01T00:00:03"), _row(3, "2024-01-01T00:00:02")
+    db.rows += [newer, late]
+    cache.append(newer)
+    cache.append(late)
+    assert _contents(cache.get("c")) == ["m1", "m3", "m2"]
+    assert db.calls[-1] is None  # Re-read from the start, not after last_seen
+    cache.get("c")
+    assert cache.stats()["hits"] == 1
+
+def test_insert_during_initial_fetch_invalidates_entry():
+    db = _FakeDB([_row(1, "2024-01-01T00:00:01")])
+    db.hold_first = threading.Event()
+    cache = ConversationHistoryCache(db.fetch)
+    first = []
+    worker = threading.Thread(target=lambda: first.append(cache.get("c")))
+    worker.start()
+    while not db.calls:
+        pass
+    # The insert lands after the first fetch read the table but before it returned
+    inserted = _row(2, "2024-01-01T00:00:02")
+    db.rows.append(inserted)
+    cache.append(inserted)
+    db.hold_first.set()
+    worker.join()
+    assert _contents(first[0]) == ["m1"]
+    assert _contents(cache.get("c")) == ["m1", "m2"]
+
+def test_eviction_during_incremental_fetch_does_not_truncate_history():
+    db = _FakeDB([_row(1, "2024-01-01T00:00:01"), _row(2, "2024-01-01T00:00:02")])
+    cache = ConversationHistoryCache(db.fetch, max_conversations=1)
+    cache.get("c")
+    cache.mark_stale()
+    db.rows.append(_row(3, "2024-01-01T00:00:03"))
+    db.hold_first = threading.Event()
+    db.hold_call = 2  # The incremental fetch for "c"
+    result = []
+    worker = threading.Thread(target=lambda: result.append(cache.get("c")))
+    worker.start()
+    while len(db.calls) < 2:
+        pass
+    # Another conversation evicts "c" while its incremental fetch is held
+    db.rows.append(_row(10, "2024-01-01T00:00:01", conversation_id="d"))
+    cache.get("d")
+    db.hold_first.set()
+    worker.join()
+    assert _contents(result[0]) == ["m1", "m2", "m3"]
+    assert _contents(cache.get("c")) == ["m1", "m2", "m3"]
@@ -0,0 +1,60 @@
+# tests/test_keyword_index.py
+# Tokenization and BM25 lookups in the SQLite keyword index, including non-ASCII text.
+import pytest
+
+from core.keyword_index import KeywordIndex, is_identifier, tokenize
+
+@pytest.fixture
+def index(tmp_path):
+    return KeywordIndex(str(tmp_path / "keywords.db"))
+
+def test_tokenize_keeps_accented_and_non_latin_words():
+    assert tokenize("Café.py") == ["café.py", "café", "py"]
+    assert tokenize("Résumé naïve") == ["résumé", "naïve"]
+    assert tokenize("Übersicht über Straße") == ["übersicht", "über", "strasse"]
+    assert tokenize("数据 отчёт-2024") == ["数据", "отчёт-2024", "отчёт", "2024"]
+
+def test_is_identifier():
+    assert is_identifier("café.py")
+    assert is_identifier("sku123")
+    assert is_identifier("e-4012")
+    assert not is_identifier("2024")
+    assert not is_identifier("revenue")
+
+def test_exact_lookup_of_non_ascii_file_name(index):
+    index.add([
+        ("a", "docs/menu.txt", "The café.py script prints the menu."),
+        ("b", "docs/other.txt", "A café serves coffee; see cafe.py for the ASCII one."),
+    ])
+    assert index.identifier_terms("where is café.py") == ["café.py"]
+    hits = index.search("café.py", require_all=["café.py"])
+    assert [hit["id"] for hit in hits] == ["a"]
+
+def test_search_matches_accented_words(index):
+    index.add([("a", "cv.txt", "Mon résumé est naïve"), ("b", "cv.txt", "Nothing relevant here")])
+    assert [hit["id"] for hit in index.search("RÉSUMÉ")] == ["a"]
+    assert [hit["id"] for hit in index.search("naïve", source="cv.txt")] == ["a"]
+    assert index.search("naïve", source="missing.txt") == []
+
+def _stats(index):
+    return sorted(index._conn.execute("SELECT source, chunks, length FROM source_stats").fetchall())
+
+def _scanned(index):
+    return sorted(index._conn.execute("SELECT source, COUNT(*), SUM(length) FROM chunks GROUP BY source").fetchall())
+
+def test_source_stats_follow_updates(index):
+    index.add([("a", "x.txt", "one two three"), ("b", "x.txt", "four"), ("c", "y.txt", "five six")])
+    assert _stats(index) == _scanned(index)
+    index.add([("a", "y.txt", "replaced text")])
+    assert _stats(index) == _scanned(index)
+    index.delete(["b", "missing"])
+    assert _stats(index) == _scanned(index)
+    index.delete_source("y.txt")
+    assert _stats(index) == _scanned(index) == []
+
+def test_very_common_terms_are_skipped(tmp_path):
+    index = KeywordIndex(str(tmp_path / "keywords.db"), max_df=3)
+    index.add([(str(i), "docs.txt", "the report") for i in range(5)] + [("rare", "docs.txt", "the invoice")])
+    assert [hit["id"] for hit in index.search("the invoice")] == ["rare"]
+    # Nothing else left to match: the common term is still used, up to max_df postings
+    assert len(index.search("the")) == 3
@@ -0,0 +1,51 @@
+# tests/test_memory.py
+# MemoryWriter batching: full batches and the flush_interval deadline, against an in-memory store.
+import threading
+import time
+
+from core.memory import MemoryWriter
+
+class _ListStore:
+    def __init__(self):
+        self.batches = []
+        self.written = threading.Event()
+
+    def add_texts(self, texts):
+        self.batches.append(list(texts))
+        self.written.set()
+
+def _writer(store, **kwargs):
+    return MemoryWriter(store_fn=lambda: store, **kwargs)
+
+def test_partial_batch_is_written_after_flush_interval():
+    store = _ListStore()
+    writer = _writer(store, batch_size=32, flush_interval=0.2)
+    try:
+        start = time.monotonic()
+        writer.add("note: one")
+        assert store.written.wait(2.0)
+        assert time.monotonic() - start >= 0.15
+        assert store.batches == [["note: one"]]
+        assert writer.stats()["written"] == 1 and writer.stats()["pending"] == 0
+    finally:
+        writer.close()
+
+def test_full_batch_is_written_without_waiting_for_interval():
+    store = _ListStore()
+    writer = _writer(store, batch_size=3, flush_interval=60)
+    try:
+        for i in range(3):
+            writer.add(f"note: {i}")
+        assert store.written.wait(2.0)
+        assert store.batches == [["note: 0", "note: 1", "note: 2"]]
+    finally:
+        writer.close()
+
+def test_flush_and_close_drain_pending_notes():
+    store = _ListStore()
+    writer = _writer(store, batch_size=32, flush_interval=60)
+    writer.add("note: a")
+    assert writer.flush(timeout=2.0)
+    writer.add("note: b")
+    writer.close()
+    assert [t for batch in store.batches for t in batch] == ["note: a", "note: b"]
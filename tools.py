@@ -2,43 +2,55 @@
 # This file centralizes the definition of all agent tools.
 from __future__ import annotations
 import os
-import ast
-import subprocess
 from typing import Dict, Any, List
 
-from langchain_chroma import Chroma
-from ddgs import DDGS
-
 # Imports from your core module
-from core.config import _embedding_fn, RAG_PERSIST_DIR, RAG_COLLECTION
+from core.config import UPLOAD_DIR, RAG_TOP_K
+from core.rag import hybrid_search
+from core.sandbox import run_sandboxed
+from core.repl import get_repl_pool
+from core.request_scope import current_scope, current_cancel_token
+from core.search import get_web_searcher
+from core.calc import evaluate, evaluate_batch, evaluate_range
 
 # --- Tool Implementations (formerly utils.py) ---
 
 def tool_web_search(query: str, max_results: int = 3) -> Dict[str, Any]:
-    """Searches the web for a given query."""
-    results: List[Dict[str, Any]] = []
+    """Searches the web for a given query (results are cached for a while)."""
     try:
-        with DDGS() as ddgs:
-            for r in ddgs.text(query, max_results=max_results):
-                results.append({"title": r.get("title"), "href": r.get("href"), "body": r.get("body")})
+        result = get_web_searcher().search(query, max_results)
     except Exception as e:
         return {"error": f"search_failed: {e}"}
-    return {"results": results}
+    if "error" in result:
+        return {"error": result["error"]}
+    return {"results": result["results"], "cached": result["cached"], "latency_ms": result["latency_ms"]}
 
-class _MathVisitor(ast.NodeVisitor):
-    allowed_nodes = (ast.Expression, ast.BinOp, ast.UnaryOp, ast.Num, ast.Load, ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Mod, ast.Pow, ast.USub, ast.UAdd, ast.FloorDiv)
-    def visit(self, node):
-        if not isinstance(node, self.allowed_nodes):
-            raise ValueError(f"disallowed expression: {type(node).__name__}")
-        return super().visit(node)
+def tool_web_search_batch(queries: List[str], max_results: int = 3) -> Dict[str, Any]:
+    """Searches several queries concurrently; each entry reports its own cache hit and latency."""
+    try:
+        searches = get_web_searcher().search_many(queries, max_results)
+    except Exception as e:
+        return {"error": f"search_failed: {e}"}
+    return {"searches": searches, "cache_hits": sum(1 for s in searches if s.get("cached"))}
 
 def tool_calculator(expression: str) -> Dict[str, Any]:
     """Evaluates a safe arithmetic expression."""
     try:
-        node = ast.parse(expression, mode="eval")
-        _MathVisitor().visit(node)
-        value = eval(compile(node, "<calc>", "eval"), {"__builtins__": {}}, {})
-        return {"ok": True, "result": value}
+        return {"ok": True, "result": evaluate(expression)}
+    except Exception as e:
+        return {"ok": False, "error": str(e)}
+
+def tool_calculator_batch(expressions: List[str]) -> Dict[str, Any]:
+    """Evaluates many expressions at once; each entry has its own ok/result/error."""
+    try:
+        return {"ok": True, "results": evaluate_batch([str(e) for e in expressions])}
+    except Exception as e:
+        return {"ok": False, "error": str(e)}
+
+def tool_calculator_range(expression: str, start: float, stop: float, step: float = 1.0, variable: str = "x") -> Dict[str, Any]:
+    """Evaluates an expression in one variable over a numeric range."""
+    try:
+        return {"ok": True, **evaluate_range(expression, float(start), float(stop), float(step), variable)}
     except Exception as e:
         return {"ok": False, "error": str(e)}
 
@@ -60,36 +72,48 @@ def tool_read_file(file_path: str) -> Dict[str, Any]:
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
-def tool_run_code(command: str) -> Dict[str, Any]:
-    """Executes a shell command and returns its output."""
+def tool_run_code(command: str, timeout: float | None = None) -> Dict[str, Any]:
+    """Executes a shell command under time, CPU, memory and output limits and returns its output."""
     try:
-        result = subprocess.run(command, shell=True, capture_output=True, text=True, check=False)
-        return {"status": "success", "output": result.stdout, "error": result.stderr if result.stderr else None}
+        return run_sandboxed(command, timeout=timeout)
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
+def _repl_session(session_id: str | None) -> str:
+    """Namespaces REPL sessions by conversation (or request) so callers never share globals."""
+    scope = current_scope()
+    owner = scope.key if scope else "local"
+    return f"{owner}/{session_id or 'default'}"
+
+def tool_python_repl(code: str, session_id: str | None = None) -> Dict[str, Any]:
+    """Runs Python in a persistent per-conversation interpreter; variables survive between calls."""
+    try:
+        return get_repl_pool().run(code, session_id=_repl_session(session_id))
+    except Exception as e:
+        return {"ok": False, "error": f"python_repl_failed: {e}"}
 
-def tool_rag_search(query: str, source_file: str | None = None) -> Dict[str, Any]:
+def tool_rag_search(query: str, source_file: str | None = None, k: int = RAG_TOP_K) -> Dict[str, Any]:
     try:
-        rag_db = Chroma(
-            persist_directory=RAG_PERSIST_DIR,
-            embedding_function=_embedding_fn,
-            collection_name=RAG_COLLECTION
-        )
-        
-        search_kwargs = {"k": 3}
+        source = None
         if source_file:
-            # We need to construct the full path as stored in Chroma's metadata
-            full_path = os.path.join("uploads", source_file)
-            search_kwargs["filter"] = {"source": full_path}
-            print(f"🔍 RAG search filtered by source: {full_path}")
-
-        docs = rag_db.similarity_search(query, **search_kwargs)
-        results_text = "\n---\n".join([d.page_content for d in docs])
-        return {"results": results_text or "No relevant info found in the uploaded file."}
+            # We need to construct the full path as stored in the chunk metadata
+            source = os.path.join(UPLOAD_DIR, source_file)
+            print(f"🔍 RAG search filtered by source: {source}")
+
+        found = hybrid_search(query, k=k, source=source)
+        results_text = "\n---\n".join([hit["text"] for hit in found["results"]])
+        return {"results": results_text or "No relevant info found in the uploaded file.", "mode": found["mode"]}
     except Exception as e:
         return {"error": f"rag_search_failed: {e}"}
 
+def _calculator_dispatch(args: Dict[str, Any]) -> Dict[str, Any]:
+    if args.get("expressions"):
+        return tool_calculator_batch(list(args["expressions"]))
+    if isinstance(args.get("range"), dict):
+        r = args["range"]
+        return tool_calculator_range(args.get("expression", ""), r.get("start", 0), r.get("stop", 0), r.get("step", 1))
+    return tool_calculator(args.get("expression", ""))
+
 def _get_coding_agent_tool():
     from coding import tool_coding_agent
     return tool_coding_agent
@@ -98,26 +122,24 @@ def _get_coding_agent_tool():
 
 TOOLS = {
     "web_search": {
-        "desc": "Search the web for general information, current events, or real-world people and places.",
-        "func": lambda args: tool_web_search(args.get("query", ""), int(args.get("max_results", 3)))
+        "desc": "Search the web for general information, current events, or real-world people and places. Pass `queries` (a list) instead of `query` to run several searches at once.",
+        "func": lambda args: tool_web_search_batch(list(args["queries"]), int(args.get("max_results", 3)))
+            if args.get("queries") else tool_web_search(args.get("query", ""), int(args.get("max_results", 3)))
     },
     "calculator": {
-        "desc": "Evaluate arithmetic expressions.",
-        "func": lambda args: tool_calculator(args.get("expression", ""))
+        "desc": "Evaluate arithmetic expressions. Pass `expressions` (a list) to evaluate many at once, or `expression` in `x` with `range` ({\"start\", \"stop\", \"step\"}) to tabulate it.",
+        "func": lambda args: _calculator_dispatch(args)
     },
     "rag_search": {
         "desc": "Use this tool to answer questions about specific facts or entities found in an uploaded document. If the user has selected a specific file, you MUST use the `source_file` argument with the filename.",
-        "func": lambda args: tool_rag_search(args.get("query", ""), args.get("source_file"))
+        "func": lambda args: tool_rag_search(args.get("query", ""), args.get("source_file"), int(args.get("k", RAG_TOP_K)))
     },
     "python_repl": {
-        "desc": "A Python shell. Use this for complex math, data analysis, or executing any Python code. Input should be a valid Python command. The result is what is printed to standard output.",
-        "func": lambda args: {
-            "ok": True,
-            "result": "Python REPL not implemented in this script."
-        }
+        "desc": "A Python shell. Use this for complex math, data analysis, or executing any Python code. Input should be a valid Python command. The result is what is printed to standard output, plus the value of a trailing expression. Variables persist between calls in the same conversation (and `session_id`, if given).",
+        "func": lambda args: tool_python_repl(args.get("code", ""), args.get("session_id") and str(args["session_id"]))
     },
     "coding_agent_tool": {
         "desc": "A specialized agent for writing, executing, and debugging code. Use this for all coding-related tasks.",
-        "func": lambda args: _get_coding_agent_tool()(args.get("user_input", ""))
+        "func": lambda args: _get_coding_agent_tool()(args.get("user_input", ""), cancel_token=current_cancel_token())
     }
 }
\ No newline at end of file